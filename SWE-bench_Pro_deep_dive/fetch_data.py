@@ -1,35 +1,39 @@
 """Fetch SWE-bench Pro dataset from HuggingFace and save as a JS data file."""
+import argparse
 import json
 import sys
 sys.path.insert(0, '..')
-from datasets import load_dataset
+from manifest import load_manifest
+
+# Fields relevant for the deep dive
+FIELDS = [
+    "instance_id",
+    "repo",
+    "repo_language",
+    "base_commit",
+    "problem_statement",
+    "requirements",
+    "interface",
+    "patch",
+    "test_patch",
+    "fail_to_pass",
+    "pass_to_pass",
+    "issue_specificity",
+    "issue_categories",
+    "selected_test_files_to_run",
+]
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Export SWE-bench Pro as a JS data file.")
+    parser.add_argument("--offline", action="store_true",
+                        help="Use the cached dataset manifest without contacting the HuggingFace Hub.")
+    args = parser.parse_args()
+
     print("Loading SWE-bench Pro dataset...")
-    dataset = load_dataset("ScaleAI/SWE-bench_Pro", split="test")
-    print(f"Loaded {len(dataset)} instances")
-
-    # Convert to list of dicts, keeping fields relevant for the deep dive
-    records = []
-    for row in dataset:
-        record = {
-            "instance_id": row["instance_id"],
-            "repo": row["repo"],
-            "repo_language": row["repo_language"],
-            "base_commit": row["base_commit"],
-            "problem_statement": row["problem_statement"],
-            "requirements": row["requirements"],
-            "interface": row["interface"],
-            "patch": row["patch"],
-            "test_patch": row["test_patch"],
-            "fail_to_pass": row["fail_to_pass"],
-            "pass_to_pass": row["pass_to_pass"],
-            "issue_specificity": row["issue_specificity"],
-            "issue_categories": row["issue_categories"],
-            "selected_test_files_to_run": row["selected_test_files_to_run"],
-        }
-        records.append(record)
+    with load_manifest("ScaleAI/SWE-bench_Pro", offline=args.offline) as manifest:
+        print(f"Loaded {len(manifest)} instances")
+        records = list(manifest.records(FIELDS))
 
     # Sort by repo then instance_id for consistent ordering
     records.sort(key=lambda r: (r["repo"], r["instance_id"]))
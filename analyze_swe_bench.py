@@ -1,130 +1,81 @@
-import os
-import subprocess
-import json
-import shutil
-import tempfile
-from collections import defaultdict
-from datasets import load_dataset
 import argparse
 
 
-from common import check_scc_installed, get_loc_counts, write_loc_stats_csv, EvalSet, clone_repo_with_retry, checkout_with_retry
+from common import (
+    check_scc_installed, write_loc_stats_csv, EvalSet, AnalysisOptions,
+    add_analysis_arguments, print_run_summary, analyze_repositories, open_journal,
+    failures_path_for, WorkPlan, SCC_BACKENDS,
+)
 
 
+def load_eval_set(dataset_name, cache_dir, offline=False):
+    """Loads the cached manifest (see manifest.py) of an eval set."""
+    from manifest import load_manifest
+
+    print(f"Loading {dataset_name} dataset...")
+    return load_manifest(dataset_name, cache_dir=cache_dir, offline=offline)
 
-import concurrent.futures
 
-def process_repository(repo_name, tasks):
+def run_analysis(configs, journal_file, options=None, offline=False, augment=False, columnar=False):
     """
-    Clones a repo once, then iterates through all associated tasks/commits.
-    Returns a list of dicts: {'instance_id': ..., 'repo': ..., 'commit': ..., 'stats': ...}
+    Run LOC analysis for one or more eval sets.
+
+    Every unique (repo, commit) is analyzed once, even when it is shared by
+    several instances or eval sets, and its result is written for each of them.
+
+    Args:
+        configs: EVAL_SET_CONFIG entries of the eval sets to analyze
+        journal_file: CSV path the result journal and failure summary are named after
+        options: AnalysisOptions
+        offline: Load the eval sets from cached manifests without contacting the Hub
+        augment: Also write the augmented CSVs, with the golden patch stats
+        columnar: Also write typed Arrow copies of the CSVs (see columnar.py)
     """
-    repo_url = f"https://github.com/{repo_name}.git"
-    results = []
-
-    print(f"Processing Repo: {repo_name} ({len(tasks)} items)")
-
-    # Create a temporary directory for the repo
-    # Use a unique prefix to avoid collisions in parallel execution
-    prefix = repo_name.replace("/", "_") + "_"
-    with tempfile.TemporaryDirectory(dir=os.getcwd(), prefix=prefix) as temp_dir:
-        try:
-            # 1. Clone the repository
-            # We use --filter=blob:none (Blobless Clone).
-            # This downloads the commit history (so we can checkout any SHA)
-            # but doesn't download file contents until we actually checkout.
-            # Much faster than a full clone.
-            clone_repo_with_retry(repo_url, temp_dir)
-
-            # 2. Iterate through commits for this repo
-            for task in tasks:
-                commit_sha = task['base_commit']
-                instance_id = task['instance_id']
-
-                # print(f"  Checking out {commit_sha[:7]} for {instance_id}...")
-
-                # Force checkout the specific commit
-                checkout_with_retry(temp_dir, commit_sha)
-
-                # 3. Run Analysis
-                stats = get_loc_counts(temp_dir)
-
-                results.append({
-                    "instance_id": instance_id,
-                    "repo": repo_name,
-                    "commit": commit_sha,
-                    "stats": stats
-                })
-        except subprocess.CalledProcessError as e:
-            print(f"Error processing {repo_name}: {e}")
-            # Optionally return partial results or raise
-
-    print(f"Finished {repo_name}")
-    return results
-
-def run_analysis(eval_set, dataset_name, output_file, max_workers):
-    """Run LOC analysis for a single eval set."""
-    print(f"Loading {dataset_name} dataset...")
-    dataset = load_dataset(dataset_name, split="test")
-
-    # 1. Group data by Repository
-    print("Grouping tasks by repository...")
-    repo_groups = defaultdict(list)
-    for row in dataset:
-        repo_groups[row['repo']].append(row)
-
-    print(f"Found {len(repo_groups)} unique repositories across {len(dataset)} tasks.")
-
-    # Prepare results map
-    results_map = {} # instance_id -> result_dict
-
-    # 2. Parallel Processing
-    print(f"Starting parallel analysis with {max_workers} workers...")
-
-    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-        future_to_repo = {
-            executor.submit(process_repository, repo_name, tasks): repo_name
-            for repo_name, tasks in repo_groups.items()
-        }
-
-        finished_count = 0
-        total_repos = len(repo_groups)
-
-        for future in concurrent.futures.as_completed(future_to_repo):
-            repo_name = future_to_repo[future]
-            try:
-                repo_results = future.result()
-                for res in repo_results:
-                    results_map[res['instance_id']] = res
-                finished_count += 1
-                print(f"Progress: {finished_count}/{total_repos} repos processed.")
-            except Exception as exc:
-                print(f'{repo_name} generated an exception: {exc}')
-
-    # 3. Build results list in order and write to CSV
-    print(f"Writing results to {output_file}...")
-    results_list = []
-    count_missing = 0
-    for row in dataset:
-        instance_id = row['instance_id']
-        if instance_id in results_map:
-            results_list.append(results_map[instance_id])
-        else:
-            print(f"Warning: Missing results for {instance_id}")
-            count_missing += 1
-
-    if count_missing > 0:
-        print(f"Total missing: {count_missing}")
-
-    write_loc_stats_csv(output_file, results_list, eval_set)
-
-    print(f"\nDone! Analysis complete for {dataset_name}.\n")
+    options = options or AnalysisOptions()
+    # 1. Plan the unique work across all selected eval sets
+    plan = WorkPlan()
+    manifests = {}
+    for config in configs:
+        manifest = load_eval_set(config["dataset_name"], options.cache_dir, offline)
+        manifests[config["eval_set"]] = manifest
+        plan.add(config["eval_set"].value, manifest.tasks())
+    plan.print_summary()
+
+    repo_groups = plan.repo_groups()
+    print(f"Found {len(repo_groups)} unique repositories.")
+
+    try:
+        # 2. Parallel Processing, journaling each result as it completes
+        journal = open_journal(journal_file, options)
+        results_map = analyze_repositories(repo_groups, options, journal, failures_path_for(journal_file))
+        journal.close()
+
+        # 3. Fan results out to every instance and write one CSV per eval set
+        for config in configs:
+            output_file = config["output_file"]
+            print(f"Writing results to {output_file}...")
+            results_list = plan.results_for(config["eval_set"].value, results_map)
+            patches = None
+            if augment:
+                manifest = manifests[config["eval_set"]]
+                patches = {res["instance_id"]: manifest.get(res["instance_id"], "patch") for res in results_list}
+            write_loc_stats_csv(output_file, results_list, config["eval_set"], patches, columnar)
+            print(f"\nDone! Analysis complete for {config['dataset_name']}.\n")
+    finally:
+        for manifest in manifests.values():
+            manifest.close()
 
 
 def main():
     parser = argparse.ArgumentParser(description="Analyze LOC statistics for SWE-bench datasets.")
     parser.add_argument("--eval-set", choices=["verified", "multilingual", "pro", "polybench", "all"], default="verified", help="Type of SWE-bench dataset to use.")
-    parser.add_argument("--max-workers", type=int, default=8, help="Number of parallel workers.")
+    parser.add_argument("--offline", action="store_true",
+                        help="Load the eval sets from the cached manifests without contacting the HuggingFace Hub.")
+    parser.add_argument("--augment", action="store_true",
+                        help="Also write augmented/<name>_augmented.csv with the golden patch stats in the same pass.")
+    parser.add_argument("--columnar", action="store_true",
+                        help="Also write typed Arrow copies (.arrow) of the output CSVs for report.py.")
+    add_analysis_arguments(parser)
     args = parser.parse_args()
 
     EVAL_SET_CONFIG = {
@@ -150,21 +101,21 @@ def main():
         },
     }
 
-    check_scc_installed()
+    if args.loc_backend in SCC_BACKENDS:
+        check_scc_installed()
+    options = AnalysisOptions.from_args(args, parser)
 
     if args.eval_set == "all":
         eval_sets_to_run = list(EVAL_SET_CONFIG.keys())
+        journal_file = "swe_bench_all_loc_stats.csv"
     else:
         eval_sets_to_run = [args.eval_set]
+        journal_file = EVAL_SET_CONFIG[args.eval_set]["output_file"]
+
+    run_analysis([EVAL_SET_CONFIG[name] for name in eval_sets_to_run], journal_file, options,
+                 args.offline, args.augment, args.columnar)
 
-    for eval_set_name in eval_sets_to_run:
-        config = EVAL_SET_CONFIG[eval_set_name]
-        run_analysis(
-            config["eval_set"],
-            config["dataset_name"],
-            config["output_file"],
-            args.max_workers
-        )
+    print_run_summary(options)
 
 if __name__ == "__main__":
     main()
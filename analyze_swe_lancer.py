@@ -1,30 +1,22 @@
 import os
 import shutil
 import subprocess
-import json
 import argparse
-import tempfile
-from common import check_scc_installed, get_loc_counts, write_loc_stats_csv, EvalSet, clone_repo_with_retry, checkout_with_retry
+from common import (
+    check_scc_installed, write_loc_stats_csv, EvalSet, AnalysisOptions,
+    add_analysis_arguments, print_run_summary, analyze_repositories, open_journal,
+    failures_path_for, WorkPlan, SCC_BACKENDS,
+)
 
-def main():
-    parser = argparse.ArgumentParser(description="Analyze LOC statistics for SWELancer tasks.")
-    parser.add_argument("--output-file", default="swe_lancer_loc_stats.csv", help="Output CSV file.")
-    parser.add_argument("--max-items", type=int, default=None, help="Max number of items to process (for testing).")
-    args = parser.parse_args()
+FRONTIER_EVALS_DIR = "temp_frontier_evals"
 
-    check_scc_installed()
 
-    # Paths
-    # We will use temp directories for cloning to ensure a clean state
-    # But to speed up dev/testing, if they exist locally we could reuse?
-    # For now, follow the robust pattern of temp dirs or specific dirs in CWD.
-    
-    # 1. Clone frontier-evals to get issue data
+def clone_frontier_evals(frontier_evals_dir=FRONTIER_EVALS_DIR):
+    """Sparse-clones the SWE-Lancer issues of openai/frontier-evals; returns the issues directory."""
     print("Cloning/Updating frontier-evals...")
-    frontier_evals_dir = "temp_frontier_evals"
     if os.path.exists(frontier_evals_dir):
         shutil.rmtree(frontier_evals_dir, ignore_errors=True)
-    
+
     # Clone with sparse checkout to save time/space
     subprocess.run(
         ["git", "clone", "--filter=blob:none", "--sparse", "https://github.com/openai/frontier-evals", frontier_evals_dir],
@@ -35,24 +27,51 @@ def main():
         cwd=frontier_evals_dir,
         check=True
     )
+    return os.path.join(frontier_evals_dir, "project", "swelancer", "issues")
 
-    # 2. Collect tasks/commits
-    issues_dir = os.path.join(frontier_evals_dir, "project", "swelancer", "issues")
-    tasks = []
-    
-    print(f"Reading issues from {issues_dir}...")
+
+def read_issue_file(issues_dir, file_name):
+    """Returns {task_id: content} of file_name in every issue directory that has it."""
+    contents = {}
     if os.path.exists(issues_dir):
         for item in os.listdir(issues_dir):
-            item_path = os.path.join(issues_dir, item)
-            if os.path.isdir(item_path):
-                commit_file = os.path.join(item_path, "commit_id.txt")
-                if os.path.exists(commit_file):
-                    with open(commit_file, "r") as f:
-                        commit_sha = f.read().strip()
-                    tasks.append({
-                        "task_id": item,
-                        "commit": commit_sha
-                    })
+            path = os.path.join(issues_dir, item, file_name)
+            if os.path.isfile(path):
+                with open(path, "r", encoding='utf-8', errors='replace') as f:
+                    contents[item] = f.read()
+    return contents
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze LOC statistics for SWELancer tasks.")
+    parser.add_argument("--output-file", default="swe_lancer_loc_stats.csv", help="Output CSV file.")
+    parser.add_argument("--max-items", type=int, default=None, help="Max number of items to process (for testing).")
+    parser.add_argument("--augment", action="store_true",
+                        help="Also write the augmented CSV with the golden patch stats from the same clone.")
+    parser.add_argument("--columnar", action="store_true",
+                        help="Also write typed Arrow copies (.arrow) of the output CSVs for report.py.")
+    add_analysis_arguments(parser)
+    args = parser.parse_args()
+
+    if args.loc_backend in SCC_BACKENDS:
+        check_scc_installed()
+    options = AnalysisOptions.from_args(args, parser)
+
+    # Paths
+    # We will use temp directories for cloning to ensure a clean state
+    # But to speed up dev/testing, if they exist locally we could reuse?
+    # For now, follow the robust pattern of temp dirs or specific dirs in CWD.
+    
+    # 1. Clone frontier-evals to get issue data
+    issues_dir = clone_frontier_evals()
+
+    # 2. Collect tasks/commits (and, with --augment, the patches from the same clone)
+    print(f"Reading issues from {issues_dir}...")
+    tasks = [
+        {"task_id": item, "commit": commit_sha.strip()}
+        for item, commit_sha in read_issue_file(issues_dir, "commit_id.txt").items()
+    ]
+    patches = read_issue_file(issues_dir, "bug_reintroduce.patch") if args.augment else None
 
     print(f"Found {len(tasks)} tasks.")
     
@@ -64,46 +83,28 @@ def main():
         print("No tasks found. Exiting.")
         return
 
-    # 3. Clone Expensify/App
-    print("Cloning Expensify/App...")
-    expensify_dir = "temp_expensify_app"
-    if os.path.exists(expensify_dir):
-        shutil.rmtree(expensify_dir, ignore_errors=True)
-
-    clone_repo_with_retry("https://github.com/Expensify/App", expensify_dir)
-
-    # 4. Analyze each task
-    results = []
-
-    for i, task in enumerate(tasks):
-        task_id = task["task_id"]
-        commit_sha = task["commit"]
-        print(f"Processing {i+1}/{len(tasks)}: {task_id} @ {commit_sha[:7]}")
-
-        # Checkout commit
-        checkout_with_retry(expensify_dir, commit_sha)
-        
-        # Run SCC
-        stats = get_loc_counts(expensify_dir)
-        
-        # Store result
-        res = {
-            "instance_id": task_id,
-            "repo": "Expensify/App",
-            "commit": commit_sha,
-            "stats": stats
-        }
-        results.append(res)
-
-    # 5. Write CSV
-    write_loc_stats_csv(args.output_file, results, EvalSet.SWE_LANCER)
+    # 3. Clone Expensify/App (through the local mirror when enabled) and
+    # analyze each task
+    plan = WorkPlan()
+    plan.add(EvalSet.SWE_LANCER.value, [
+        {"instance_id": task["task_id"], "repo": "Expensify/App", "commit": task["commit"]}
+        for task in tasks
+    ])
+    plan.print_summary()
+    journal = open_journal(args.output_file, options)
+    results_map = analyze_repositories(plan.repo_groups(), options, journal,
+                                       failures_path_for(args.output_file))
+    journal.close()
+    results = plan.results_for(EvalSet.SWE_LANCER.value, results_map)
+
+    # 4. Write CSV
+    write_loc_stats_csv(args.output_file, results, EvalSet.SWE_LANCER, patches, args.columnar)
+    print_run_summary(options)
 
     # Cleanup
     print("Cleaning up...")
-    if os.path.exists(frontier_evals_dir):
-        shutil.rmtree(frontier_evals_dir)
-    if os.path.exists(expensify_dir):
-        shutil.rmtree(expensify_dir)
+    if os.path.exists(FRONTIER_EVALS_DIR):
+        shutil.rmtree(FRONTIER_EVALS_DIR)
 
     print("Done!")
 
@@ -1,35 +1,20 @@
+import argparse
 import csv
 import os
-import json
 
-def parse_patch_stats(patch_text):
-    """
-    Parses a git diff/patch string to count lines added and removed.
-
-    Returns:
-        tuple: (lines_added, lines_removed)
-    """
-    if not patch_text:
-        return 0, 0
-
-    added = 0
-    removed = 0
-
-    lines = patch_text.splitlines()
-    for line in lines:
-        # Check for additions (starts with + but not +++)
-        if line.startswith('+') and not line.startswith('+++'):
-            added += 1
-        # Check for deletions (starts with - but not ---)
-        elif line.startswith('-') and not line.startswith('---'):
-            removed += 1
-
-    return added, removed
+from common import augmented_path_for
+from jsonl_loader import MULTI_SWE_BENCH_DIR, iter_records
+from patch_stats import PATCH_COLUMNS, patch_columns, patch_stats_many
 
 def main():
+    parser = argparse.ArgumentParser(description="Augment the Multi-SWE-bench LOC stats CSV with patch statistics.")
+    parser.add_argument("--columnar", action="store_true",
+                        help="Also write a typed Arrow copy (.arrow) of the augmented CSV for report.py.")
+    args = parser.parse_args()
+
     input_file = "multi_swe_bench_loc_stats.csv"
-    output_file = "augmented/multi_swe_bench_loc_stats_augmented.csv"
-    base_dir = "Multi-SWE-bench"
+    output_file = augmented_path_for(input_file)
+    base_dir = MULTI_SWE_BENCH_DIR
 
     if not os.path.exists(input_file):
         print(f"Error: {input_file} not found.")
@@ -45,22 +30,9 @@ def main():
     print(f"Loading patches from {base_dir}...")
     patch_lookup = {}  # instance_id -> fix_patch
 
-    for root, dirs, files in os.walk(base_dir):
-        for file in files:
-            if file.endswith(".jsonl"):
-                file_path = os.path.join(root, file)
-                print(f"  Reading {file_path}...")
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    for line in f:
-                        if line.strip():
-                            try:
-                                data = json.loads(line)
-                                instance_id = data.get('instance_id')
-                                fix_patch = data.get('fix_patch', '')
-                                if instance_id:
-                                    patch_lookup[instance_id] = fix_patch
-                            except json.JSONDecodeError as e:
-                                print(f"  Error decoding json in {file_path}: {e}")
+    for record in iter_records(base_dir, ["instance_id", "fix_patch"]):
+        if record['instance_id']:
+            patch_lookup[record['instance_id']] = record['fix_patch'] or ''
 
     print(f"Loaded {len(patch_lookup)} patches.")
 
@@ -70,40 +42,37 @@ def main():
     with open(input_file, mode='r', newline='', encoding='utf-8') as infile:
         reader = csv.DictReader(infile)
         fieldnames = reader.fieldnames
-
-        # Define new columns
-        new_cols = ['golden_patch_added', 'golden_patch_deleted', 'golden_patch_total']
-
-        # Ensure output directory exists
-        os.makedirs(os.path.dirname(output_file), exist_ok=True)
-
-        # Prepare output file
-        with open(output_file, mode='w', newline='', encoding='utf-8') as outfile:
-            writer = csv.DictWriter(outfile, fieldnames=fieldnames + new_cols)
-            writer.writeheader()
-
-            rows_processed = 0
-            missing_patches = 0
-            for row in reader:
-                instance_id = row['instance_id']
-
-                # Get the patch from the lookup
-                patch_content = patch_lookup.get(instance_id)
-
-                if patch_content:
-                    added, deleted = parse_patch_stats(patch_content)
-                    row['golden_patch_added'] = added
-                    row['golden_patch_deleted'] = deleted
-                    row['golden_patch_total'] = added + deleted
-                else:
-                    print(f"Warning: No patch found for ID {instance_id}")
-                    row['golden_patch_added'] = 0
-                    row['golden_patch_deleted'] = 0
-                    row['golden_patch_total'] = 0
-                    missing_patches += 1
-
-                writer.writerow(row)
-                rows_processed += 1
+        rows = list(reader)
+
+    # Get the patches from the lookup and compute their stats in one batch
+    patches = []
+    missing_patches = 0
+    for row in rows:
+        instance_id = row['instance_id']
+        patch_content = patch_lookup.get(instance_id)
+        if not patch_content:
+            print(f"Warning: No patch found for ID {instance_id}")
+            missing_patches += 1
+        patches.append(patch_content)
+    stats = patch_stats_many(patches)
+
+    # Ensure output directory exists
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+
+    # Prepare output file
+    with open(output_file, mode='w', newline='', encoding='utf-8') as outfile:
+        writer = csv.DictWriter(outfile, fieldnames=fieldnames + PATCH_COLUMNS)
+        writer.writeheader()
+
+        rows_processed = 0
+        for row, patch_stats in zip(rows, stats):
+            row.update(patch_columns(patch_stats))
+            writer.writerow(row)
+            rows_processed += 1
+
+    if args.columnar:
+        from columnar import write_columnar_copy
+        write_columnar_copy(output_file, fieldnames + PATCH_COLUMNS, rows)
 
     print(f"\nDone! Augmented data saved to {output_file}")
     print(f"Processed {rows_processed} rows.")
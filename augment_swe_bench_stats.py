@@ -1,55 +1,33 @@
 import csv
 import os
 import argparse
-from datasets import load_dataset
 
-def parse_patch_stats(patch_text):
-    """
-    Parses a git diff/patch string to count lines added and removed.
-
-    Returns:
-        tuple: (lines_added, lines_removed)
-    """
-    if not patch_text:
-        return 0, 0
-
-    added = 0
-    removed = 0
+from common import DEFAULT_CACHE_DIR, augmented_path_for
+from manifest import load_manifest
+from patch_stats import PATCH_COLUMNS, patch_columns, patch_stats_many
 
-    lines = patch_text.splitlines()
-    for line in lines:
-        # Check for additions (starts with + but not +++)
-        if line.startswith('+') and not line.startswith('+++'):
-            added += 1
-        # Check for deletions (starts with - but not ---)
-        elif line.startswith('-') and not line.startswith('---'):
-            removed += 1
-
-    return added, removed
-
-def process_eval_set(eval_set):
+def process_eval_set(eval_set, cache_dir=DEFAULT_CACHE_DIR, offline=False, columnar=False):
     """
     Process a single eval set: load dataset, read corresponding CSV, and augment it.
+    Patches are read from the dataset's cached manifest (see manifest.py). With
+    columnar, a typed Arrow copy of the augmented CSV is written too (see columnar.py).
     """
     # Map eval_set to dataset name and file names (matching analyze_swe_bench.py)
     if eval_set == "verified":
         dataset_name = "SWE-bench/SWE-bench_Verified"
         input_file = "swe_bench_verified_loc_stats.csv"
-        output_file = "augmented/swe_bench_verified_loc_stats_augmented.csv"
     elif eval_set == "multilingual":
         dataset_name = "SWE-bench/SWE-bench_Multilingual"
         input_file = "swe_bench_multilingual_loc_stats.csv"
-        output_file = "augmented/swe_bench_multilingual_loc_stats_augmented.csv"
     elif eval_set == "pro":
         dataset_name = "ScaleAI/SWE-bench_Pro"
         input_file = "swe_bench_pro_loc_stats.csv"
-        output_file = "augmented/swe_bench_pro_loc_stats_augmented.csv"
     elif eval_set == "polybench":
         dataset_name = "AmazonScience/SWE-PolyBench"
         input_file = "swe_polybench_loc_stats.csv"
-        output_file = "augmented/swe_polybench_loc_stats_augmented.csv"
     else:
         raise ValueError(f"Unknown eval_set: {eval_set}")
+    output_file = augmented_path_for(input_file)
 
     if not os.path.exists(input_file):
         print(f"Warning: {input_file} not found. Skipping {eval_set}.")
@@ -59,46 +37,39 @@ def process_eval_set(eval_set):
     print(f"Processing {eval_set.upper()} eval set")
     print(f"{'='*60}")
     print(f"Loading {dataset_name} dataset to retrieve patches...")
-    dataset = load_dataset(dataset_name, split="test")
-
-    # Create a quick lookup dictionary: instance_id -> patch_content
-    print("Creating patch lookup table...")
-    patch_lookup = {item['instance_id']: item['patch'] for item in dataset}
-
-    print(f"Reading {input_file} and appending data...")
-
-    with open(input_file, mode='r', newline='', encoding='utf-8') as infile:
-        reader = csv.DictReader(infile)
-        fieldnames = reader.fieldnames
-
-        # Define new columns
-        new_cols = ['golden_patch_added', 'golden_patch_deleted', 'golden_patch_total']
-
-        # Prepare output file
-        with open(output_file, mode='w', newline='\n', encoding='utf-8') as outfile:
-            writer = csv.DictWriter(outfile, fieldnames=fieldnames + new_cols)
-            writer.writeheader()
-
-            rows_processed = 0
-            for row in reader:
-                instance_id = row['instance_id']
-
-                # Get the patch from the dataset
-                patch_content = patch_lookup.get(instance_id)
-
-                if patch_content:
-                    added, deleted = parse_patch_stats(patch_content)
-                    row['golden_patch_added'] = added
-                    row['golden_patch_deleted'] = deleted
-                    row['golden_patch_total'] = added + deleted
-                else:
-                    print(f"Warning: No patch found for ID {instance_id}")
-                    row['golden_patch_added'] = 0
-                    row['golden_patch_deleted'] = 0
-                    row['golden_patch_total'] = 0
-
-                writer.writerow(row)
-                rows_processed += 1
+    with load_manifest(dataset_name, cache_dir=cache_dir, offline=offline) as manifest:
+        print(f"Reading {input_file} and appending data...")
+
+        with open(input_file, mode='r', newline='', encoding='utf-8') as infile:
+            reader = csv.DictReader(infile)
+            fieldnames = reader.fieldnames
+            rows = list(reader)
+
+        # Get the patches from the dataset and compute their stats in one batch
+        patches = []
+        for row in rows:
+            instance_id = row['instance_id']
+            patch_content = manifest.get(instance_id, "patch") if instance_id in manifest else None
+            if not patch_content:
+                print(f"Warning: No patch found for ID {instance_id}")
+            patches.append(patch_content)
+    stats = patch_stats_many(patches)
+
+    # Prepare output file
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    with open(output_file, mode='w', newline='\n', encoding='utf-8') as outfile:
+        writer = csv.DictWriter(outfile, fieldnames=fieldnames + PATCH_COLUMNS)
+        writer.writeheader()
+
+        rows_processed = 0
+        for row, patch_stats in zip(rows, stats):
+            row.update(patch_columns(patch_stats))
+            writer.writerow(row)
+            rows_processed += 1
+
+    if columnar:
+        from columnar import write_columnar_copy
+        write_columnar_copy(output_file, fieldnames + PATCH_COLUMNS, rows)
 
     print(f"Done! Augmented data saved to {output_file}")
     print(f"Processed {rows_processed} rows for {eval_set}.")
@@ -111,19 +82,25 @@ def main():
         default="all",
         help="Type of SWE-bench dataset to process. Use 'all' to process all available CSV files."
     )
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+                        help="Directory holding the dataset manifests (shared with the analyze scripts).")
+    parser.add_argument("--offline", action="store_true",
+                        help="Read patches from the cached manifests without contacting the HuggingFace Hub.")
+    parser.add_argument("--columnar", action="store_true",
+                        help="Also write typed Arrow copies (.arrow) of the augmented CSVs for report.py.")
     args = parser.parse_args()
 
     if args.eval_set == "all":
         # Process all eval sets
         eval_sets = ["verified", "multilingual", "pro", "polybench"]
         for eval_set in eval_sets:
-            process_eval_set(eval_set)
+            process_eval_set(eval_set, args.cache_dir, args.offline, args.columnar)
         print(f"\n{'='*60}")
         print("All eval sets processed!")
         print(f"{'='*60}")
     else:
         # Process single eval set
-        process_eval_set(args.eval_set)
+        process_eval_set(args.eval_set, args.cache_dir, args.offline, args.columnar)
 
 if __name__ == "__main__":
     main()
@@ -1,73 +1,32 @@
+import argparse
 import csv
 import os
 import shutil
-import subprocess
 
-def parse_patch_stats(patch_text):
-    """
-    Parses a git diff/patch string to count lines added and removed.
-
-    Returns:
-        tuple: (lines_added, lines_removed)
-    """
-    if not patch_text:
-        return 0, 0
-
-    added = 0
-    removed = 0
-
-    lines = patch_text.splitlines()
-    for line in lines:
-        # Check for additions (starts with + but not +++)
-        if line.startswith('+') and not line.startswith('+++'):
-            added += 1
-        # Check for deletions (starts with - but not ---)
-        elif line.startswith('-') and not line.startswith('---'):
-            removed += 1
-
-    return added, removed
+from analyze_swe_lancer import FRONTIER_EVALS_DIR, clone_frontier_evals, read_issue_file
+from common import augmented_path_for
+from patch_stats import PATCH_COLUMNS, patch_columns, patch_stats_many
 
 def main():
+    parser = argparse.ArgumentParser(description="Augment the SWE-Lancer LOC stats CSV with patch statistics.")
+    parser.add_argument("--columnar", action="store_true",
+                        help="Also write a typed Arrow copy (.arrow) of the augmented CSV for report.py.")
+    args = parser.parse_args()
+
     input_file = "swe_lancer_loc_stats.csv"
-    output_file = "augmented/swe_lancer_loc_stats_augmented.csv"
+    output_file = augmented_path_for(input_file)
 
     if not os.path.exists(input_file):
         print(f"Error: {input_file} not found.")
         return
 
     # Clone frontier-evals to get patch data
-    print("Cloning/Updating frontier-evals...")
-    frontier_evals_dir = "temp_frontier_evals"
-    if os.path.exists(frontier_evals_dir):
-        shutil.rmtree(frontier_evals_dir, ignore_errors=True)
-
-    # Clone with sparse checkout to save time/space
-    subprocess.run(
-        ["git", "clone", "--filter=blob:none", "--sparse",
-         "https://github.com/openai/frontier-evals", frontier_evals_dir],
-        check=True
-    )
-    subprocess.run(
-        ["git", "sparse-checkout", "set", "project/swelancer/issues"],
-        cwd=frontier_evals_dir,
-        check=True
-    )
-
-    issues_dir = os.path.join(frontier_evals_dir, "project", "swelancer", "issues")
+    # (analyze_swe_lancer.py --augment does this from its own clone)
+    issues_dir = clone_frontier_evals()
 
     # Build a lookup from task_id to patch content
     print("Loading patches from frontier-evals...")
-    patch_lookup = {}  # task_id -> patch_content
-
-    if os.path.exists(issues_dir):
-        for item in os.listdir(issues_dir):
-            item_path = os.path.join(issues_dir, item)
-            if os.path.isdir(item_path):
-                patch_file = os.path.join(item_path, "bug_reintroduce.patch")
-                if os.path.exists(patch_file):
-                    with open(patch_file, "r", encoding='utf-8', errors='replace') as f:
-                        patch_content = f.read()
-                    patch_lookup[item] = patch_content
+    patch_lookup = read_issue_file(issues_dir, "bug_reintroduce.patch")  # task_id -> patch_content
 
     print(f"Loaded {len(patch_lookup)} patches.")
 
@@ -77,45 +36,42 @@ def main():
     with open(input_file, mode='r', newline='', encoding='utf-8') as infile:
         reader = csv.DictReader(infile)
         fieldnames = reader.fieldnames
-
-        # Define new columns
-        new_cols = ['golden_patch_added', 'golden_patch_deleted', 'golden_patch_total']
-
-        # Ensure output directory exists
-        os.makedirs(os.path.dirname(output_file), exist_ok=True)
-
-        # Prepare output file
-        with open(output_file, mode='w', newline='', encoding='utf-8') as outfile:
-            writer = csv.DictWriter(outfile, fieldnames=fieldnames + new_cols)
-            writer.writeheader()
-
-            rows_processed = 0
-            missing_patches = 0
-            for row in reader:
-                task_id = row['instance_id']
-
-                # Get the patch from the lookup
-                patch_content = patch_lookup.get(task_id)
-
-                if patch_content:
-                    added, deleted = parse_patch_stats(patch_content)
-                    row['golden_patch_added'] = added
-                    row['golden_patch_deleted'] = deleted
-                    row['golden_patch_total'] = added + deleted
-                else:
-                    print(f"Warning: No patch found for task {task_id}")
-                    row['golden_patch_added'] = 0
-                    row['golden_patch_deleted'] = 0
-                    row['golden_patch_total'] = 0
-                    missing_patches += 1
-
-                writer.writerow(row)
-                rows_processed += 1
+        rows = list(reader)
+
+    # Get the patches from the lookup and compute their stats in one batch
+    patches = []
+    missing_patches = 0
+    for row in rows:
+        task_id = row['instance_id']
+        patch_content = patch_lookup.get(task_id)
+        if not patch_content:
+            print(f"Warning: No patch found for task {task_id}")
+            missing_patches += 1
+        patches.append(patch_content)
+    stats = patch_stats_many(patches)
+
+    # Ensure output directory exists
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+
+    # Prepare output file
+    with open(output_file, mode='w', newline='', encoding='utf-8') as outfile:
+        writer = csv.DictWriter(outfile, fieldnames=fieldnames + PATCH_COLUMNS)
+        writer.writeheader()
+
+        rows_processed = 0
+        for row, patch_stats in zip(rows, stats):
+            row.update(patch_columns(patch_stats))
+            writer.writerow(row)
+            rows_processed += 1
+
+    if args.columnar:
+        from columnar import write_columnar_copy
+        write_columnar_copy(output_file, fieldnames + PATCH_COLUMNS, rows)
 
     # Cleanup
     print("Cleaning up...")
-    if os.path.exists(frontier_evals_dir):
-        shutil.rmtree(frontier_evals_dir)
+    if os.path.exists(FRONTIER_EVALS_DIR):
+        shutil.rmtree(FRONTIER_EVALS_DIR)
 
     print(f"\nDone! Augmented data saved to {output_file}")
     print(f"Processed {rows_processed} rows.")
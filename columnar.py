@@ -0,0 +1,166 @@
+"""
+Typed columnar copies of the LOC stats and augmented CSVs (Arrow IPC).
+
+Next to <name>.csv, --columnar writes <name>.arrow with the same rows and
+columns, typed instead of text:
+
+    eval_set, repo        dictionary-encoded strings (sorted dictionaries)
+    commit                20-byte binary commit ids
+    instance_id           string
+    LOC / patch columns   int32 (the --extra-stats *_bytes columns int64),
+                          null where the CSV cell is empty
+
+The files are uncompressed Arrow IPC, so report.py memory-maps them instead
+of parsing text. The CSVs are still written as the export format. Existing
+CSVs can be converted, and the two compared for size and load time:
+
+    python columnar.py --convert
+"""
+
+import argparse
+import csv
+import glob
+import os
+import time
+
+import pyarrow as pa
+
+from common import AUGMENTED_DIR, TARGET_LANGUAGES, extra_stat_columns
+from patch_stats import PATCH_COLUMNS
+
+COLUMNAR_SUFFIX = ".arrow"
+
+DICTIONARY_COLUMNS = {"eval_set": pa.int8(), "repo": pa.int32()}
+INT_COLUMNS = set(TARGET_LANGUAGES) | set(extra_stat_columns()) | set(PATCH_COLUMNS)
+
+
+def columnar_path_for(csv_path):
+    """<name>.arrow next to <name>.csv."""
+    return os.path.splitext(csv_path)[0] + COLUMNAR_SUFFIX
+
+
+def _to_arrow(name, values):
+    """One typed Arrow array from a column of CSV values (str or int; '' or None for empty)."""
+    if name in DICTIONARY_COLUMNS:
+        dictionary = sorted(set(values))
+        ids = {value: i for i, value in enumerate(dictionary)}
+        return pa.DictionaryArray.from_arrays(
+            pa.array([ids[value] for value in values], type=DICTIONARY_COLUMNS[name]),
+            pa.array(dictionary, type=pa.string()))
+    if name == "commit":
+        return pa.array([bytes.fromhex(value) for value in values], type=pa.binary(20))
+    if name in INT_COLUMNS:
+        int_type = pa.int64() if name.endswith("_bytes") else pa.int32()
+        return pa.array([None if value in ("", None) else int(value) for value in values], type=int_type)
+    return pa.array([None if value is None else str(value) for value in values], type=pa.string())
+
+
+def write_columnar(path, header, rows):
+    """
+    Writes rows (lists in header order, as written to the CSV) to an Arrow IPC file.
+
+    Args:
+        path: Output file, usually columnar_path_for(csv_path)
+        header: Column names
+        rows: List of rows; values may be ints or their CSV strings
+    """
+    columns = list(zip(*rows)) if rows else [()] * len(header)
+    table = pa.Table.from_arrays([_to_arrow(name, list(values)) for name, values in zip(header, columns)],
+                                 names=list(header))
+    tmp_path = path + ".tmp"
+    with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp_path, path)
+    print(f"Wrote {len(rows)} rows to {path}")
+
+
+def write_columnar_copy(csv_path, header, rows):
+    """Writes the typed copy of csv_path from the rows written to it (lists in header order, or dicts)."""
+    rows = [[row[name] for name in header] if isinstance(row, dict) else row for row in rows]
+    write_columnar(columnar_path_for(csv_path), header, rows)
+
+
+def read_columnar(path, columns=None, memory_map=True):
+    """
+    Reads an Arrow IPC stats file as a DataFrame.
+
+    eval_set/repo become categoricals and commit ids hex strings; integer
+    columns with empty cells become floats, as pandas reads them from CSV.
+
+    Args:
+        path: File written by write_columnar
+        columns: Optional subset of columns to load (others are never read)
+        memory_map: Map the file instead of reading it into memory
+    """
+    source = pa.memory_map(path) if memory_map else pa.OSFile(path)
+    with source:
+        table = pa.ipc.open_file(source).read_all()
+        if columns is not None:
+            table = table.select([name for name in columns if name in table.column_names])
+        df = table.to_pandas(split_blocks=True)
+    if "commit" in df.columns:
+        df["commit"] = [commit.hex() for commit in df["commit"]]
+    return df
+
+
+def read_column_names(path):
+    """Column names of an Arrow IPC stats file, read from its schema only."""
+    with pa.memory_map(path) as source:
+        return pa.ipc.open_file(source).schema.names
+
+
+def convert_csv(csv_path):
+    """Writes columnar_path_for(csv_path) from an existing stats CSV; returns its path."""
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        rows = list(reader)
+    path = columnar_path_for(csv_path)
+    write_columnar(path, header, rows)
+    return path
+
+
+def _timed(load, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        load()
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best
+
+
+def compare(csv_paths, repeat=3):
+    """Prints file size and DataFrame load time of every CSV against its .arrow copy."""
+    import pandas as pd
+
+    print(f"{'File':<58} {'CSV':>10} {'Arrow':>10} {'CSV load':>10} {'Arrow load':>11}")
+    for csv_path in csv_paths:
+        path = columnar_path_for(csv_path)
+        if not os.path.exists(path):
+            print(f"{csv_path:<58} (no {COLUMNAR_SUFFIX} copy; run with --convert)")
+            continue
+        csv_seconds = _timed(lambda: pd.read_csv(csv_path), repeat)
+        arrow_seconds = _timed(lambda: read_columnar(path), repeat)
+        print(f"{csv_path:<58} {os.path.getsize(csv_path) / 1024:>8.0f}KB {os.path.getsize(path) / 1024:>8.0f}KB "
+              f"{csv_seconds * 1000:>8.1f}ms {arrow_seconds * 1000:>9.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare (or create) the Arrow copies of the stats CSVs.")
+    parser.add_argument("csv_files", nargs="*",
+                        help=f"Stats CSVs (default: *_loc_stats.csv and {AUGMENTED_DIR}/*_augmented.csv).")
+    parser.add_argument("--convert", action="store_true", help=f"Write the {COLUMNAR_SUFFIX} copies first.")
+    parser.add_argument("--repeat", type=int, default=3, help="Loads per file; the best is reported.")
+    args = parser.parse_args()
+
+    csv_paths = args.csv_files or sorted(glob.glob("*_loc_stats.csv")) + sorted(
+        glob.glob(os.path.join(AUGMENTED_DIR, "*_augmented.csv")))
+    if args.convert:
+        for csv_path in csv_paths:
+            convert_csv(csv_path)
+    compare(csv_paths, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,25 @@
 import subprocess
+import re
 import os
 import json
 import csv
 import time
+import shutil
+import tempfile
+import threading
+import queue
+import hashlib
+import functools
+from dataclasses import asdict, dataclass, field, replace
 from enum import Enum
 from collections import defaultdict
+from typing import TYPE_CHECKING
+
+from fetch_strategy import FETCH_STRATEGIES, DEFAULT_SHALLOW_MAX_TASKS, FetchPlanner
+from loc_cache import LocCache, DEFAULT_MAX_ENTRIES as DEFAULT_LOC_CACHE_MAX_ENTRIES
+
+if TYPE_CHECKING:
+    from file_index import FileIndex
 
 
 class EvalSet(Enum):
@@ -32,6 +47,268 @@ TARGET_LANGUAGES = [
     "Ruby", "TypeScript", "PHP",
 ]
 
+# scc languages folded into one of TARGET_LANGUAGES
+LANGUAGE_ALIASES = {
+    "C Header": "C",
+    "C++ Header": "C++",
+}
+
+# Ways of counting LOC for a commit (see --loc-backend)
+# Backends counting a checked out tree with scc; they give identical results.
+SCC_BACKENDS = ["scc", "scc-batched"]
+LOC_BACKENDS = SCC_BACKENDS + ["python", "git-objects"]
+
+DEFAULT_REPO_URL_TEMPLATE = "https://github.com/{repo}.git"
+
+# Per-language metrics besides code lines that scc reports in the same run
+# (see --extra-stats): column suffix -> scc's per-language JSON field.
+EXTRA_STATS = {
+    "files": "Count",
+    "bytes": "Bytes",
+    "lines": "Lines",
+    "comment": "Comment",
+    "blank": "Blank",
+    "complexity": "Complexity",
+}
+
+# Persistent caches (bare mirrors, ...) shared across runs and eval sets.
+DEFAULT_CACHE_DIR = os.environ.get(
+    "SWE_ANALYZE_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "analyze-swe-bench"),
+)
+
+# Where --augment (and the augment_*_stats.py scripts) put the augmented CSVs
+AUGMENTED_DIR = "augmented"
+
+
+@dataclass
+class AnalysisOptions:
+    """Settings shared by the analyze_*.py entry points."""
+    cache_dir: str = DEFAULT_CACHE_DIR
+    use_mirror_cache: bool = True
+    repo_url_template: str = DEFAULT_REPO_URL_TEMPLATE
+    scratch_dir: str | None = None
+    disk_budget: int | None = None
+    sparse_checkout: bool = False
+    fetch_strategy: str = "auto"
+    shallow_max_tasks: int = DEFAULT_SHALLOW_MAX_TASKS
+    max_workers: int = 8
+    fetch_workers: int | None = None
+    checkout_workers: int | None = None
+    scan_workers: int | None = None
+    loc_backend: str = "scc"
+    scan_batch_size: int = 16
+    incremental: bool = False
+    verify_incremental: int = 0
+    worktrees_per_repo: int = 1
+    schedule: str = "longest-first"
+    checkout_order: str = "date"
+    resume: bool = False
+    retry_failed: int = 1
+    loc_cache: LocCache | None = field(default=None, repr=False)
+    file_index: "FileIndex | None" = field(default=None, repr=False)
+    extra_stats: bool = False
+
+    @classmethod
+    def from_args(cls, args, parser):
+        """
+        Builds options from parsed CLI args, reporting flag combinations that
+        do not work together through parser.error. Requires scc to be installed.
+        """
+        if args.extra_stats and (args.loc_backend not in SCC_BACKENDS or args.incremental):
+            parser.error("--extra-stats needs --loc-backend scc or scc-batched, without --incremental")
+        if args.file_index is not None and (args.loc_backend not in SCC_BACKENDS or args.incremental):
+            parser.error("--file-index needs --loc-backend scc or scc-batched, without --incremental")
+        loc_cache = None
+        if not args.no_loc_cache:
+            loc_cache = LocCache(
+                os.path.join(args.cache_dir, "loc_cache.sqlite3"),
+                get_loc_counter_key(args.loc_backend, args.sparse_checkout, args.extra_stats),
+                max_entries=args.loc_cache_max_entries,
+            )
+        file_index = None
+        if args.file_index is not None:
+            from file_index import FileIndex
+            file_index = FileIndex(args.file_index)
+        return cls(
+            cache_dir=args.cache_dir,
+            use_mirror_cache=not args.no_mirror_cache,
+            repo_url_template=args.repo_url_template,
+            scratch_dir=args.scratch_dir,
+            disk_budget=args.disk_budget,
+            sparse_checkout=args.sparse_checkout,
+            fetch_strategy=args.fetch_strategy,
+            shallow_max_tasks=args.shallow_max_tasks,
+            max_workers=args.max_workers,
+            fetch_workers=args.fetch_workers,
+            checkout_workers=args.checkout_workers,
+            scan_workers=args.scan_workers,
+            loc_backend=args.loc_backend,
+            scan_batch_size=args.scan_batch_size,
+            incremental=args.incremental,
+            verify_incremental=args.verify_incremental,
+            worktrees_per_repo=args.worktrees_per_repo,
+            schedule=args.schedule,
+            checkout_order=args.checkout_order,
+            resume=args.resume,
+            retry_failed=args.retry_failed,
+            loc_cache=loc_cache,
+            file_index=file_index,
+            extra_stats=args.extra_stats,
+        )
+
+    @property
+    def mirror_dir(self):
+        """Directory holding the bare mirrors, or None when the mirror cache is disabled."""
+        if not self.use_mirror_cache:
+            return None
+        return os.path.join(self.cache_dir, "mirrors")
+
+    def repo_url(self, repo_name):
+        """Clone URL of an 'org/repo' repository."""
+        return self.repo_url_template.format(repo=repo_name)
+
+
+def add_analysis_arguments(parser):
+    """Adds the CLI flags read by AnalysisOptions.from_args."""
+    parser.add_argument("--max-workers", type=int, default=8,
+                        help="Default for --fetch-workers, --checkout-workers and --scan-workers.")
+    parser.add_argument("--fetch-workers", type=int, default=None,
+                        help="Repositories cloned/fetched concurrently (network bound).")
+    parser.add_argument("--checkout-workers", type=int, default=None,
+                        help="Commits checked out concurrently (disk bound).")
+    parser.add_argument("--scan-workers", type=int, default=None,
+                        help="Commits counted concurrently (CPU bound).")
+    parser.add_argument("--repo-url-template", default=DEFAULT_REPO_URL_TEMPLATE,
+                        help="Clone URL for a repository, with {repo} replaced by 'org/repo' "
+                             "(e.g. file:///srv/git/{repo}.git).")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+                        help="Directory for persistent caches (default: $SWE_ANALYZE_CACHE_DIR "
+                             "or ~/.cache/analyze-swe-bench).")
+    parser.add_argument("--no-mirror-cache", action="store_true",
+                        help="Clone straight from the network instead of through a local bare mirror.")
+    parser.add_argument("--scratch-dir", default=None,
+                        help="Where clones and worktrees are created (default: current directory), "
+                             "e.g. a tmpfs.")
+    parser.add_argument("--disk-budget", type=parse_size, default=None, metavar="SIZE",
+                        help="Only start a repository when its estimated clone and worktrees fit in "
+                             "SIZE of scratch space next to the repositories already running (e.g. 100G).")
+    parser.add_argument("--fetch-strategy", choices=FETCH_STRATEGIES, default="auto",
+                        help="'full' clones whole repositories (through the mirror), 'shallow' fetches "
+                             "each task commit with --depth 1, 'auto' decides per repository from the "
+                             "task count and sizes seen in earlier runs.")
+    parser.add_argument("--shallow-max-tasks", type=int, default=DEFAULT_SHALLOW_MAX_TASKS, metavar="N",
+                        help="With --fetch-strategy auto and no known sizes, fetch repositories with up "
+                             "to N distinct commits shallowly.")
+    parser.add_argument("--sparse-checkout", action="store_true",
+                        help="Blobless partial clone plus a sparse checkout of only the files in "
+                             "TARGET_LANGUAGES (checkout-based backends; bypasses the mirror cache).")
+    parser.add_argument("--loc-backend", choices=LOC_BACKENDS, default="scc",
+                        help="How LOC is counted: 'scc' runs scc once per checked out commit, "
+                             "'scc-batched' runs one scc over several checked out worktrees, 'python' "
+                             "uses the built-in line counter on the checkout (no scc needed), and "
+                             "'git-objects' reads blobs from git without a checkout (no scc needed).")
+    parser.add_argument("--scan-batch-size", type=int, default=16, metavar="N",
+                        help="With --loc-backend scc-batched, count up to N checked out commits per scc run.")
+    parser.add_argument("--no-loc-cache", action="store_true",
+                        help="Always run scc instead of reusing LOC results for already-counted trees.")
+    parser.add_argument("--loc-cache-max-entries", type=int, default=DEFAULT_LOC_CACHE_MAX_ENTRIES,
+                        help="Size cap of the LOC cache; least recently used entries are evicted.")
+    parser.add_argument("--file-index", default=None, metavar="DIR",
+                        help="Also record path, language, code and bytes of every counted file, "
+                             "one index file per repository in DIR (see file_index.py).")
+    parser.add_argument("--extra-stats", action="store_true",
+                        help="Also write per-language file count, bytes, lines, comment, blank and "
+                             "complexity columns, taken from the same scc run.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Count one anchor commit per repo fully, then derive the others from git diffs "
+                             "(scc backends only).")
+    parser.add_argument("--verify-incremental", type=int, default=0, metavar="N",
+                        help="With --incremental, cross-check every Nth derived commit against a full scan.")
+    parser.add_argument("--worktrees-per-repo", type=int, default=1, metavar="N",
+                        help="Count the commits of one repository in up to N parallel git worktrees "
+                             "(checkout-based backends).")
+    parser.add_argument("--schedule", choices=["longest-first", "dataset-order"], default="longest-first",
+                        help="Order in which repositories are handed to the workers. longest-first uses "
+                             "task counts, LOC from existing *_loc_stats.csv files and past timings.")
+    parser.add_argument("--checkout-order", choices=["date", "nearest", "dataset"], default="date",
+                        help="Order in which a repository's commits are checked out: by commit date, "
+                             "greedy nearest neighbour by files changed (git diff), or dataset order. "
+                             "Output order is not affected.")
+    parser.add_argument("--retry-failed", type=int, default=1, metavar="N",
+                        help="Rounds of retrying failed tasks after the main pass (0 = no retries).")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue an interrupted run: keep the results in the output's .journal.jsonl "
+                             "and only analyze the remaining instances.")
+
+
+def parse_size(text):
+    """Parses a byte size such as '512M', '20G' or '1.5T' (powers of 1024)."""
+    units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+    text = text.strip().upper().removesuffix("B")
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+def format_size(num_bytes):
+    """Formats a byte count as e.g. '512 B', '3.4 MB' or '1.2 GB'."""
+    for unit in ["B", "KB", "MB", "GB"]:
+        if num_bytes < 1024 or unit == "GB":
+            return f"{num_bytes:.0f} {unit}" if unit == "B" else f"{num_bytes:.1f} {unit}"
+        num_bytes /= 1024
+
+
+def print_run_summary(options):
+    """Prints cache statistics for the run and releases the caches."""
+    if options.loc_cache is not None:
+        print(options.loc_cache.summary())
+        evicted = options.loc_cache.close()
+        if evicted:
+            print(f"Evicted {evicted} entries from the LOC cache.")
+
+
+def get_scc_version():
+    """Returns the `scc --version` string."""
+    result = subprocess.run(
+        ["scc", "--version"],
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return result.stdout.strip()
+
+
+def extra_stat_columns():
+    """Keys/CSV columns of the --extra-stats metrics, e.g. 'Python_files', 'Python_complexity'."""
+    return [f"{lang_name}_{name}" for name in EXTRA_STATS for lang_name in TARGET_LANGUAGES]
+
+
+def get_loc_counter_key(backend="scc", sparse_checkout=False, extra_stats=False):
+    """
+    Identifies everything besides the tree contents that affects the LOC
+    counts, so cached results are invalidated when the backend, scc, the
+    language mapping or the sparse checkout patterns change.
+    """
+    config = {
+        "backend": backend,
+        "languages": TARGET_LANGUAGES,
+        "aliases": LANGUAGE_ALIASES,
+    }
+    if sparse_checkout:
+        config["sparse_checkout"] = sparse_checkout_patterns(backend)
+    if extra_stats:
+        config["extra_stats"] = list(EXTRA_STATS)
+    if backend in SCC_BACKENDS:
+        # Batching scc invocations does not change the numbers.
+        config["backend"] = "scc"
+        config["scc"] = get_scc_version()
+    else:
+        from line_counter import COUNTER_VERSION
+        config["counter_version"] = COUNTER_VERSION
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()
+
+
 def check_scc_installed():
     """Verifies that scc is installed and accessible."""
     result = subprocess.run(
@@ -47,8 +324,13 @@ def check_scc_installed():
             "Please install it before running this script."
         )
 
-def get_loc_counts(repo_path):
-    """Runs scc on the specific path and returns a dict of {Language: CodeCount}."""
+def get_loc_counts(repo_path, extra_stats=False):
+    """
+    Runs scc on the specific path and returns a dict of {Language: CodeCount}.
+
+    With extra_stats the dict also holds the EXTRA_STATS metrics of the same
+    scc run, keyed as in extra_stat_columns().
+    """
     assert os.path.exists(repo_path), f"Repo path {repo_path} does not exist"
     assert os.path.isdir(repo_path), f"Repo path {repo_path} is not a directory"
     assert os.listdir(repo_path), f"Repo path {repo_path} is empty"
@@ -63,85 +345,1376 @@ def get_loc_counts(repo_path):
 
     # Parse result into a lookup dict
     lang_stats = {lang_name: 0 for lang_name in TARGET_LANGUAGES}
+    if extra_stats:
+        lang_stats.update((column, 0) for column in extra_stat_columns())
     for item in data:
-        lang_name = item["Name"]
-        if lang_name == "C Header":
-            lang_name = "C"
-        elif lang_name == "C++ Header":
-            lang_name = "C++"
-        if lang_name not in lang_stats:
+        lang_name = LANGUAGE_ALIASES.get(item["Name"], item["Name"])
+        if lang_name not in TARGET_LANGUAGES:
             continue
         lang_stats[lang_name] += item["Code"]
+        if extra_stats:
+            for name, scc_field in EXTRA_STATS.items():
+                lang_stats[f"{lang_name}_{name}"] += item[scc_field]
 
     return lang_stats
 
 
-def write_loc_stats_csv(output_file, results, eval_set):
+def get_file_loc_counts(repo_path, paths=None, batch_size=1000):
+    """
+    Runs scc with --by-file and returns {relative_path: (language, code)} for
+    files in TARGET_LANGUAGES (aliases folded, e.g. "C Header" -> "C").
+
+    Args:
+        repo_path: Checked out working tree
+        paths: Optional list of paths relative to repo_path to count instead
+               of the whole tree (passed to scc in batches of batch_size)
+    """
+    if paths is None:
+        batches = [["."]]
+    else:
+        batches = [paths[i:i + batch_size] for i in range(0, len(paths), batch_size)]
+
+    file_stats = {}
+    for batch in batches:
+        if not batch:
+            continue
+        result = subprocess.run(
+            ["scc", "--by-file", "--format", "json", "--"] + batch,
+            cwd=repo_path,
+            capture_output=True,
+            text=True,
+            check=True
+        )
+        for item in json.loads(result.stdout):
+            lang_name = LANGUAGE_ALIASES.get(item["Name"], item["Name"])
+            if lang_name not in TARGET_LANGUAGES:
+                continue
+            for file_item in item.get("Files") or []:
+                rel_path = os.path.relpath(os.path.join(repo_path, file_item["Location"]), repo_path)
+                file_stats[rel_path] = (lang_name, file_item["Code"])
+    return file_stats
+
+
+_FILES_KEY = re.compile(r'"Files"\s*:\s*\[')
+
+
+def iter_scc_files(stream, chunk_size=1 << 16):
+    """
+    Yields the per-file dicts of `scc --by-file --format json` output, read
+    from the text stream chunk_size characters at a time. Only one file entry
+    is decoded at a time, so the whole output never has to be held in memory.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    in_files = False
+    eof = False
+    while True:
+        if not in_files:
+            match = _FILES_KEY.search(buffer, pos)
+            if match:
+                in_files = True
+                pos = match.end()
+                continue
+            if eof:
+                return
+            # Keep a tail in case the key is split between two chunks.
+            buffer = buffer[max(pos, len(buffer) - 32):]
+            pos = 0
+        else:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buffer):
+                if buffer[pos] == "]":
+                    in_files = False
+                    pos += 1
+                    continue
+                try:
+                    item, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    # Usually an entry cut off at the end of the buffer.
+                    if eof:
+                        raise
+                else:
+                    yield item
+                    pos = end
+                    continue
+            elif eof:
+                raise ValueError("scc output ended inside a Files list")
+            buffer = buffer[pos:]
+            pos = 0
+        chunk = stream.read(chunk_size)
+        eof = not chunk
+        buffer += chunk
+
+
+def stream_scc_files(roots):
+    """
+    Runs one `scc --by-file` over roots and yields its per-file dicts while
+    scc is still writing them.
+    """
+    with tempfile.TemporaryFile() as stderr:
+        process = subprocess.Popen(
+            ["scc", "--by-file", "--format", "json", "--"] + list(roots),
+            stdout=subprocess.PIPE,
+            stderr=stderr,
+            text=True
+        )
+        try:
+            yield from iter_scc_files(process.stdout)
+        finally:
+            process.stdout.close()
+            returncode = process.wait()
+        if returncode != 0:
+            stderr.seek(0)
+            raise subprocess.CalledProcessError(returncode, process.args, stderr=stderr.read().decode(errors="replace"))
+
+
+def scc_file_language(item):
+    """Language of an scc per-file entry with aliases folded, or None outside TARGET_LANGUAGES."""
+    lang_name = LANGUAGE_ALIASES.get(item["Language"], item["Language"])
+    return lang_name if lang_name in TARGET_LANGUAGES else None
+
+
+def totals_from_files(files, extra_stats=False):
+    """
+    {language: code} summed over {path: (language, code, bytes, lines,
+    comment, blank, complexity)}, plus the EXTRA_STATS metrics with extra_stats.
+    """
+    lang_stats = {lang_name: 0 for lang_name in TARGET_LANGUAGES}
+    if extra_stats:
+        lang_stats.update((column, 0) for column in extra_stat_columns())
+    for language, code, *metrics in files.values():
+        lang_stats[language] += code
+        if extra_stats:
+            lang_stats[f"{language}_files"] += 1
+            for name, value in zip(["bytes", "lines", "comment", "blank", "complexity"], metrics):
+                lang_stats[f"{language}_{name}"] += value
+    return lang_stats
+
+
+class LocCounter:
+    """
+    Counts per-language LOC of checked out trees.
+
+    Subclasses implement count(); backends that can share work between trees
+    override count_many() and set batch_size above 1.
+    """
+    name = None
+    batch_size = 1
+
+    def count(self, path):
+        """Returns {language: code} for the tree at path."""
+        raise NotImplementedError
+
+    def count_many(self, paths):
+        """Returns a list of {language: code}, one per path."""
+        return [self.count(path) for path in paths]
+
+    def count_files_many(self, paths):
+        """
+        Returns a list of {relative_path: (language, code, bytes, lines,
+        comment, blank, complexity)}, one per path.
+        """
+        raise NotImplementedError(f"{self.name} does not report per-file counts")
+
+    def close(self):
+        """Releases processes or other resources held by the counter."""
+
+
+class SccCounter(LocCounter):
+    """One scc process per tree."""
+    name = "scc"
+
+    def __init__(self, extra_stats=False):
+        self.extra_stats = extra_stats
+
+    def count(self, path):
+        return get_loc_counts(path, self.extra_stats)
+
+
+class BatchedSccCounter(LocCounter):
+    """
+    One `scc --by-file` process over several trees; per-file results are
+    split back out by path prefix. Saves scc's start-up cost per commit.
+    """
+    name = "scc-batched"
+
+    def __init__(self, batch_size=16, extra_stats=False):
+        self.batch_size = batch_size
+        self.extra_stats = extra_stats
+
+    def count(self, path):
+        return self.count_many([path])[0]
+
+    def count_many(self, paths):
+        return [totals_from_files(files, self.extra_stats) for files in self.count_files_many(paths)]
+
+    def count_files_many(self, paths):
+        roots = [os.path.normpath(os.path.abspath(path)) for path in paths]
+        files = {root: {} for root in roots}
+        # Longest first, in case one root is a prefix of another's name
+        by_length = sorted(roots, key=len, reverse=True)
+        for file_item in stream_scc_files(roots):
+            lang_name = scc_file_language(file_item)
+            if lang_name is None:
+                continue
+            location = os.path.normpath(os.path.abspath(file_item["Location"]))
+            root = next((r for r in by_length if location.startswith(r + os.sep)), None)
+            if root is None:
+                raise RuntimeError(f"scc reported {file_item['Location']} outside of {roots}")
+            files[root][os.path.relpath(location, root)] = (
+                lang_name, file_item["Code"], file_item["Bytes"], file_item["Lines"],
+                file_item["Comment"], file_item["Blank"], file_item["Complexity"])
+        return [files[root] for root in roots]
+
+
+class PythonCounter(LocCounter):
+    """
+    The built-in line counter (see line_counter.py) on a checked out tree,
+    skipping .git and .gitignore'd files like scc does. Files are counted
+    in a process pool shared by all scan workers (see parallel_counter.py).
+    """
+    name = "python"
+
+    def __init__(self, processes=None):
+        from parallel_counter import ParallelLineCounter
+
+        self.counter = ParallelLineCounter(processes)
+
+    def count(self, path):
+        return self.counter.count(path)
+
+    def close(self):
+        self.counter.close()
+
+
+def make_loc_counter(options):
+    """The LocCounter for options.loc_backend (None for git-objects, which needs no checkout)."""
+    if options.loc_backend == "scc":
+        # Per-file counts need --by-file output, which the batched counter parses.
+        if options.file_index is None:
+            return SccCounter(options.extra_stats)
+        return BatchedSccCounter(1, options.extra_stats)
+    if options.loc_backend == "scc-batched":
+        return BatchedSccCounter(options.scan_batch_size, options.extra_stats)
+    if options.loc_backend == "python":
+        return PythonCounter()
+    return None
+
+
+def augmented_path_for(output_file):
+    """augmented/<name>_augmented.csv for a <name>.csv LOC stats file."""
+    root, ext = os.path.splitext(os.path.basename(output_file))
+    return os.path.join(AUGMENTED_DIR, f"{root}_augmented{ext}")
+
+
+def write_loc_stats_csv(output_file, results, eval_set, patches=None, columnar=False):
     """
     Writes LOC statistics to a CSV file with a standardized format.
 
     Args:
         output_file: Path to the output CSV file
         results: List of dicts with keys: 'instance_id', 'repo', 'commit', 'stats'
-                 where 'stats' is a dict of {language: line_count}
+                 where 'stats' is a dict of {language: line_count}, and optionally
+                 'extra' with the --extra-stats metrics (written as extra columns)
         eval_set: EvalSet enum value representing the evaluation set
+        patches: Optional {instance_id: golden patch}. If given, the same rows
+                 are also written with the patch statistics columns to
+                 augmented_path_for(output_file), as the augment scripts would.
+        columnar: Also write each CSV as a typed Arrow file next to it (see columnar.py)
     """
-    header = ["eval_set", "instance_id", "repo", "commit"] + TARGET_LANGUAGES
+    extra_columns = extra_stat_columns() if any('extra' in res for res in results) else []
+    header = ["eval_set", "instance_id", "repo", "commit"] + TARGET_LANGUAGES + extra_columns
     eval_set_name = eval_set.value if isinstance(eval_set, EvalSet) else eval_set
 
     results.sort(key=lambda r: r['repo'] + r['commit'])
+    rows = []
+    for res in results:
+        stats = res['stats']
+        row = [eval_set_name, res['instance_id'], res['repo'], res['commit']]
+        for lang in TARGET_LANGUAGES:
+            row.append(stats.get(lang, 0))
+        # Left empty for results counted without --extra-stats
+        extra = res.get('extra', {})
+        row.extend(extra.get(column, "") for column in extra_columns)
+        rows.append(row)
+
     with open(output_file, mode='w', newline='', encoding='utf-8') as f:
         writer = csv.writer(f)
         writer.writerow(header)
+        writer.writerows(rows)
+    print(f"Wrote {len(results)} rows to {output_file}")
+    if columnar:
+        from columnar import write_columnar_copy
+        write_columnar_copy(output_file, header, rows)
 
-        for res in results:
-            stats = res['stats']
-            row = [eval_set_name, res['instance_id'], res['repo'], res['commit']]
-            for lang in TARGET_LANGUAGES:
-                row.append(stats.get(lang, 0))
-            writer.writerow(row)
+    if patches is not None:
+        _write_augmented_csv(augmented_path_for(output_file), header, rows,
+                             [patches.get(res['instance_id']) for res in results], columnar)
 
-    print(f"Wrote {len(results)} rows to {output_file}")
 
+def _write_augmented_csv(augmented_file, header, rows, row_patches, columnar=False):
+    """Writes rows plus the patch statistics of row_patches (one patch or None per row)."""
+    from patch_stats import PATCH_COLUMNS, patch_columns, patch_stats_many
 
-def clone_repo_with_retry(repo_url, target_dir, max_retries=3):
-    """
-    Clones a repository with retry logic.
-    Uses --filter=blob:none for faster cloning.
-    """
+    missing_patches = sum(1 for patch in row_patches if not patch)
+    stats = patch_stats_many(row_patches)
+    header = header + PATCH_COLUMNS
+    rows = [row + list(patch_columns(patch_stats).values()) for row, patch_stats in zip(rows, stats)]
+    os.makedirs(os.path.dirname(augmented_file), exist_ok=True)
+    with open(augmented_file, mode='w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+    print(f"Wrote {len(rows)} rows to {augmented_file}")
+    if columnar:
+        from columnar import write_columnar_copy
+        write_columnar_copy(augmented_file, header, rows)
+    if missing_patches:
+        print(f"Warning: {missing_patches} rows had missing patches.")
+
+
+def _run_with_retry(cmd, description, max_retries=3, cwd=None):
+    """Runs a git command, retrying up to max_retries times on failure."""
     for attempt in range(max_retries):
         try:
             subprocess.run(
-                ["git", "clone", repo_url, target_dir],
+                cmd,
+                cwd=cwd,
                 check=True,
                 capture_output=True # Silence git output to avoid messy logs
             )
             return
         except subprocess.CalledProcessError as e:
             if attempt < max_retries - 1:
-                print(f"Error cloning {repo_url} (attempt {attempt+1}/{max_retries}): {e}. Retrying in 5 seconds...")
+                print(f"Error {description} (attempt {attempt+1}/{max_retries}): {e}. Retrying in 5 seconds...")
                 time.sleep(5)
             else:
                 raise e
 
 
+def repo_slug_from_url(repo_url):
+    """Returns 'org/repo' for a GitHub (or file://) repository URL."""
+    path = repo_url.rstrip("/")
+    if path.endswith(".git"):
+        path = path[:-len(".git")]
+    return "/".join(path.split("/")[-2:])
+
+
+def get_mirror_path(repo_url, mirror_dir):
+    """Location of the bare mirror of repo_url inside mirror_dir."""
+    return os.path.join(mirror_dir, repo_slug_from_url(repo_url) + ".git")
+
+
+_mirror_locks = defaultdict(threading.Lock)
+_mirror_locks_guard = threading.Lock()
+
+
+def _mirror_lock(mirror_path):
+    with _mirror_locks_guard:
+        return _mirror_locks[mirror_path]
+
+
+def has_commit(git_dir, commit_sha):
+    """Returns True if commit_sha exists in the repository at git_dir."""
+    result = subprocess.run(
+        ["git", "--git-dir", git_dir, "cat-file", "-e", f"{commit_sha}^{{commit}}"],
+        capture_output=True
+    )
+    return result.returncode == 0
+
+
+# Refs in a mirror pinning commits that were fetched by SHA, which no branch
+# or tag points at; without them `git gc` could drop the commits again.
+KEEP_REF_PREFIX = "refs/keep/"
+
+
+def ensure_mirror(repo_url, mirror_dir, commits=(), max_retries=3):
+    """
+    Returns the path of a bare mirror of repo_url that contains `commits`.
+
+    The mirror is created with `git clone --mirror` on first use. After that the
+    network is only touched when one of `commits` is missing, in which case an
+    incremental fetch is done (falling back to fetching the SHA directly and
+    pinning it under KEEP_REF_PREFIX).
+    """
+    mirror_path = get_mirror_path(repo_url, mirror_dir)
+    with _mirror_lock(mirror_path):
+        if not os.path.isdir(mirror_path):
+            parent = os.path.dirname(mirror_path)
+            os.makedirs(parent, exist_ok=True)
+            # Clone next to the final location and rename, so an interrupted
+            # clone never leaves a half-populated mirror behind.
+            tmp_path = tempfile.mkdtemp(dir=parent, prefix=".tmp_")
+            try:
+                print(f"Creating mirror of {repo_url} in {mirror_path}...")
+                _run_with_retry(["git", "clone", "--mirror", repo_url, tmp_path],
+                                f"mirroring {repo_url}", max_retries)
+                os.rename(tmp_path, mirror_path)
+            finally:
+                shutil.rmtree(tmp_path, ignore_errors=True)
+
+        missing = [sha for sha in commits if not has_commit(mirror_path, sha)]
+        if missing:
+            print(f"Mirror of {repo_url} is missing {len(missing)} commit(s), fetching...")
+            # The negative refspec keeps --prune away from the pinned commits.
+            _run_with_retry(["git", "--git-dir", mirror_path, "fetch", "--prune", "origin",
+                             "+refs/*:refs/*", f"^{KEEP_REF_PREFIX}*"],
+                            f"fetching {repo_url}", max_retries)
+            for sha in missing:
+                if has_commit(mirror_path, sha):
+                    continue
+                # Commits that are no longer reachable from any ref (e.g.
+                # force-pushed PR branches) can still be fetched by SHA.
+                result = subprocess.run(
+                    ["git", "--git-dir", mirror_path, "fetch", "origin", sha],
+                    capture_output=True
+                )
+                if result.returncode != 0:
+                    print(f"Warning: commit {sha} not found in {repo_url}")
+                    continue
+                subprocess.run(
+                    ["git", "--git-dir", mirror_path, "update-ref", KEEP_REF_PREFIX + sha, sha],
+                    check=True,
+                    capture_output=True
+                )
+    return mirror_path
+
+
+def clone_repo_with_retry(repo_url, target_dir, max_retries=3, mirror_dir=None, commits=(),
+                          no_checkout=False):
+    """
+    Clones a repository with retry logic.
+
+    When mirror_dir is given the clone is made from a persistent bare mirror
+    (see ensure_mirror) using git alternates, so no objects are copied and the
+    network is only used if one of `commits` is not in the mirror yet. Clones
+    from the mirror never check out a working tree.
+    """
+    if mirror_dir is None:
+        cmd = ["git", "clone"] + (["--no-checkout"] if no_checkout else []) + [repo_url, target_dir]
+        _run_with_retry(cmd, f"cloning {repo_url}", max_retries)
+        return
+
+    mirror_path = ensure_mirror(repo_url, mirror_dir, commits, max_retries)
+    _run_with_retry(["git", "clone", "--shared", "--no-checkout", mirror_path, target_dir],
+                    f"cloning {mirror_path}", max_retries)
+
+
+def get_tree_sha(repo_path, commit_sha):
+    """Returns the root tree SHA of commit_sha (no checkout needed)."""
+    result = subprocess.run(
+        ["git", "rev-parse", f"{commit_sha}^{{tree}}"],
+        cwd=repo_path,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return result.stdout.strip()
+
+
 def checkout_with_retry(repo_path, commit_sha, max_retries=3):
     """
     Checks out a specific commit with retry logic.
     """
-    for attempt in range(max_retries):
-        try:
-            subprocess.run(
-                ["git", "checkout", "-f", commit_sha],
-                cwd=repo_path,
-                check=True,
-                capture_output=True
-            )
+    _run_with_retry(["git", "checkout", "-f", commit_sha],
+                    f"checking out {commit_sha} in {repo_path}", max_retries, cwd=repo_path)
+
+
+def _case_insensitive_glob(text):
+    """'.py' -> '.[pP][yY]', since scc matches extensions and file names case-insensitively."""
+    return "".join(f"[{c.lower()}{c.upper()}]" if c.isalpha() else c for c in text)
+
+
+@functools.cache
+def get_scc_extensions():
+    """
+    Extensions (without the dot) that the installed scc maps to one of
+    TARGET_LANGUAGES, read from its own language table (`scc --languages`).
+    """
+    result = subprocess.run(
+        ["scc", "--languages"],
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    extensions = set()
+    for line in result.stdout.splitlines():
+        # e.g. "C++ Header (h,hh,hpp,hxx,h++,inl,ipp,ixx,tpp)"
+        match = re.fullmatch(r"(.+) \(([^()]*)\)", line.strip())
+        if match and LANGUAGE_ALIASES.get(match[1], match[1]) in TARGET_LANGUAGES:
+            extensions.update(ext for ext in match[2].split(",") if ext)
+    return sorted(extensions)
+
+
+def sparse_checkout_patterns(backend="scc"):
+    """
+    Non-cone sparse checkout patterns for the files backend may count as one
+    of TARGET_LANGUAGES, plus the ignore files scc honours.
+
+    The extensions come from scc's own language table for the scc backends
+    and from line_counter's tables otherwise. Files without an extension are
+    always kept, since scc detects their language from a shebang line.
+    """
+    from incremental_loc import IGNORE_FILES
+    from line_counter import EXTENSIONS, FILENAMES
+
+    # Every file whose name has no dot, in any directory
+    patterns = ["*", "!*.*", "*/"]
+    if backend in SCC_BACKENDS:
+        patterns += [f"*.{_case_insensitive_glob(ext)}" for ext in get_scc_extensions()]
+    else:
+        patterns += [f"*{_case_insensitive_glob(ext)}" for ext in sorted(EXTENSIONS)]
+        patterns += [_case_insensitive_glob(name) for name in sorted(FILENAMES)]
+    patterns += sorted(IGNORE_FILES)
+    return patterns
+
+
+def clone_partial_with_retry(repo_url, target_dir, max_retries=3):
+    """
+    Blobless (--filter=blob:none) clone without a checkout: only commits and
+    trees are downloaded, blobs are fetched on demand when they are checked out.
+    """
+    _run_with_retry(["git", "clone", "--filter=blob:none", "--no-checkout", repo_url, target_dir],
+                    f"partially cloning {repo_url}", max_retries)
+
+
+def shallow_fetch(repo_url, target_dir, commits, blobless=False):
+    """
+    Creates a repository at target_dir holding only `commits`, each fetched
+    with --depth 1 (the remote must allow fetching by SHA, as GitHub does).
+
+    Returns {sha: CalledProcessError} for the commits that could not be
+    fetched; they are left out. Raises if none of them could be fetched
+    (e.g. the repository does not exist).
+
+    Args:
+        blobless: Also leave out blobs (--filter=blob:none); they are fetched on checkout
+    """
+    subprocess.run(["git", "init", "-q", target_dir], check=True, capture_output=True)
+    subprocess.run(["git", "remote", "add", "origin", repo_url], cwd=target_dir, check=True,
+                   capture_output=True)
+    fetch = ["git", "fetch", "-q", "--depth", "1"]
+    if blobless:
+        for key, value in [("remote.origin.promisor", "true"),
+                           ("remote.origin.partialclonefilter", "blob:none")]:
+            subprocess.run(["git", "config", key, value], cwd=target_dir, check=True)
+        fetch.append("--filter=blob:none")
+
+    # One round trip for all commits. A single unknown SHA fails the whole
+    # batch, so on failure fetch them one by one right away (no retries:
+    # commits that still fail are retried with the other failed tasks).
+    try:
+        subprocess.run(fetch + ["origin"] + list(commits), cwd=target_dir, check=True, capture_output=True)
+        return {}
+    except subprocess.CalledProcessError as batch_error:
+        errors = {}
+        for sha in commits:
+            try:
+                subprocess.run(fetch + ["origin", sha], cwd=target_dir, check=True, capture_output=True)
+            except subprocess.CalledProcessError as exc:
+                errors[sha] = exc
+        if len(errors) == len(commits):
+            raise batch_error
+        return errors
+
+
+def set_sparse_checkout(worktree_path, backend="scc"):
+    """Restricts checkouts in worktree_path to sparse_checkout_patterns(backend)."""
+    subprocess.run(
+        ["git", "sparse-checkout", "set", "--no-cone"] + sparse_checkout_patterns(backend),
+        cwd=worktree_path,
+        check=True,
+        capture_output=True
+    )
+
+
+def get_object_store_size(git_dir):
+    """Bytes of objects stored in the repository at git_dir (loose and packed)."""
+    result = subprocess.run(
+        ["git", "--git-dir", git_dir, "count-objects", "-v"],
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    counts = dict(line.split(": ", 1) for line in result.stdout.splitlines() if ": " in line)
+    return (int(counts.get("size", 0)) + int(counts.get("size-pack", 0))) * 1024
+
+
+def get_worktree_size(worktree_path):
+    """Bytes of the files checked out in worktree_path (excluding .git)."""
+    total = 0
+    for root, dirs, files in os.walk(worktree_path):
+        dirs[:] = [d for d in dirs if d != ".git"]
+        for name in files:
+            path = os.path.join(root, name)
+            # Linked worktrees have a .git file pointing at the main repository
+            if name != ".git" and not os.path.islink(path):
+                total += os.path.getsize(path)
+    return total
+
+
+def estimate_checkout_size(repo_path, commit_sha):
+    """Returns the total size in bytes of the files in commit_sha's tree (no checkout needed)."""
+    result = subprocess.run(
+        ["git", "ls-tree", "-r", "-l", "-z", "--full-tree", commit_sha],
+        cwd=repo_path,
+        capture_output=True,
+        check=True
+    )
+    total = 0
+    for entry in result.stdout.split(b"\0"):
+        # "<mode> <type> <sha> <size>\t<path>", size is "-" for non-blobs
+        size = entry.split(b"\t", 1)[0].split()[-1:] if entry else None
+        if size and size[0].isdigit():
+            total += int(size[0])
+    return total
+
+
+def add_worktrees(repo_path, target_dirs, commit_sha):
+    """Adds detached, not yet checked out worktrees of repo_path at target_dirs."""
+    for target_dir in target_dirs:
+        subprocess.run(
+            ["git", "worktree", "add", "--detach", "--no-checkout", target_dir, commit_sha],
+            cwd=repo_path,
+            check=True,
+            capture_output=True
+        )
+
+
+def plan_worktree_pool(tasks, options, checkout_size, free_bytes=None):
+    """
+    Number of worktrees to check tasks out in: at most options.worktrees_per_repo
+    and one per task, reduced so checkouts of checkout_size bytes fit in
+    free_bytes (what --disk-budget leaves).
+    """
+    pool_size = max(1, min(options.worktrees_per_repo, len(tasks)))
+    if free_bytes is not None and checkout_size > 0:
+        pool_size = max(1, min(pool_size, free_bytes // checkout_size))
+    return pool_size
+
+
+@dataclass
+class CommitFailure:
+    """A task that could not be analyzed, and where it failed."""
+    instance_id: str
+    repo: str
+    commit: str
+    stage: str  # "fetch", "checkout" or "count"
+    error: str
+    stderr_tail: str = ""
+    attempts: int = 1
+
+
+def _stderr_tail(exc, max_lines=20):
+    """Last lines of the stderr captured by a failed subprocess, or ''."""
+    stderr = getattr(exc, "stderr", None)
+    if not stderr:
+        return ""
+    if isinstance(stderr, bytes):
+        stderr = stderr.decode(errors="replace")
+    return "\n".join(stderr.strip().splitlines()[-max_lines:])
+
+
+def failures_path_for(output_file):
+    """Failure summary kept next to output_file, e.g. foo_loc_stats.failures.json."""
+    return os.path.splitext(output_file)[0] + ".failures.json"
+
+
+def write_failure_summary(path, failures):
+    """Writes the failures left after retrying to path (removing a stale file if there are none)."""
+    if not failures:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump([asdict(failure) for failure in failures], f, indent=1)
+    by_stage = defaultdict(int)
+    for failure in failures:
+        by_stage[failure.stage] += 1
+    stages = ", ".join(f"{count} in {stage}" for stage, count in sorted(by_stage.items()))
+    print(f"{len(failures)} tasks failed ({stages}); details in {path}")
+
+
+class _Slot:
+    """
+    A place where one commit at a time is counted: a worktree checked out for
+    the scc/incremental backends, or a blob reader for git-objects.
+    """
+
+    def __init__(self, path, counter=None, needs_checkout=True):
+        self.path = path
+        self.counter = counter
+        self.needs_checkout = needs_checkout
+
+    def reset(self):
+        """Drops counter state that a failed count may have left inconsistent."""
+        if self.counter is not None:
+            self.counter.reset()
+
+
+class _RepoJob:
+    """A repository moving through the fetch -> materialise -> count pipeline."""
+
+    def __init__(self, repo_name, tasks, repo_url):
+        self.repo_name = repo_name
+        self.tasks = tasks
+        self.repo_url = repo_url
+        self.temp_dir = None
+        self.repo_path = None
+        self.pending = []  # (task, tree_sha) still to be counted
+        self.results = []
+        self.slots = []
+        self.free_slots = queue.Queue()
+        self.remaining = 0
+        self.failed_ids = set()
+        self.bytes_written = 0  # sparse checkout: bytes checked out over all commits
+        self.files_rewritten = 0  # files the planned checkout order rewrites after the first commit
+        self.checkouts = 0
+        self.counted = 0  # results counted rather than taken from the LOC cache
+        self.start = None
+        self.lock = threading.Lock()
+
+
+class AnalysisPipeline:
+    """
+    Counts LOC for many repositories in three stages connected by bounded
+    queues, each with its own thread pool:
+
+    1. fetch: clone (through the mirror), resolve LOC cache hits and set up
+       the worktree pool of a repository (network bound)
+    2. materialise: check a commit out into a free worktree (disk bound)
+    3. count: run the LOC backend on the checked out worktree (CPU bound)
+
+    So the next repository is being fetched, and the next commit checked out,
+    while the current one is being counted.
+
+    Args:
+        options: AnalysisOptions
+        on_repo_finished: Optional callback(repo_name, start, end, results, counted), counted
+                          being the number of results not taken from the LOC cache
+        journal: Optional journal.ResultJournal each result is appended to as soon as it is known
+        fetch_planner: fetch_strategy.FetchPlanner deciding between full clones and
+                       shallow fetches (default: one built from options)
+        disk_budget: scheduling.DiskBudget admitting repositories into the scratch
+                     directory (default: one built from options)
+    """
+
+    def __init__(self, options, on_repo_finished=None, journal=None, fetch_planner=None,
+                 disk_budget=None):
+        from scheduling import DiskBudget
+
+        self.options = options
+        self.scratch_dir = options.scratch_dir or os.getcwd()
+        os.makedirs(self.scratch_dir, exist_ok=True)
+        self.disk_budget = disk_budget or DiskBudget(options.disk_budget, self.scratch_dir)
+        self.journal = journal
+        self.loc_counter = make_loc_counter(options)
+        self.fetch_planner = fetch_planner or FetchPlanner(
+            os.path.join(options.cache_dir, "fetch_sizes.json"),
+            options.fetch_strategy, options.shallow_max_tasks)
+        self.fetch_workers = options.fetch_workers or options.max_workers
+        self.checkout_workers = options.checkout_workers or options.max_workers
+        self.scan_workers = options.scan_workers or options.max_workers
+        self.on_repo_finished = on_repo_finished
+        self.busy = defaultdict(float)  # stage -> seconds spent working
+        self.failures = []  # CommitFailure
+        self.results_map = {} # instance_id -> result_dict
+        self._lock = threading.Lock()
+        self._repos = queue.Queue()
+        # Bounded so fetching only runs a little ahead of checkouts, and
+        # checkouts only a little ahead of counting.
+        self._fetched = queue.Queue(maxsize=self.fetch_workers)
+        self._checked_out = queue.Queue(maxsize=2 * self.scan_workers)
+        self._finished_count = 0
+        self._total_repos = 0
+
+    def run(self, repo_groups, order=None):
+        """
+        Processes repo_groups (repo_name -> tasks with 'instance_id' and
+        'commit'), dispatching repositories in `order`.
+
+        Returns a dict of instance_id -> result dict.
+        """
+        order = order or list(repo_groups)
+        self._total_repos = len(order)
+        for repo_name in order:
+            self._repos.put(_RepoJob(repo_name, repo_groups[repo_name], self.options.repo_url(repo_name)))
+
+        print(f"Starting pipeline with {self.fetch_workers} fetch, {self.checkout_workers} checkout "
+              f"and {self.scan_workers} scan workers...")
+        stages = [
+            (self._fetch_worker, self.fetch_workers, self._fetched, self.checkout_workers),
+            (self._materialise_worker, self.checkout_workers, self._checked_out, self.scan_workers),
+            (self._count_worker, self.scan_workers, None, 0),
+        ]
+        threads = []
+        for worker, count, _, _ in stages:
+            stage_threads = [threading.Thread(target=worker, daemon=True) for _ in range(count)]
+            for thread in stage_threads:
+                thread.start()
+            threads.append(stage_threads)
+
+        # Shut the stages down in order: once a stage is drained, tell the
+        # next one there is no more input.
+        for stage_threads, (_, _, next_queue, next_count) in zip(threads, stages):
+            for thread in stage_threads:
+                thread.join()
+            for _ in range(next_count):
+                next_queue.put(None)
+
+        if self.loc_counter is not None:
+            self.loc_counter.close()
+        return self.results_map
+
+    def report(self, wall_seconds):
+        """Prints how busy each stage was."""
+        parts = []
+        for stage, workers in [("fetch", self.fetch_workers), ("checkout", self.checkout_workers),
+                               ("count", self.scan_workers)]:
+            utilisation = self.busy[stage] / (workers * wall_seconds) * 100 if wall_seconds > 0 else 0
+            parts.append(f"{stage} {utilisation:.1f}%")
+        print(f"Stage utilisation: {', '.join(parts)}")
+
+    def _add_busy(self, stage, start):
+        with self._lock:
+            self.busy[stage] += time.monotonic() - start
+
+    def _fail(self, job, task, stage, exc):
+        """Records that one task of job failed in `stage`; the other tasks carry on."""
+        failure = CommitFailure(
+            instance_id=task['instance_id'],
+            repo=job.repo_name,
+            commit=task['commit'],
+            stage=stage,
+            error=str(exc),
+            stderr_tail=_stderr_tail(exc),
+        )
+        print(f"Error processing {job.repo_name} {task['instance_id']} ({stage}): {exc}")
+        with job.lock:
+            job.failed_ids.add(task['instance_id'])
+        with self._lock:
+            self.failures.append(failure)
+
+    def _fetch(self, job):
+        options = self.options
+        print(f"Processing Repo: {job.repo_name} ({len(job.tasks)} items)")
+
+        # Use a unique prefix to avoid collisions in parallel execution
+        prefix = job.repo_name.replace("/", "_") + "_"
+        job.temp_dir = tempfile.mkdtemp(dir=self.scratch_dir, prefix=prefix)
+        job.repo_path = os.path.join(job.temp_dir, "repo")
+
+        # 1. Fetch the commits: a full clone (through the local mirror when
+        # enabled) or shallow fetches of just the task commits
+        errors = self._fetch_commits(job)
+
+        # 2. Identical trees give identical counts, so a cache hit skips both
+        # the checkout and the count.
+        for task in job.tasks:
+            if task['commit'] in errors:
+                self._fail(job, task, "fetch", errors[task['commit']])
+                continue
+            tree_sha = None
+            if options.loc_cache is not None:
+                tree_sha = get_tree_sha(job.repo_path, task['commit'])
+                # Without its per-file rows the commit has to be counted again.
+                indexed = options.file_index is None or options.file_index.has(job.repo_name, task['commit'])
+                stats = options.loc_cache.get(tree_sha) if indexed else None
+                if stats is not None:
+                    self._record(job, task, stats)
+                    continue
+            job.pending.append((task, tree_sha))
+
+        if not job.pending:
             return
-        except subprocess.CalledProcessError as e:
-            if attempt < max_retries - 1:
-                print(f"Error checking out {commit_sha} in {repo_path} (attempt {attempt+1}/{max_retries}): {e}. Retrying in 5 seconds...")
-                time.sleep(5)
+
+        # 3. Set up the slots the commits are counted in, reserving the
+        # scratch space they need
+        clone_size = get_object_store_size(os.path.join(job.repo_path, ".git"))
+        if options.loc_backend == "git-objects":
+            from git_object_loc import BlobCounts, GitObjectLocCounter
+            pool_size = max(1, min(options.worktrees_per_repo, len(job.pending)))
+            self._reserve_scratch(job, clone_size)
+            # One memo per repository, so each blob is counted once across all slots
+            blob_counts = BlobCounts()
+            job.slots = [_Slot(job.repo_path, GitObjectLocCounter(job.repo_path, blob_counts), needs_checkout=False)
+                         for _ in range(pool_size)]
+        else:
+            from scheduling import order_checkouts
+            # Successive checkouts of nearby commits rewrite fewer files;
+            # results are put back in dataset order when they are written.
+            job.pending, job.files_rewritten = order_checkouts(job.repo_path, job.pending, options.checkout_order)
+            job.checkouts = len(job.pending)
+            checkout_size = 0
+            # Sizing a blobless clone's checkout would download every blob.
+            if not options.sparse_checkout and options.disk_budget:
+                checkout_size = estimate_checkout_size(
+                    job.repo_path, job.pending[0][0]['commit'])
+            free_bytes = self.disk_budget.available(job)
+            if free_bytes is not None:
+                free_bytes -= clone_size
+            pool_size = plan_worktree_pool(job.pending, options, checkout_size, free_bytes)
+            self._reserve_scratch(job, clone_size + pool_size * checkout_size)
+            paths = [job.repo_path] + [os.path.join(job.temp_dir, f"worktree_{i}")
+                                       for i in range(1, pool_size)]
+            # Each task commit is checked out later; this is only where worktrees start.
+            add_worktrees(job.repo_path, paths[1:], job.pending[0][0]['commit'])
+            if options.sparse_checkout:
+                for path in paths:
+                    set_sparse_checkout(path, options.loc_backend)
+            if pool_size > 1:
+                print(f"{job.repo_name}: counting {len(job.pending)} commits in {pool_size} worktrees")
+            if options.incremental and options.loc_backend in SCC_BACKENDS:
+                from incremental_loc import IncrementalLocCounter
+                job.slots = [_Slot(path, IncrementalLocCounter(path, options.verify_incremental))
+                             for path in paths]
             else:
-                raise e
+                job.slots = [_Slot(path) for path in paths]
+        for slot in job.slots:
+            job.free_slots.put(slot)
+
+    def _reserve_scratch(self, job, nbytes):
+        """Grows job's scratch reservation to nbytes once the clone's real size is known."""
+        if self.disk_budget.capacity is None:
+            # Checkout sizes are only measured when there is a budget to enforce.
+            return
+        self.fetch_planner.record_scratch(job.repo_name, nbytes)
+        if nbytes > self.disk_budget.held(job):
+            self.disk_budget.acquire(job, nbytes)
+
+    def _fetch_commits(self, job):
+        options = self.options
+        commits = list(dict.fromkeys(task['commit'] for task in job.tasks))
+        sparse = options.sparse_checkout and options.loc_backend != "git-objects"
+        mirror_path = None
+        if options.mirror_dir is not None and not sparse:
+            mirror_path = get_mirror_path(job.repo_url, options.mirror_dir)
+        strategy, reason = self.fetch_planner.choose(
+            job.repo_name, len(commits), blobless=sparse,
+            mirror_exists=mirror_path is not None and os.path.isdir(mirror_path))
+
+        start = time.monotonic()
+        errors = {}
+        if strategy == "shallow":
+            errors = shallow_fetch(job.repo_url, job.repo_path, commits, blobless=sparse)
+        elif sparse:
+            clone_partial_with_retry(job.repo_url, job.repo_path)
+        else:
+            clone_repo_with_retry(job.repo_url, job.repo_path, mirror_dir=options.mirror_dir,
+                                  commits=commits, no_checkout=True)
+        seconds = time.monotonic() - start
+        git_dir = os.path.join(job.repo_path, ".git")
+        for sha in commits:
+            if sha not in errors and not has_commit(git_dir, sha):
+                errors[sha] = LookupError(f"commit {sha} not found in {job.repo_url}")
+
+        # A clone from the mirror shares its objects, so the mirror holds the full-clone size.
+        if strategy == "full" and mirror_path:
+            git_dir = mirror_path
+        fetched = get_object_store_size(git_dir)
+        self.fetch_planner.record(job.repo_name, strategy, fetched, len(commits), blobless=sparse)
+        missing = f", {len(errors)} not found" if errors else ""
+        print(f"{job.repo_name}: {strategy} fetch of {len(commits)} commits ({reason}): "
+              f"{format_size(fetched)} in {seconds:.1f}s{missing}")
+        return errors
+
+    def _fetch_worker(self):
+        while True:
+            try:
+                job = self._repos.get_nowait()
+            except queue.Empty:
+                return
+            # Admission control: wait until the space this repository needed
+            # last time fits in the scratch budget (unknown sizes go one at a time).
+            sparse = self.options.sparse_checkout and self.options.loc_backend != "git-objects"
+            commit_count = len({task['commit'] for task in job.tasks})
+            self.disk_budget.acquire(job, self.fetch_planner.scratch_bytes(job.repo_name, commit_count, sparse))
+            job.start = time.monotonic()
+            try:
+                self._fetch(job)
+            except Exception as exc:
+                # Without a clone none of the remaining tasks can run
+                done = {res['instance_id'] for res in job.results} | job.failed_ids
+                for task in job.tasks:
+                    if task['instance_id'] not in done:
+                        self._fail(job, task, "fetch", exc)
+                job.pending = []
+            self._add_busy("fetch", job.start)
+
+            job.remaining = len(job.pending)
+            if job.remaining:
+                self._fetched.put(job)
+            else:
+                self._finish(job)
+
+    def _materialise_worker(self):
+        while True:
+            job = self._fetched.get()
+            if job is None:
+                return
+            for task, tree_sha in job.pending:
+                slot = job.free_slots.get()
+                start = time.monotonic()
+                try:
+                    if slot.needs_checkout:
+                        # Force checkout the specific commit
+                        checkout_with_retry(slot.path, task['commit'])
+                        if self.options.sparse_checkout:
+                            written = get_worktree_size(slot.path)
+                            with job.lock:
+                                job.bytes_written += written
+                except Exception as exc:
+                    self._fail(job, task, "checkout", exc)
+                    self._release(job, slot)
+                    continue
+                finally:
+                    self._add_busy("checkout", start)
+                self._checked_out.put((job, task, tree_sha, slot))
+
+    def _take_batch(self):
+        """Up to loc_counter.batch_size checked out commits; [] once the stage is shut down."""
+        item = self._checked_out.get()
+        if item is None:
+            return []
+        batch = [item]
+        batch_size = self.loc_counter.batch_size if self.loc_counter is not None else 1
+        while len(batch) < batch_size:
+            try:
+                item = self._checked_out.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Leave the shutdown signal for the next _take_batch
+                self._checked_out.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _count_worker(self):
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                return
+            start = time.monotonic()
+            stats_list = [None] * len(batch)
+            plain = [i for i, (_, _, _, slot) in enumerate(batch) if slot.counter is None]
+            if len(plain) > 1:
+                try:
+                    counted = self._count_trees([batch[i] for i in plain])
+                    for i, stats in zip(plain, counted):
+                        stats_list[i] = stats
+                except Exception as exc:
+                    # Count them one by one, so the failure lands on the right commit
+                    print(f"Batched count failed ({exc}), counting {len(plain)} commits separately")
+
+            for (job, task, tree_sha, slot), stats in zip(batch, stats_list):
+                try:
+                    if stats is None:
+                        stats = self._count((job, task, tree_sha, slot))
+                    if self.options.loc_cache is not None:
+                        self.options.loc_cache.put(tree_sha, stats)
+                    self._record(job, task, stats, counted=True)
+                except Exception as exc:
+                    self._fail(job, task, "count", exc)
+                    slot.reset()
+                finally:
+                    self._release(job, slot)
+            self._add_busy("count", start)
+
+    def _count_trees(self, items):
+        """Counts the checked out trees of (job, task, tree_sha, slot) items in one loc_counter call."""
+        paths = [slot.path for _, _, _, slot in items]
+        file_index = self.options.file_index
+        if file_index is None:
+            return self.loc_counter.count_many(paths)
+
+        files_list = self.loc_counter.count_files_many(paths)
+        totals = [totals_from_files(files, self.options.extra_stats) for files in files_list]
+        # Only indexed once the whole batch is counted; a failed batch is recounted one by one
+        for (job, task, _, _), files in zip(items, files_list):
+            file_index.add(job.repo_name, task['commit'], files)
+        return totals
+
+    def _count(self, item):
+        _, task, _, slot = item
+        commit_sha = task['commit']
+        if slot.counter is None:
+            # Run Analysis
+            return self._count_trees([item])[0]
+        if slot.needs_checkout:
+            # Incremental: the commit is already checked out
+            return slot.counter.count(commit_sha, checkout=False)
+        # git-objects: reads blobs straight from git, no checkout
+        return slot.counter.count(commit_sha)
+
+    def _record(self, job, task, stats, counted=False):
+        result = _make_result(job.repo_name, task, stats)
+        if self.journal is not None:
+            self.journal.append(result)
+        with job.lock:
+            job.results.append(result)
+            job.counted += counted
+
+    def _release(self, job, slot):
+        """Returns a slot after one task of job is done, finishing the job after its last task."""
+        job.free_slots.put(slot)
+        with job.lock:
+            job.remaining -= 1
+            done = job.remaining == 0
+        if done:
+            self._finish(job)
+
+    def _report_sparse_savings(self, job):
+        """Prints bytes fetched and written by the sparse checkout, against a full clone from the mirror."""
+        fetched = get_object_store_size(os.path.join(job.repo_path, ".git"))
+        full_fetched = full_written = None
+        mirror_dir = self.options.mirror_dir
+        if mirror_dir is not None and os.path.isdir(get_mirror_path(job.repo_url, mirror_dir)):
+            # A mirror left by an earlier full run holds every blob, so it
+            # gives the full-clone baseline without any network traffic.
+            mirror_path = get_mirror_path(job.repo_url, mirror_dir)
+            full_fetched = get_object_store_size(mirror_path)
+            counted = {res['instance_id'] for res in job.results}
+            full_written = sum(estimate_checkout_size(mirror_path, task['commit'])
+                               for task, _ in job.pending if task['instance_id'] in counted)
+
+        def baseline(value):
+            return format_size(value) if value is not None else "n/a, no mirror"
+
+        print(f"{job.repo_name}: sparse checkout fetched {format_size(fetched)} "
+              f"(full clone: {baseline(full_fetched)}), wrote {format_size(job.bytes_written)} "
+              f"(full checkout: {baseline(full_written)})")
+
+    def _finish(self, job):
+        for slot in job.slots:
+            if slot.counter is None:
+                continue
+            if hasattr(slot.counter, "close"):
+                slot.counter.close()
+            print(f"{job.repo_name} [{os.path.basename(slot.path)}]: {slot.counter.summary()}")
+        if job.checkouts:
+            print(f"{job.repo_name}: {job.checkouts} checkouts rewrote {job.files_rewritten} files "
+                  f"({self.options.checkout_order} order)")
+        if self.options.sparse_checkout and job.slots and job.slots[0].needs_checkout:
+            try:
+                self._report_sparse_savings(job)
+            except subprocess.CalledProcessError as exc:
+                print(f"{job.repo_name}: could not measure sparse checkout savings: {exc}")
+        if job.temp_dir is not None:
+            shutil.rmtree(job.temp_dir, ignore_errors=True)
+        self.disk_budget.release(job)
+        if self.options.file_index is not None:
+            self.options.file_index.flush(job.repo_name)
+        end = time.monotonic()
+
+        with self._lock:
+            for res in job.results:
+                self.results_map[res['instance_id']] = res
+            if self.on_repo_finished is not None:
+                self.on_repo_finished(job.repo_name, job.start, end, job.results, job.counted)
+            self._finished_count += 1
+            print(f"Finished {job.repo_name}")
+            print(f"Progress: {self._finished_count}/{self._total_repos} repos processed.")
+
+
+def _make_result(repo_name, task, stats):
+    result = {
+        "instance_id": task['instance_id'],
+        "repo": repo_name,
+        "commit": task['commit'],
+        "stats": {lang: stats[lang] for lang in TARGET_LANGUAGES}
+    }
+    if 'instance_ids' in task:
+        # A WorkPlan work item: the journal also lists the dataset instances
+        result["instance_ids"] = task['instance_ids']
+    extra = {key: value for key, value in stats.items() if key not in TARGET_LANGUAGES}
+    if extra:
+        result["extra"] = extra
+    return result
+
+
+def open_journal(output_file, options):
+    """Opens the result journal of output_file, resuming it when options.resume is set."""
+    from journal import ResultJournal, journal_path_for
+
+    return ResultJournal(journal_path_for(output_file), resume=options.resume)
+
+
+def analyze_repositories(repo_groups, options=None, journal=None, failures_file=None):
+    """
+    Counts LOC for every task of every repository with an AnalysisPipeline.
+
+    Repositories are dispatched longest-job-first (see scheduling.RepoScheduler)
+    unless options.schedule is "dataset-order".
+
+    Args:
+        repo_groups: Dict of repo_name -> list of dicts with keys: 'instance_id', 'commit',
+                     and optionally 'instance_ids', the dataset instances a work
+                     item stands for (see WorkPlan), which failures are reported under
+        options: AnalysisOptions
+        journal: Optional journal.ResultJournal; instances already in it are
+                 skipped and new results are appended as they complete
+        failures_file: Optional JSON file listing the tasks that still failed
+                       after options.retry_failed retry rounds
+
+    Returns a dict of instance_id -> {'instance_id': ..., 'repo': ..., 'commit': ..., 'stats': ...}
+    (with a journal: everything in the journal, including earlier runs).
+    """
+    from scheduling import RepoScheduler
+
+    options = options or AnalysisOptions()
+    instance_ids = {task['instance_id']: task.get('instance_ids')
+                    for tasks in repo_groups.values() for task in tasks}
+
+    if journal is not None and journal.results:
+        total = sum(len(tasks) for tasks in repo_groups.values())
+        remaining_groups = {}
+        for repo_name, tasks in repo_groups.items():
+            # A commit counted before its repository's file index was written is counted again.
+            remaining = [task for task in tasks if task['instance_id'] not in journal
+                         or (options.file_index is not None
+                             and not options.file_index.has(repo_name, task['commit']))]
+            if remaining:
+                remaining_groups[repo_name] = remaining
+        remaining_count = sum(len(tasks) for tasks in remaining_groups.values())
+        print(f"Skipping {total - remaining_count} of {total} instances already in the journal.")
+        repo_groups = remaining_groups
+
+    # Sizes of earlier runs come from the LOC stats CSVs next to the output
+    # (and so next to its failure summary), not from the working directory.
+    stats_dir = os.path.dirname(os.path.abspath(failures_file)) if failures_file else "."
+    scheduler = RepoScheduler(os.path.join(options.cache_dir, "repo_timings.json"), stats_dir=stats_dir)
+    order = scheduler.order(repo_groups)
+    if options.schedule == "dataset-order":
+        order = list(repo_groups)
+
+    fetch_planner = FetchPlanner(os.path.join(options.cache_dir, "fetch_sizes.json"),
+                                 options.fetch_strategy, options.shallow_max_tasks)
+    pipeline = AnalysisPipeline(options, on_repo_finished=scheduler.record, journal=journal,
+                                fetch_planner=fetch_planner)
+    disk_budget = pipeline.disk_budget
+    run_start = time.monotonic()
+    results_map = pipeline.run(repo_groups, order)
+    wall_seconds = time.monotonic() - run_start
+
+    scheduler.report(order, pipeline.scan_workers, wall_seconds, pipeline.busy["count"])
+    pipeline.report(wall_seconds)
+    scheduler.save()
+
+    # Failed tasks are retried once the main pass is done, with a fresh clone,
+    # instead of stalling a worker on them.
+    failures = pipeline.failures
+    for retry_round in range(1, options.retry_failed + 1):
+        if not failures:
+            break
+        print(f"Retrying {len(failures)} failed tasks (round {retry_round}/{options.retry_failed})...")
+        retry_groups = defaultdict(list)
+        for failure in failures:
+            task = {"instance_id": failure.instance_id, "commit": failure.commit}
+            if instance_ids.get(failure.instance_id) is not None:
+                task["instance_ids"] = instance_ids[failure.instance_id]
+            retry_groups[failure.repo].append(task)
+        retry_pipeline = AnalysisPipeline(options, journal=journal, fetch_planner=fetch_planner,
+                                          disk_budget=disk_budget)
+        results_map.update(retry_pipeline.run(retry_groups))
+        attempts = {failure.instance_id: failure.attempts for failure in failures}
+        for failure in retry_pipeline.failures:
+            failure.attempts = attempts[failure.instance_id] + 1
+        failures = retry_pipeline.failures
+
+    fetch_planner.save()
+    disk_budget.close()
+    disk_budget.report()
+    # One entry per affected dataset instance rather than per work item
+    failures = [replace(failure, instance_id=instance_id)
+                for failure in failures
+                for instance_id in instance_ids.get(failure.instance_id) or [failure.instance_id]]
+    if failures_file is not None:
+        write_failure_summary(failures_file, failures)
+    elif failures:
+        print(f"{len(failures)} tasks failed.")
+
+    if journal is not None:
+        return dict(journal.results)
+    return results_map
+
+
+class WorkPlan:
+    """
+    Collapses the tasks of one or more eval sets to unique (repo, commit) work
+    items, so a commit shared by several instances (or several benchmarks) is
+    fetched and counted once, then fans the results back out per instance.
+    analyze_swe_bench.py, analyze_multi_swe_bench.py and analyze_swe_lancer.py
+    all plan through it; deduplication covers the eval sets of one script run,
+    not commits shared between scripts.
+    """
+
+    def __init__(self):
+        self.tasks = {}  # eval set name -> [(instance_id, repo, commit)]
+        self.work = {}  # (repo, commit) -> work item id
+        self.instances = defaultdict(dict)  # (repo, commit) -> dataset instance ids (as dict keys, in order)
+
+    @staticmethod
+    def work_id(repo, commit):
+        return f"{repo}@{commit}"
+
+    def add(self, eval_set_name, tasks):
+        """Adds an eval set's tasks, dicts with keys: 'instance_id', 'repo', 'commit'."""
+        entries = self.tasks.setdefault(eval_set_name, [])
+        for task in tasks:
+            key = (task['repo'], task['commit'])
+            self.work.setdefault(key, self.work_id(*key))
+            self.instances[key][task['instance_id']] = None
+            entries.append((task['instance_id'], task['repo'], task['commit']))
+
+    def repo_groups(self):
+        """
+        Unique work items as repo_name -> [{'instance_id': work id, 'commit': ...,
+        'instance_ids': [dataset instance ids]}] for analyze_repositories, which
+        journals and reports failures under the dataset instance ids.
+        """
+        groups = defaultdict(list)
+        for (repo, commit), work_id in self.work.items():
+            groups[repo].append({"instance_id": work_id, "commit": commit,
+                                 "instance_ids": list(self.instances[(repo, commit)])})
+        return groups
+
+    def print_summary(self):
+        """Prints how much work deduplication eliminated."""
+        total = sum(len(entries) for entries in self.tasks.values())
+        per_set = sum(len({(repo, commit) for _, repo, commit in entries}) for entries in self.tasks.values())
+        unique = len(self.work)
+        eliminated = total - unique
+        share = eliminated / total * 100 if total else 0
+        print(f"Plan: {total} tasks across {len(self.tasks)} eval set(s) -> {unique} unique (repo, commit) "
+              f"work items; {eliminated} ({share:.1f}%) eliminated "
+              f"({total - per_set} within eval sets, {per_set - unique} across eval sets).")
+
+    def results_for(self, eval_set_name, results_map):
+        """Results for every instance of eval_set_name, in the order they were added."""
+        fanned_out = {}
+        for instance_id, repo, commit in self.tasks[eval_set_name]:
+            res = results_map.get(self.work[(repo, commit)])
+            if res is not None:
+                res = {key: value for key, value in res.items() if key != 'instance_ids'}
+                fanned_out[instance_id] = dict(res, instance_id=instance_id)
+        return order_results([instance_id for instance_id, _, _ in self.tasks[eval_set_name]], fanned_out)
+
+
+def order_results(instance_ids, results_map):
+    """Returns the results for instance_ids in order, warning about missing ones."""
+    results_list = []
+    count_missing = 0
+    for instance_id in instance_ids:
+        if instance_id in results_map:
+            results_list.append(results_map[instance_id])
+        else:
+            print(f"Warning: Missing results for {instance_id}")
+            count_missing += 1
+
+    if count_missing > 0:
+        print(f"Total missing: {count_missing}")
 
+    return results_list
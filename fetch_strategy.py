@@ -0,0 +1,100 @@
+"""
+Per-repository choice between a full clone and shallow per-commit fetches.
+
+Repositories with only one or two tasks (common in SWE-PolyBench and
+Multi-SWE-bench) are much cheaper to fetch as `git init` plus one
+`git fetch --depth 1 origin <sha>` per commit than as a full-history clone,
+while repositories with many tasks are better served by one full clone (or
+the mirror cache). The decision uses the task count and, when known, the
+sizes measured in previous runs, which are kept in a small JSON file.
+"""
+
+import json
+import os
+import threading
+
+FETCH_STRATEGIES = ["auto", "full", "shallow"]
+DEFAULT_SHALLOW_MAX_TASKS = 3
+
+
+class FetchPlanner:
+    """
+    Chooses "full" or "shallow" per repository and remembers what each cost.
+
+    Args:
+        sizes_path: JSON file with per-repo fetch sizes of previous runs
+        strategy: "auto", or "full"/"shallow" to force one for every repository
+        shallow_max_tasks: Without known sizes, fetch shallowly up to this many commits
+    """
+
+    def __init__(self, sizes_path, strategy="auto", shallow_max_tasks=DEFAULT_SHALLOW_MAX_TASKS):
+        self.sizes_path = sizes_path
+        self.strategy = strategy
+        self.shallow_max_tasks = shallow_max_tasks
+        # repo -> {"full_bytes": ..., "shallow_bytes_per_commit": ..., "scratch_bytes": ...},
+        # with a "blobless_" prefix for sizes measured with --filter=blob:none
+        self.sizes = {}
+        self._lock = threading.Lock()
+        if os.path.exists(sizes_path):
+            with open(sizes_path, encoding='utf-8') as f:
+                self.sizes = json.load(f)
+
+    @staticmethod
+    def _key(name, blobless):
+        return f"blobless_{name}" if blobless else name
+
+    def choose(self, repo_name, commit_count, mirror_exists=False, blobless=False):
+        """Returns (strategy, reason) for fetching commit_count commits of repo_name."""
+        if self.strategy != "auto":
+            return self.strategy, f"--fetch-strategy {self.strategy}"
+        if mirror_exists:
+            return "full", "mirror already cached"
+
+        known = self.sizes.get(repo_name, {})
+        full_bytes = known.get(self._key("full_bytes", blobless))
+        per_commit = known.get(self._key("shallow_bytes_per_commit", blobless))
+        if full_bytes and per_commit:
+            shallow_bytes = per_commit * commit_count
+            strategy = "shallow" if shallow_bytes < full_bytes else "full"
+            return strategy, (f"{commit_count} commits x {per_commit / 1024 ** 2:.1f} MB "
+                              f"vs {full_bytes / 1024 ** 2:.1f} MB full clone")
+        if full_bytes and full_bytes < 1024 ** 2:
+            return "full", "small repository"
+        if commit_count <= self.shallow_max_tasks:
+            return "shallow", f"{commit_count} commits <= {self.shallow_max_tasks}"
+        return "full", f"{commit_count} commits > {self.shallow_max_tasks}"
+
+    def record(self, repo_name, strategy, fetched_bytes, commit_count, blobless=False):
+        """Remembers the bytes a fetch of commit_count commits took."""
+        with self._lock:
+            known = self.sizes.setdefault(repo_name, {})
+            if strategy == "full":
+                known[self._key("full_bytes", blobless)] = fetched_bytes
+            elif commit_count:
+                known[self._key("shallow_bytes_per_commit", blobless)] = fetched_bytes // commit_count
+
+    def scratch_bytes(self, repo_name, commit_count, blobless=False):
+        """
+        Scratch space the repository needed last time, else the size of the
+        smallest fetch of commit_count commits seen so far, or None if unknown.
+        """
+        known = self.sizes.get(repo_name, {})
+        if "scratch_bytes" in known:
+            return known["scratch_bytes"]
+        full_bytes = known.get(self._key("full_bytes", blobless))
+        per_commit = known.get(self._key("shallow_bytes_per_commit", blobless))
+        sizes = [size for size in (full_bytes, per_commit and per_commit * commit_count) if size]
+        return min(sizes) if sizes else None
+
+    def record_scratch(self, repo_name, nbytes):
+        """Remembers the scratch space estimated for the repository's clone and worktrees."""
+        with self._lock:
+            self.sizes.setdefault(repo_name, {})["scratch_bytes"] = nbytes
+
+    def save(self):
+        """Writes the updated sizes next to the other caches."""
+        os.makedirs(os.path.dirname(os.path.abspath(self.sizes_path)), exist_ok=True)
+        tmp_path = self.sizes_path + ".tmp"
+        with self._lock, open(tmp_path, "w", encoding='utf-8') as f:
+            json.dump(self.sizes, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.sizes_path)
@@ -0,0 +1,197 @@
+"""
+Per-file LOC index: (path, language, code, bytes) of every counted file, for
+every analysed commit.
+
+The rows come from the same `scc --by-file` run that produces the language
+totals, parsed incrementally from scc's output. Each repository gets one
+compact columnar file (a compressed .npz, plus one appended segment per later
+flush): paths are stored once in a dictionary shared by all commits, and
+every row refers to its commit, path and language by index. Per-directory or
+touched-file analytics can then be done from the index without running scc
+again:
+
+    python file_index.py file_index/django__django.npz --depth 2
+"""
+
+import argparse
+import os
+import threading
+
+import numpy as np
+
+from common import TARGET_LANGUAGES
+
+
+def index_path_for(index_dir, repo_name):
+    """Index file of repo_name, e.g. <index_dir>/django__django.npz."""
+    return os.path.join(index_dir, repo_name.replace("/", "__") + ".npz")
+
+
+def _decode_strings(blob):
+    return blob.tobytes().decode("utf-8").split("\0") if blob.size else []
+
+
+def _encode_strings(strings):
+    return np.frombuffer("\0".join(strings).encode("utf-8"), dtype=np.uint8)
+
+
+def _segment_paths(path):
+    """The files making up the index at path: path itself, then path.1, path.2, ..."""
+    paths = []
+    while os.path.exists(path if not paths else f"{path}.{len(paths)}"):
+        paths.append(path if not paths else f"{path}.{len(paths)}")
+    return paths
+
+
+def read_index(path):
+    """
+    Returns the raw columns of an index file as a dict: the "commits",
+    "paths" and "languages" dictionaries and the per-row "commit_id",
+    "path_id", "language_id", "code" and "bytes" arrays. The segments
+    appended by later runs are merged in.
+    """
+    commits, paths, languages = [], [], []
+    columns = {name: [] for name in ("commit_id", "path_id", "language_id", "code", "bytes")}
+    for segment_path in _segment_paths(path):
+        with np.load(segment_path) as data:
+            segment_languages = _decode_strings(data["languages"])
+            for lang_name in segment_languages:
+                if lang_name not in languages:
+                    languages.append(lang_name)
+            language_map = np.array([languages.index(lang_name) for lang_name in segment_languages],
+                                    dtype=np.uint8)
+            # Commit ids are local to a segment; path ids continue the earlier segments' dictionary.
+            columns["commit_id"].append(data["commit_id"] + np.uint32(len(commits)))
+            columns["path_id"].append(data["path_id"])
+            columns["language_id"].append(language_map[data["language_id"]])
+            columns["code"].append(data["code"])
+            columns["bytes"].append(data["bytes"])
+            commits += _decode_strings(data["commits"])
+            paths += _decode_strings(data["paths"])
+    dtypes = {"commit_id": np.uint32, "path_id": np.uint32, "language_id": np.uint8,
+              "code": np.uint32, "bytes": np.uint64}
+    result = {"commits": commits, "paths": paths, "languages": languages}
+    for name, arrays in columns.items():
+        result[name] = np.concatenate(arrays).astype(dtypes[name]) if arrays else np.zeros(0, dtypes[name])
+    return result
+
+
+def load_index(path):
+    """The index file at path as a DataFrame (commit, path, language, code, bytes) with categorical columns."""
+    import pandas as pd
+
+    columns = read_index(path)
+    return pd.DataFrame({
+        "commit": pd.Categorical.from_codes(columns["commit_id"], columns["commits"]),
+        "path": pd.Categorical.from_codes(columns["path_id"], columns["paths"]),
+        "language": pd.Categorical.from_codes(columns["language_id"], columns["languages"]),
+        "code": columns["code"],
+        "bytes": columns["bytes"],
+    })
+
+
+class FileIndex:
+    """
+    Collects per-file rows while repositories are analysed and appends them
+    to the repository's index when it is finished.
+
+    The first flush writes <repo>.npz; later flushes (retry rounds, later
+    runs) append a segment <repo>.npz.1, .2, ... holding only the new
+    commits and the paths not seen before, so existing data is never
+    rewritten. read_index merges the segments.
+
+    Args:
+        index_dir: Directory holding the per-repository index files
+    """
+
+    def __init__(self, index_dir):
+        self.index_dir = index_dir
+        self._pending = {}  # repo -> {commit: {path: (language, code, bytes)}}
+        self._indexed = {}  # repo -> (set of indexed commits, {path: path id}, number of segments)
+        self._lock = threading.Lock()
+        os.makedirs(index_dir, exist_ok=True)
+
+    def _index_state(self, repo_name):
+        if repo_name not in self._indexed:
+            commits, path_ids = set(), {}
+            segments = _segment_paths(index_path_for(self.index_dir, repo_name))
+            for segment_path in segments:
+                with np.load(segment_path) as data:
+                    commits.update(_decode_strings(data["commits"]))
+                    for p in _decode_strings(data["paths"]):
+                        path_ids[p] = len(path_ids)
+            self._indexed[repo_name] = (commits, path_ids, len(segments))
+        return self._indexed[repo_name]
+
+    def has(self, repo_name, commit):
+        """True if commit's files are already indexed (or about to be written)."""
+        with self._lock:
+            return commit in self._index_state(repo_name)[0] or commit in self._pending.get(repo_name, {})
+
+    def add(self, repo_name, commit, files):
+        """Records {path: (language, code, bytes, ...)} of one commit; further metrics are dropped."""
+        files = {path: values[:3] for path, values in files.items()}
+        with self._lock:
+            self._pending.setdefault(repo_name, {})[commit] = files
+
+    def flush(self, repo_name):
+        """Appends repo_name's new commits to its index as one more segment."""
+        with self._lock:
+            pending = self._pending.pop(repo_name, None)
+            if not pending:
+                return
+            indexed, path_ids, segments = self._index_state(repo_name)
+            pending = {commit: files for commit, files in pending.items() if commit not in indexed}
+            if not pending:
+                return
+            path = index_path_for(self.index_dir, repo_name)
+            new_paths = sorted({p for files in pending.values() for p in files} - set(path_ids))
+            for p in new_paths:
+                path_ids[p] = len(path_ids)
+            self._write(f"{path}.{segments}" if segments else path, pending, new_paths, path_ids)
+            indexed.update(pending)
+            self._indexed[repo_name] = (indexed, path_ids, segments + 1)
+
+    @staticmethod
+    def _write(path, commits, new_paths, path_ids):
+        language_ids = {lang_name: i for i, lang_name in enumerate(TARGET_LANGUAGES)}
+        rows = [(commit_id, path_ids[p], language_ids[language], code, nbytes)
+                for commit_id, files in enumerate(commits.values())
+                for p, (language, code, nbytes) in sorted(files.items())]
+        columns = np.array(rows, dtype=np.int64).reshape(-1, 5).T
+
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez_compressed(
+                f,
+                commits=_encode_strings(list(commits)),
+                paths=_encode_strings(new_paths),
+                languages=_encode_strings(TARGET_LANGUAGES),
+                commit_id=columns[0].astype(np.uint32),
+                path_id=columns[1].astype(np.uint32),
+                language_id=columns[2].astype(np.uint8),
+                code=columns[3].astype(np.uint32),
+                bytes=columns[4].astype(np.uint64),
+            )
+        os.replace(tmp_path, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarise a per-file LOC index by directory.")
+    parser.add_argument("index_file", help="A .npz file written with --file-index.")
+    parser.add_argument("--depth", type=int, default=1, help="Directory levels to group by.")
+    parser.add_argument("--top", type=int, default=10, help="Directories shown per commit.")
+    args = parser.parse_args()
+
+    df = load_index(args.index_file)
+    dirs = df["path"].astype(str).str.split("/").str[:-1].str[:args.depth].str.join("/")
+    df["directory"] = dirs.where(dirs != "", ".")
+    by_dir = df.groupby(["commit", "directory"], observed=True)["code"].sum()
+    for commit, totals in by_dir.groupby(level="commit", observed=True):
+        print(f"{commit}: {int(totals.sum())} LOC in {int((df['commit'] == commit).sum())} files")
+        for (_, directory), code in totals.sort_values(ascending=False).head(args.top).items():
+            print(f"  {directory:<50} {int(code)}")
+
+
+if __name__ == "__main__":
+    main()
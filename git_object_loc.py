@@ -0,0 +1,248 @@
+"""
+Checkout-free LOC counting straight from a repository's object store.
+
+Each commit's tree is listed with `git ls-tree -r`, files are classified by
+path (see line_counter.classify), or by their shebang line when the name has
+no extension, and their blobs are streamed through one
+long-lived `git cat-file --batch` process. Line counts are memoized per blob
+SHA, so a file that is identical across commits is only read and counted
+once; the cost scales with the number of distinct blobs rather than with
+commits x files. The counters of one repository's slots share the memo (see
+BlobCounts).
+
+Unlike scc on a checkout, .gitignore rules are not applied to tracked files.
+"""
+
+import os
+import subprocess
+import tempfile
+import threading
+
+from common import TARGET_LANGUAGES
+from line_counter import classify, count_lines, is_excluded, may_have_shebang, shebang_language
+
+# git modes never counted: symlinks and submodules (scc does not follow them).
+SKIPPED_MODES = {"120000", "160000"}
+
+
+class BlobCounts:
+    """
+    (code, comment, blank) per (blob_sha, language), shared by the counters
+    of one repository. A blob being read by one counter is claimed, so the
+    others wait for its count instead of reading it as well.
+    """
+
+    def __init__(self):
+        self._counts = {}
+        self._claims = {}  # (blob_sha, language) -> Event set when the claim ends
+        self._shebangs = {}  # blob_sha of a file without extension -> language or None
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._counts
+
+    def __getitem__(self, key):
+        with self._lock:
+            return self._counts[key]
+
+    def claim(self, keys):
+        """Returns (keys without a count, now claimed by the caller, events of keys claimed by others)."""
+        claimed, in_flight = [], []
+        with self._lock:
+            for key in keys:
+                if key in self._counts:
+                    continue
+                event = self._claims.get(key)
+                if event is None:
+                    self._claims[key] = threading.Event()
+                    claimed.append(key)
+                else:
+                    in_flight.append(event)
+        return claimed, in_flight
+
+    def put(self, key, counts):
+        with self._lock:
+            self._counts[key] = counts
+
+    def shebang_languages(self, blob_shas):
+        """{blob_sha: language or None} for the blob_shas whose shebang line was already read."""
+        with self._lock:
+            return {sha: self._shebangs[sha] for sha in blob_shas if sha in self._shebangs}
+
+    def put_shebang(self, blob_sha, language):
+        with self._lock:
+            self._shebangs[blob_sha] = language
+
+    def release(self, keys):
+        """Ends the caller's claims; keys left without a count (failed read) can be claimed again."""
+        with self._lock:
+            events = [self._claims.pop(key) for key in keys]
+        for event in events:
+            event.set()
+
+
+class GitObjectLocCounter:
+    """
+    Counts per-language LOC of commits in the repository at repo_path without checking them out.
+
+    Args:
+        repo_path: Repository holding the commits
+        blob_counts: BlobCounts shared with the repository's other counters (default: a new one)
+    """
+
+    def __init__(self, repo_path, blob_counts=None):
+        self.repo_path = repo_path
+        self.blob_counts = blob_counts if blob_counts is not None else BlobCounts()
+        self._cat_file = None
+        self._cat_file_stderr = None
+        self.blobs_read = 0
+        self.blob_hits = 0
+
+    def list_files(self, commit_sha):
+        """Returns [(blob_sha, language)] for the counted files of commit_sha."""
+        result = subprocess.run(
+            ["git", "ls-tree", "-r", "-z", "--full-tree", commit_sha],
+            cwd=self.repo_path,
+            capture_output=True,
+            check=True
+        )
+        files = []
+        unclassified = []  # blobs of files without an extension
+        for entry in result.stdout.split(b"\0"):
+            if not entry:
+                continue
+            # "<mode> <type> <sha>\t<path>"
+            meta, path = entry.split(b"\t", 1)
+            mode, obj_type, blob_sha = meta.decode().split(" ")
+            if obj_type != "blob" or mode in SKIPPED_MODES:
+                continue
+            path = os.fsdecode(path)
+            if is_excluded(path):
+                continue
+            language = classify(path)
+            if language is not None:
+                files.append((blob_sha, language))
+            elif may_have_shebang(path):
+                unclassified.append(blob_sha)
+
+        if unclassified:
+            known = self.blob_counts.shebang_languages(unclassified)
+            for blob_sha, data in self._read_blobs([sha for sha in dict.fromkeys(unclassified)
+                                                    if sha not in known]):
+                known[blob_sha] = shebang_language(data)
+                self.blob_counts.put_shebang(blob_sha, known[blob_sha])
+            files += [(blob_sha, known[blob_sha]) for blob_sha in unclassified if known[blob_sha]]
+        return files
+
+    def _read_blobs(self, blob_shas):
+        """
+        Yields (blob_sha, data) for blob_shas via the shared `git cat-file --batch` process.
+
+        Raises CalledProcessError (with cat-file's answer as stderr) if a blob
+        cannot be read. The process is then killed: the request writer may be
+        blocked on a full stdin pipe while cat-file is blocked on a full stdout
+        pipe that nobody reads any more.
+        """
+        if self._cat_file is None:
+            self._cat_file_stderr = tempfile.TemporaryFile()
+            self._cat_file = subprocess.Popen(
+                ["git", "cat-file", "--batch"],
+                cwd=self.repo_path,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=self._cat_file_stderr
+            )
+        proc = self._cat_file
+
+        # Feed requests from a separate thread so a full stdout pipe can never
+        # block us while we are still writing.
+        def write_requests():
+            try:
+                proc.stdin.write("".join(f"{sha}\n" for sha in blob_shas).encode())
+                proc.stdin.flush()
+            except (BrokenPipeError, ValueError):
+                # cat-file was killed after a failed read
+                pass
+
+        writer = threading.Thread(target=write_requests, daemon=True)
+        writer.start()
+        complete = False
+        try:
+            for _ in blob_shas:
+                line = proc.stdout.readline()
+                header = line.decode(errors="replace").split()
+                if len(header) != 3:
+                    # "<sha> missing", or nothing at all if cat-file died
+                    stderr = self._kill()
+                    raise subprocess.CalledProcessError(
+                        128, proc.args, output=line,
+                        stderr=f"{line.decode(errors='replace').strip() or 'no output'}\n{stderr}")
+                blob_sha, _, size = header
+                data = proc.stdout.read(int(size))
+                proc.stdout.read(1)  # trailing newline
+                yield blob_sha, data
+            complete = True
+        finally:
+            # Also when the caller stops early: unread answers would stall the next batch.
+            if not complete:
+                self._kill()
+            writer.join()
+
+    def _kill(self):
+        """Kills the cat-file process; returns what it wrote to stderr."""
+        if self._cat_file is None:
+            return ""
+        self._cat_file.kill()
+        self._cat_file.wait()
+        self._cat_file = None
+        self._cat_file_stderr.seek(0)
+        stderr = self._cat_file_stderr.read().decode(errors="replace")
+        self._cat_file_stderr.close()
+        return stderr
+
+    def count(self, commit_sha):
+        """Returns {language: code} for commit_sha."""
+        files = self.list_files(commit_sha)
+
+        counted = 0
+        pending = list(dict.fromkeys(files))
+        while pending:
+            claimed, in_flight = self.blob_counts.claim(pending)
+            languages = {}
+            for blob_sha, language in claimed:
+                languages.setdefault(blob_sha, []).append(language)
+            try:
+                for blob_sha, data in self._read_blobs(list(languages)):
+                    self.blobs_read += 1
+                    for language in languages[blob_sha]:
+                        self.blob_counts.put((blob_sha, language), count_lines(data, language))
+                        counted += 1
+            finally:
+                self.blob_counts.release(claimed)
+            for event in in_flight:
+                event.wait()
+            # Blobs another counter failed to read are claimed in the next round.
+            pending = [key for key in pending if key not in self.blob_counts]
+        self.blob_hits += len(files) - counted
+
+        lang_stats = {lang_name: 0 for lang_name in TARGET_LANGUAGES}
+        for blob_sha, language in files:
+            lang_stats[language] += self.blob_counts[(blob_sha, language)][0]
+        return lang_stats
+
+    def close(self):
+        """Stops the cat-file process."""
+        if self._cat_file is not None:
+            self._cat_file.stdin.close()
+            self._cat_file.wait()
+            self._cat_file = None
+            self._cat_file_stderr.close()
+
+    def reset(self):
+        """Kills the cat-file process after a failed count; the next count starts a new one."""
+        self._kill()
+
+    def summary(self):
+        """One-line summary of blob reuse."""
+        return f"{self.blobs_read} blobs read, {self.blob_hits} files reused memoized counts"
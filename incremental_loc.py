@@ -0,0 +1,194 @@
+"""
+Incremental LOC counting for many commits of one repository.
+
+A full `scc --by-file` scan is done for an anchor commit. For every following
+commit only the files reported by `git diff --raw` against the previous
+commit are re-counted, and the per-language totals are adjusted by the
+difference. Whenever the delta cannot be trusted (ignore rules changed, the
+delta is too large, scc output is inconsistent) a full scan is done instead,
+which also becomes the new anchor.
+"""
+
+import os
+import subprocess
+
+from common import TARGET_LANGUAGES, checkout_with_retry, get_file_loc_counts
+from line_counter import is_excluded
+
+# Files that change which paths scc walks; touching them invalidates the delta.
+IGNORE_FILES = {".gitignore", ".ignore", ".sccignore"}
+
+# git modes of entries scc never counts on its own (symlinks, submodules).
+SKIPPED_MODES = {"120000", "160000"}
+
+
+def diff_raw(repo_path, old_commit, new_commit):
+    """
+    Returns [(status, new_mode, path)] for files that differ between two commits.
+    Renames are reported as a delete plus an add.
+    """
+    result = subprocess.run(
+        ["git", "diff", "--raw", "-z", "--no-renames", "--no-abbrev", old_commit, new_commit],
+        cwd=repo_path,
+        capture_output=True,
+        check=True
+    )
+    fields = result.stdout.split(b"\0")
+    changes = []
+    # Records are ":old_mode new_mode old_sha new_sha status\0path\0"
+    for i in range(0, len(fields) - 1, 2):
+        meta = fields[i].decode()
+        if not meta:
+            break
+        _, new_mode, _, _, status = meta[1:].split(" ")
+        changes.append((status[0], new_mode, os.fsdecode(fields[i + 1])))
+    return changes
+
+
+def has_scc_ignore_files(repo_path, commit_sha):
+    """True if the tree has .ignore/.sccignore files, whose rules git cannot evaluate for us."""
+    result = subprocess.run(
+        ["git", "ls-tree", "-r", "-z", "--name-only", commit_sha],
+        cwd=repo_path,
+        capture_output=True,
+        check=True
+    )
+    return any(
+        os.path.basename(os.fsdecode(path)) in (".ignore", ".sccignore")
+        for path in result.stdout.split(b"\0") if path
+    )
+
+
+def filter_ignored(repo_path, paths):
+    """Drops paths in excluded directories and paths matched by .gitignore rules, which scc skips during a full scan."""
+    paths = [p for p in paths if not is_excluded(p)]
+    if not paths:
+        return paths
+    # scc only reads the repository's own ignore files, not the user's global excludes.
+    result = subprocess.run(
+        ["git", "-c", "core.excludesFile=", "check-ignore", "--no-index", "-z", "--stdin"],
+        cwd=repo_path,
+        input=b"\0".join(os.fsencode(p) for p in paths),
+        capture_output=True
+    )
+    # Exit code 1 means nothing is ignored.
+    if result.returncode not in (0, 1):
+        raise subprocess.CalledProcessError(result.returncode, result.args, result.stdout, result.stderr)
+    ignored = {os.fsdecode(p) for p in result.stdout.split(b"\0") if p}
+    return [p for p in paths if p not in ignored]
+
+
+class IncrementalLocCounter:
+    """
+    Derives per-language LOC for successive commits of the repository checked
+    out at repo_path.
+
+    Args:
+        repo_path: Clone to check commits out in
+        verify_every: Cross-check every Nth derived result against a full scan (0 = never)
+        max_changed_fraction: Fall back to a full scan when more than this
+                              fraction of the counted files changed
+    """
+
+    def __init__(self, repo_path, verify_every=0, max_changed_fraction=0.25):
+        self.repo_path = repo_path
+        self.verify_every = verify_every
+        self.max_changed_fraction = max_changed_fraction
+        self.commit = None
+        self.file_stats = {}  # path -> (language, code) for the current commit
+        self.totals = None
+        self.trust_delta = True
+        self.full_scans = 0
+        self.derived = 0
+        self.fallbacks = 0
+        self.verified = 0
+        self.mismatches = 0
+
+    def _full_scan(self, commit_sha):
+        self.file_stats = get_file_loc_counts(self.repo_path)
+        self.totals = self._sum(self.file_stats)
+        self.commit = commit_sha
+        self.trust_delta = not has_scc_ignore_files(self.repo_path, commit_sha)
+        self.full_scans += 1
+        return dict(self.totals)
+
+    @staticmethod
+    def _sum(file_stats):
+        totals = {lang: 0 for lang in TARGET_LANGUAGES}
+        for lang, code in file_stats.values():
+            totals[lang] += code
+        return totals
+
+    def _derive(self, commit_sha):
+        """Applies the diff from self.commit; returns None if the delta cannot be trusted."""
+        if not self.trust_delta:
+            return None
+        changes = diff_raw(self.repo_path, self.commit, commit_sha)
+        if any(os.path.basename(path) in IGNORE_FILES for _, _, path in changes):
+            return None
+        if len(changes) > self.max_changed_fraction * max(len(self.file_stats), 1):
+            return None
+
+        file_stats = dict(self.file_stats)
+        totals = dict(self.totals)
+        recount = []
+        for status, new_mode, path in changes:
+            old = file_stats.pop(path, None)
+            if old is not None:
+                totals[old[0]] -= old[1]
+            if status != "D" and new_mode not in SKIPPED_MODES:
+                recount.append(path)
+
+        # Files outside a sparse checkout are not on disk and not counted by a full scan either.
+        recount = [p for p in recount if os.path.isfile(os.path.join(self.repo_path, p))]
+        recount = filter_ignored(self.repo_path, recount)
+        counted = get_file_loc_counts(self.repo_path, recount)
+        if not set(counted) <= set(recount):
+            return None
+        for path, (lang, code) in counted.items():
+            file_stats[path] = (lang, code)
+            totals[lang] += code
+        if any(value < 0 for value in totals.values()):
+            return None
+
+        self.file_stats = file_stats
+        self.totals = totals
+        self.commit = commit_sha
+        return dict(totals)
+
+    def count(self, commit_sha, checkout=True):
+        """Returns {language: code} for commit_sha, checking it out first unless checkout is False."""
+        if checkout:
+            checkout_with_retry(self.repo_path, commit_sha)
+        if self.commit is None:
+            return self._full_scan(commit_sha)
+
+        stats = self._derive(commit_sha)
+        if stats is None:
+            self.fallbacks += 1
+            return self._full_scan(commit_sha)
+
+        self.derived += 1
+        if self.verify_every and self.derived % self.verify_every == 0:
+            self.verified += 1
+            full = self._full_scan(commit_sha)
+            if full != stats:
+                self.mismatches += 1
+                print(f"Warning: incremental LOC for {commit_sha} in {self.repo_path} "
+                      f"differs from full scan: {stats} != {full}")
+            return full
+        return stats
+
+    def reset(self):
+        """Forgets the anchor, so the next commit gets a full scan."""
+        self.commit = None
+        self.file_stats = {}
+        self.totals = None
+
+    def summary(self):
+        """One-line summary of how the commits were counted."""
+        text = (f"{self.derived} derived from diffs, {self.full_scans} full scans "
+                f"({self.fallbacks} fallbacks)")
+        if self.verified:
+            text += f", {self.verified} verified ({self.mismatches} mismatches)"
+        return text
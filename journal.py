@@ -0,0 +1,72 @@
+"""
+Append-only JSONL journal of finished analysis results.
+
+Every result is written as one line and fsync'ed as soon as it is computed,
+so a crash, OOM kill or Ctrl-C loses at most the commits that were in flight.
+With --resume the journal is read back, finished instance_ids are skipped and
+the final CSV is assembled from the journal. Runs planned with a WorkPlan key
+their results by work item (repo@commit) and list the dataset instances of
+each in its "instance_ids".
+"""
+
+import json
+import os
+import threading
+
+
+def journal_path_for(output_file):
+    """Journal kept next to output_file, e.g. foo_loc_stats.journal.jsonl for foo_loc_stats.csv."""
+    return os.path.splitext(output_file)[0] + ".journal.jsonl"
+
+
+class ResultJournal:
+    """
+    {instance_id: result} backed by a JSONL file.
+
+    Args:
+        path: Journal file
+        resume: Keep the results already in the file; otherwise start a new journal
+    """
+
+    def __init__(self, path, resume=False):
+        self.path = path
+        self.results = {}  # instance_id -> result dict
+        self._lock = threading.Lock()
+        if resume and os.path.exists(path):
+            torn = self._load()
+            print(f"Resuming from {path}: {len(self.results)} instances already done.")
+        else:
+            torn = False
+        self._file = open(path, "a" if resume else "w", encoding="utf-8")
+        if torn:
+            # Terminate the partial last line so the next record starts on its own line.
+            self._file.write("\n")
+
+    def _load(self):
+        """Reads the existing journal; returns True if its last line is incomplete."""
+        line = ""
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    result = json.loads(line)
+                except json.JSONDecodeError:
+                    # A line torn by a crash mid-write; that instance is redone.
+                    continue
+                self.results[result["instance_id"]] = result
+        return bool(line) and not line.endswith("\n")
+
+    def __contains__(self, instance_id):
+        return instance_id in self.results
+
+    def append(self, result):
+        """Durably records one result dict."""
+        line = json.dumps(result, sort_keys=True) + "\n"
+        with self._lock:
+            self.results[result["instance_id"]] = result
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        with self._lock:
+            self._file.close()
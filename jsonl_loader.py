@@ -0,0 +1,161 @@
+"""
+Streaming, parallel loader for directories of JSONL files (Multi-SWE-bench).
+
+The files are split into byte ranges that worker processes parse line by
+line. Each record is reduced to the requested fields right away, so only
+those fields travel back to the caller, and records are yielded lazily in
+file order. Unrequested fields such as the huge fix_patch/test_patch strings
+never reach the main process, so its memory stays flat however large the
+download is.
+
+Run it directly to measure records/s and peak RSS on the local download:
+
+    python jsonl_loader.py --base-dir Multi-SWE-bench --baseline
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+MULTI_SWE_BENCH_DIR = "Multi-SWE-bench"
+MULTI_SWE_BENCH_FIELDS = ["instance_id", "org", "repo", "base.sha"]
+
+# Byte range handed to one worker at a time.
+CHUNK_BYTES = 16 * 1024 ** 2
+
+
+def find_jsonl_files(base_dir):
+    """All *.jsonl files under base_dir, in os.walk order."""
+    paths = []
+    for root, _, files in os.walk(base_dir):
+        for file in files:
+            if file.endswith(".jsonl"):
+                paths.append(os.path.join(root, file))
+    return paths
+
+
+def _project(data, fields):
+    """{field: value} for dotted field paths such as 'base.sha' (None where missing)."""
+    record = {}
+    for field in fields:
+        value = data
+        for key in field.split("."):
+            value = value.get(key) if isinstance(value, dict) else None
+        record[field] = value
+    return record
+
+
+def _read_chunk(args):
+    """Worker: projected records of the lines that start in [start, end) of path, plus decode errors."""
+    path, start, end, fields = args
+    records = []
+    errors = []
+    with open(path, "rb") as f:
+        if start:
+            # Skip the line that began in the previous chunk (or just its newline).
+            f.seek(start - 1)
+            f.readline()
+        while f.tell() < end:
+            line = f.readline()
+            if not line:
+                break
+            if not line.strip():
+                continue
+            try:
+                data = json.loads(line)
+            except json.JSONDecodeError as e:
+                errors.append(f"Error decoding json in {path}: {e}")
+                continue
+            records.append(_project(data, fields))
+    return records, errors
+
+
+def _chunks(paths, fields, chunk_bytes):
+    for path in paths:
+        size = os.path.getsize(path)
+        for start in range(0, max(size, 1), chunk_bytes):
+            yield path, start, min(start + chunk_bytes, size), fields
+
+
+def iter_records(base_dir, fields, processes=None, chunk_bytes=CHUNK_BYTES):
+    """
+    Yields {field: value} for every record of the JSONL files under base_dir.
+
+    Args:
+        base_dir: Directory searched recursively for *.jsonl files
+        fields: Field names to keep; nested fields as dotted paths, e.g. 'base.sha'
+        processes: Worker processes (default: os.cpu_count())
+        chunk_bytes: Size of the byte ranges parsed by one worker at a time
+    """
+    paths = find_jsonl_files(base_dir)
+    total_bytes = sum(os.path.getsize(path) for path in paths)
+    processes = processes or os.cpu_count()
+    print(f"Reading {len(paths)} JSONL files ({total_bytes / 1024 ** 2:.1f} MB) with {processes} processes...")
+    with multiprocessing.get_context("spawn").Pool(processes) as pool:
+        for records, errors in pool.imap(_read_chunk, _chunks(paths, list(fields), chunk_bytes)):
+            for error in errors:
+                print(error)
+            yield from records
+
+
+def _peak_rss_mb(who):
+    # ru_maxrss is in KB on Linux and in bytes on macOS
+    scale = 1024 ** 2 if sys.platform == "darwin" else 1024
+    return resource.getrusage(who).ru_maxrss / scale
+
+
+def _measure(mode, base_dir, fields, processes, results):
+    start = time.perf_counter()
+    if mode == "streaming":
+        count = sum(1 for _ in iter_records(base_dir, fields, processes))
+    else:
+        # What the analyze/augment scripts used to do: every full record in memory
+        rows = []
+        for path in find_jsonl_files(base_dir):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        try:
+                            rows.append(json.loads(line))
+                        except json.JSONDecodeError:
+                            pass
+        count = len(rows)
+    seconds = time.perf_counter() - start
+    results.put((mode, count, seconds, _peak_rss_mb(resource.RUSAGE_SELF),
+                 _peak_rss_mb(resource.RUSAGE_CHILDREN)))
+
+
+def benchmark(base_dir, fields, processes=None, baseline=False):
+    """Prints records/s and peak RSS of the streaming loader (and of loading everything, with baseline)."""
+    total_bytes = sum(os.path.getsize(path) for path in find_jsonl_files(base_dir))
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    for mode in ["streaming"] + (["full json.loads"] if baseline else []):
+        # A fresh process per mode, so each peak RSS is its own
+        process = context.Process(target=_measure, args=(mode, base_dir, fields, processes, results))
+        process.start()
+        mode, count, seconds, rss, children_rss = results.get()
+        process.join()
+        workers = f", largest worker {children_rss:.0f} MB" if mode == "streaming" else ""
+        print(f"{mode}: {count} records in {seconds:.2f}s, {count / seconds:,.0f} records/s, "
+              f"{total_bytes / 1024 ** 2 / seconds:,.1f} MB/s, peak RSS {rss:.0f} MB{workers}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the streaming Multi-SWE-bench loader.")
+    parser.add_argument("--base-dir", default=MULTI_SWE_BENCH_DIR, help="Directory with the JSONL files.")
+    parser.add_argument("--fields", nargs="+", default=MULTI_SWE_BENCH_FIELDS,
+                        help="Fields to project (dotted paths for nested fields).")
+    parser.add_argument("--processes", type=int, default=None, help="Worker processes (default: all cores).")
+    parser.add_argument("--baseline", action="store_true",
+                        help="Also measure loading every full record with json.loads in one process.")
+    args = parser.parse_args()
+    benchmark(args.base_dir, args.fields, args.processes, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
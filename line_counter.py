@@ -0,0 +1,251 @@
+"""
+Pure-Python line counter for TARGET_LANGUAGES.
+
+Classifies files by extension the way scc does (with "C Header" and
+"C++ Header" already folded into C and C++), and files without an extension
+by their shebang line, and splits lines into code, comment and blank using
+each language's comment and string syntax. The numbers closely track scc but
+are not guaranteed to be identical, so results from this counter are cached
+under their own key. Known gaps: scc tells C from C++ headers (.h) by their
+contents, and its extension table changes between versions (scc 4.1, for
+one, no longer counts .gemspec or Gemfile as Ruby and adds .ino to C++),
+which the tables below do not track.
+"""
+
+import os
+import re
+
+# Bump when classification or counting rules change (invalidates cached results).
+COUNTER_VERSION = 2
+
+EXTENSIONS = {
+    ".c": "C", ".ec": "C", ".pgc": "C", ".h": "C",
+    ".cc": "C++", ".cpp": "C++", ".cxx": "C++", ".c++": "C++", ".pcc": "C++", ".tpp": "C++",
+    ".hh": "C++", ".hpp": "C++", ".hxx": "C++", ".inl": "C++", ".ipp": "C++",
+    ".java": "Java",
+    ".kt": "Kotlin", ".kts": "Kotlin",
+    ".py": "Python", ".pyw": "Python", ".pyi": "Python",
+    ".go": "Go",
+    ".rs": "Rust",
+    ".js": "JavaScript", ".cjs": "JavaScript", ".mjs": "JavaScript",
+    ".html": "HTML", ".htm": "HTML",
+    ".rb": "Ruby", ".gemspec": "Ruby", ".podspec": "Ruby", ".thor": "Ruby", ".irb": "Ruby",
+    ".ts": "TypeScript", ".tsx": "TypeScript", ".cts": "TypeScript", ".mts": "TypeScript",
+    ".php": "PHP",
+}
+
+# Files scc recognises by name rather than extension.
+FILENAMES = {
+    "rakefile": "Ruby", "gemfile": "Ruby", "podfile": "Ruby", "vagrantfile": "Ruby",
+}
+
+# Languages scc tracks separately even though they share an extension above.
+SUFFIX_EXCLUDES = (".d.ts",)
+
+# Interpreters scc recognises in the shebang line of a file without an
+# extension ("#!/usr/bin/python3", "#!/usr/bin/env node"); names must match exactly.
+SHEBANGS = {
+    "python": "Python", "python2": "Python", "python3": "Python",
+    "node": "JavaScript",
+    "ruby": "Ruby",
+    "php": "PHP",
+}
+
+_LINE, _BLOCK, _STRING = "line", "block", "string"
+
+
+class Syntax:
+    """Comment and string delimiters of one language."""
+
+    def __init__(self, line_comments=(), block_comments=(), quotes=(), multiline_quotes=(),
+                 raw_quotes=(), doc_quotes=()):
+        # token -> (kind, end token, honours backslash escapes, may span lines)
+        self.tokens = {}
+        for token in line_comments:
+            self.tokens[token] = (_LINE, None, False, False)
+        for start, end in block_comments:
+            self.tokens[start] = (_BLOCK, end, False, True)
+        for token in quotes:
+            self.tokens[token] = (_STRING, token, True, False)
+        for token in multiline_quotes:
+            self.tokens[token] = (_STRING, token, True, True)
+        for token in raw_quotes:
+            self.tokens[token] = (_STRING, token, False, True)
+        # Strings opened by these at the start of a line are docstrings, which
+        # scc counts as comments.
+        self.doc_quotes = set(doc_quotes)
+        # Longest tokens first so '"""' wins over '"'.
+        ordered = sorted(self.tokens, key=len, reverse=True)
+        self.pattern = re.compile(b"|".join(re.escape(t) for t in ordered)) if ordered else None
+
+
+_C_STYLE = dict(line_comments=(b"//",), block_comments=((b"/*", b"*/"),))
+
+SYNTAX = {
+    "C": Syntax(**_C_STYLE, quotes=(b'"', b"'")),
+    "C++": Syntax(**_C_STYLE, quotes=(b'"', b"'")),
+    "Java": Syntax(**_C_STYLE, quotes=(b'"', b"'"), multiline_quotes=(b'"""',)),
+    "Kotlin": Syntax(**_C_STYLE, quotes=(b'"', b"'"), raw_quotes=(b'"""',)),
+    "Python": Syntax(line_comments=(b"#",), quotes=(b'"', b"'"), multiline_quotes=(b'"""', b"'''"),
+                     doc_quotes=(b'"""', b"'''")),
+    "Go": Syntax(**_C_STYLE, quotes=(b'"', b"'"), raw_quotes=(b"`",)),
+    "Rust": Syntax(**_C_STYLE, multiline_quotes=(b'"',)),
+    "JavaScript": Syntax(**_C_STYLE, quotes=(b'"', b"'"), multiline_quotes=(b"`",)),
+    "HTML": Syntax(block_comments=((b"<!--", b"-->"),)),
+    "Ruby": Syntax(line_comments=(b"#",), block_comments=((b"=begin", b"=end"),), quotes=(b'"', b"'")),
+    "TypeScript": Syntax(**_C_STYLE, quotes=(b'"', b"'"), multiline_quotes=(b"`",)),
+    "PHP": Syntax(line_comments=(b"//", b"#"), block_comments=((b"/*", b"*/"),), quotes=(b'"', b"'")),
+}
+
+
+# Directories scc never descends into (its --exclude-dir default). Other
+# dot-files and dot-directories are counted.
+EXCLUDED_DIRS = {".git", ".hg", ".svn"}
+
+
+def is_excluded(path):
+    """True if path lies below one of EXCLUDED_DIRS."""
+    return any(part in EXCLUDED_DIRS for part in path.replace("\\", "/").split("/")[:-1])
+
+
+def classify(path):
+    """Returns the TARGET_LANGUAGES language of path, or None if it is not counted."""
+    name = os.path.basename(path).lower()
+    if name in FILENAMES:
+        return FILENAMES[name]
+    if name.endswith(SUFFIX_EXCLUDES):
+        return None
+    return EXTENSIONS.get(os.path.splitext(name)[1])
+
+
+def may_have_shebang(path):
+    """True if scc would look for a shebang line in path (its name has no extension)."""
+    return "." not in os.path.basename(path)
+
+
+def shebang_language(head):
+    """Returns the language named by the shebang line at the start of head (bytes), or None."""
+    if not head.startswith(b"#!"):
+        return None
+    words = head[2:].split(b"\n", 1)[0].decode("utf-8", "replace").split()
+    if not words:
+        return None
+    interpreter = os.path.basename(words[0])
+    if interpreter == "env" and len(words) > 1:
+        interpreter = words[1]
+    return SHEBANGS.get(interpreter)
+
+
+def _find_end(line, start, end_token, escapes):
+    """Index just past end_token in line[start:], skipping backslash escapes; -1 if absent."""
+    while True:
+        index = line.find(end_token, start)
+        if index < 0 or not escapes:
+            return index if index < 0 else index + len(end_token)
+        backslashes = 0
+        while index - backslashes - 1 >= start and line[index - backslashes - 1] == 0x5C:
+            backslashes += 1
+        if backslashes % 2 == 0:
+            return index + len(end_token)
+        start = index + 1
+
+
+# Buffers are split into lines this many bytes at a time.
+_WINDOW_BYTES = 8 * 1024 ** 2
+
+
+def iter_lines(buffer, window=_WINDOW_BYTES):
+    """
+    Yields the lines of any bytes-like buffer (e.g. an mmap) like
+    bytes.splitlines() would, copying at most about `window` bytes at a time.
+    """
+    start = 0
+    size = len(buffer)
+    while start < size:
+        end = min(start + window, size)
+        if end < size:
+            # Cut after a newline, so a "\r\n" pair is never split.
+            newline = buffer.rfind(b"\n", start, end)
+            if newline >= 0:
+                end = newline + 1
+            else:
+                newline = buffer.find(b"\n", end)
+                end = newline + 1 if newline >= 0 else size
+        yield from buffer[start:end].splitlines()
+        start = end
+
+
+def count_lines(data, language):
+    """
+    Counts the lines of `data` as scc would for `language`.
+
+    Args:
+        data: bytes, or another buffer such as an mmap, which is scanned line
+              by line instead of being copied
+
+    Returns:
+        tuple: (code, comment, blank)
+    """
+    lines = data.splitlines() if isinstance(data, bytes) else iter_lines(data)
+    syntax = SYNTAX[language]
+    pattern = syntax.pattern
+    code = comment = blank = 0
+    # Open multi-line comment/string carried over from previous lines.
+    open_end = None
+    open_is_comment = False
+    open_escapes = False
+
+    for line in lines:
+        stripped = line.strip()
+        if not stripped:
+            blank += 1
+            continue
+
+        has_code = False
+        has_comment = False
+        pos = 0
+        if open_end is not None:
+            if open_is_comment:
+                has_comment = True
+            else:
+                has_code = True
+            end = _find_end(stripped, 0, open_end, open_escapes)
+            if end < 0:
+                code += has_code
+                comment += has_comment
+                continue
+            pos = end
+            open_end = None
+
+        while pos < len(stripped):
+            match = pattern.search(stripped, pos) if pattern else None
+            stop = match.start() if match else len(stripped)
+            if not has_code and stripped[pos:stop].strip():
+                has_code = True
+            if match is None:
+                break
+            kind, end_token, escapes, multiline = syntax.tokens[match.group()]
+            if match.start() == 0 and match.group() in syntax.doc_quotes:
+                kind = _BLOCK
+            if kind == _LINE:
+                has_comment = True
+                break
+            if kind == _BLOCK:
+                has_comment = True
+            else:
+                has_code = True
+            end = _find_end(stripped, match.end(), end_token, escapes)
+            if end < 0:
+                if multiline:
+                    open_end, open_is_comment, open_escapes = end_token, kind == _BLOCK, escapes
+                break
+            pos = end
+
+        if has_code:
+            code += 1
+        elif has_comment:
+            comment += 1
+        else:
+            blank += 1
+
+    return code, comment, blank
@@ -0,0 +1,105 @@
+"""
+Persistent LOC result cache.
+
+Maps a commit's root tree SHA (plus a key describing the counter version and
+language configuration) to the per-language LOC dict returned by
+common.get_loc_counts. Identical trees are therefore only counted once, across
+runs and across eval sets.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_MAX_ENTRIES = 500_000
+
+
+class LocCache:
+    """SQLite-backed {(tree_sha, counter_key): stats} store with LRU eviction."""
+
+    def __init__(self, path, counter_key, max_entries=DEFAULT_MAX_ENTRIES):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.counter_key = counter_key
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # Worker threads share one connection; a generous timeout lets several
+        # processes (e.g. on a shared build box) use the same file.
+        self._conn = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS loc_stats ("
+            " tree_sha TEXT NOT NULL,"
+            " counter_key TEXT NOT NULL,"
+            " stats TEXT NOT NULL,"
+            " last_used REAL NOT NULL,"
+            " PRIMARY KEY (tree_sha, counter_key))"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS loc_stats_last_used ON loc_stats (last_used)"
+        )
+        self._conn.commit()
+
+    def get(self, tree_sha):
+        """Returns the cached stats dict for tree_sha, or None on a miss."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT stats FROM loc_stats WHERE tree_sha = ? AND counter_key = ?",
+                (tree_sha, self.counter_key),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute(
+                "UPDATE loc_stats SET last_used = ? WHERE tree_sha = ? AND counter_key = ?",
+                (time.time(), tree_sha, self.counter_key),
+            )
+            self._conn.commit()
+            return json.loads(row[0])
+
+    def put(self, tree_sha, stats):
+        """Stores the stats dict computed for tree_sha."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO loc_stats (tree_sha, counter_key, stats, last_used) "
+                "VALUES (?, ?, ?, ?)",
+                (tree_sha, self.counter_key, json.dumps(stats), time.time()),
+            )
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM loc_stats").fetchone()[0]
+
+    def evict(self):
+        """Drops the least recently used entries beyond max_entries. Returns the number removed."""
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM loc_stats").fetchone()[0]
+            excess = count - self.max_entries
+            if excess <= 0:
+                return 0
+            self._conn.execute(
+                "DELETE FROM loc_stats WHERE rowid IN "
+                "(SELECT rowid FROM loc_stats ORDER BY last_used LIMIT ?)",
+                (excess,),
+            )
+            self._conn.commit()
+            return excess
+
+    def close(self):
+        """Applies the size cap and closes the database. Returns the number of evicted entries."""
+        evicted = self.evict()
+        with self._lock:
+            self._conn.close()
+        return evicted
+
+    def summary(self):
+        """One-line hit/miss summary for the run."""
+        lookups = self.hits + self.misses
+        rate = (self.hits / lookups * 100) if lookups else 0
+        return f"LOC cache: {self.hits} hits, {self.misses} misses ({rate:.1f}% hit rate)"
@@ -0,0 +1,229 @@
+"""
+Offline manifests of the HuggingFace eval-set datasets.
+
+The first time a dataset revision is used, its rows are read once and split
+into a compact manifest (instance_id, repo, base commit and the SHA-256 of
+every other field) and a content-addressed blob store holding the field
+values themselves (patches, test patches, problem statements, ...). Later
+runs only read the manifest, and the blobs they actually need, so neither
+the Arrow table nor the network is required:
+
+    with load_manifest("SWE-bench/SWE-bench_Verified") as manifest:
+        tasks = manifest.tasks()              # instance_id, repo, commit
+        patch = manifest.get(instance_id, "patch")
+
+When online, the dataset's current revision is looked up on the Hub (one
+small request) so a new revision gets a new manifest. Offline (--offline, or
+HF_HUB_OFFLINE=1 / HF_DATASETS_OFFLINE=1) the newest cached manifest is used.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import zlib
+
+from common import DEFAULT_CACHE_DIR
+
+# Kept inline in the manifest; everything else goes to the blob store.
+CORE_FIELDS = ["instance_id", "repo", "base_commit"]
+
+
+def _hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class BlobStore:
+    """SQLite-backed {sha256: value} store shared by all manifests; values are zlib-compressed."""
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS blobs (sha256 TEXT PRIMARY KEY, kind TEXT NOT NULL, data BLOB NOT NULL)"
+        )
+
+    def put(self, value):
+        """Stores a str (as text) or any other JSON value; returns its hash."""
+        if isinstance(value, str):
+            kind, data = "text", value.encode("utf-8")
+        else:
+            kind, data = "json", json.dumps(value, sort_keys=True).encode("utf-8")
+        # The kind is part of the key so '[]' and [] do not share a blob
+        sha = _hash(kind.encode("utf-8") + b"\0" + data)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO blobs (sha256, kind, data) VALUES (?, ?, ?)",
+                (sha, kind, zlib.compress(data)),
+            )
+        return sha
+
+    def get(self, sha):
+        """Returns the value stored under sha."""
+        with self._lock:
+            row = self._conn.execute("SELECT kind, data FROM blobs WHERE sha256 = ?", (sha,)).fetchone()
+        if row is None:
+            raise KeyError(f"Blob {sha} missing from {self.path}")
+        data = zlib.decompress(row[1]).decode("utf-8")
+        return data if row[0] == "text" else json.loads(data)
+
+    def commit(self):
+        with self._lock:
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+
+
+class DatasetManifest:
+    """
+    The rows of one dataset split at one revision, with field values read
+    from the blob store on demand. Close it (or use it as a context manager)
+    to close the blob store's SQLite connection.
+
+    Args:
+        info: Parsed manifest file (see build_manifest)
+        store: BlobStore holding the field values
+    """
+
+    def __init__(self, info, store):
+        self.dataset_name = info["dataset"]
+        self.split = info["split"]
+        self.revision = info["revision"]
+        self.fields = info["fields"]
+        self.store = store
+        # instance_id -> {"repo": ..., "base_commit": ..., "hashes": {field: sha or None}}
+        self.rows = {}
+        for instance_id, repo, base_commit, hashes in info["rows"]:
+            self.rows[instance_id] = {"repo": repo, "base_commit": base_commit,
+                                      "hashes": dict(zip(self.fields, hashes))}
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Closes the blob store; get() no longer works afterwards."""
+        self.store.close()
+
+    def __contains__(self, instance_id):
+        return instance_id in self.rows
+
+    def tasks(self):
+        """Returns a list of dicts with keys: 'instance_id', 'repo', 'commit'."""
+        return [{"instance_id": instance_id, "repo": row["repo"], "commit": row["base_commit"]}
+                for instance_id, row in self.rows.items()]
+
+    def get(self, instance_id, field):
+        """Value of one field of one instance, or None if the dataset has it empty."""
+        if field in CORE_FIELDS:
+            return instance_id if field == "instance_id" else self.rows[instance_id][field]
+        sha = self.rows[instance_id]["hashes"][field]
+        return None if sha is None else self.store.get(sha)
+
+    def records(self, fields):
+        """Yields one dict of the requested fields per instance, in dataset order."""
+        for instance_id in self.rows:
+            yield {field: self.get(instance_id, field) for field in fields}
+
+
+def _manifest_dir(cache_dir):
+    return os.path.join(cache_dir, "manifests")
+
+
+def _manifest_path(cache_dir, dataset_name, split, revision):
+    name = f"{dataset_name.replace('/', '__')}__{split}__{revision}.json"
+    return os.path.join(_manifest_dir(cache_dir), name)
+
+
+def _latest_path(cache_dir, dataset_name, split):
+    return os.path.join(_manifest_dir(cache_dir), f"{dataset_name.replace('/', '__')}__{split}.latest")
+
+
+def resolve_revision(dataset_name):
+    """Current commit SHA of the dataset on the Hub, or None if it cannot be looked up."""
+    try:
+        from huggingface_hub import HfApi
+        return HfApi().dataset_info(dataset_name).sha
+    except Exception as exc:
+        print(f"Could not look up the current revision of {dataset_name} ({exc}); "
+              f"using the newest cached manifest.")
+        return None
+
+
+def build_manifest(dataset_name, split, revision, store):
+    """Reads the dataset once and returns its manifest info, storing every non-core field in store."""
+    from datasets import load_dataset
+
+    print(f"Building manifest of {dataset_name} ({split}) at revision {revision}...")
+    dataset = load_dataset(dataset_name, split=split, revision=revision)
+    fields = [name for name in dataset.column_names if name not in CORE_FIELDS]
+    rows = []
+    for row in dataset:
+        hashes = [None if row[field] is None else store.put(row[field]) for field in fields]
+        rows.append([row["instance_id"], row["repo"], row["base_commit"], hashes])
+    store.commit()
+    return {"dataset": dataset_name, "split": split, "revision": revision, "fields": fields, "rows": rows}
+
+
+def offline_requested():
+    """True if the HuggingFace offline environment variables are set."""
+    return any(os.environ.get(name, "").lower() in ("1", "true", "yes")
+               for name in ("HF_HUB_OFFLINE", "HF_DATASETS_OFFLINE"))
+
+
+def load_manifest(dataset_name, split="test", cache_dir=DEFAULT_CACHE_DIR, offline=False):
+    """
+    Returns the DatasetManifest of dataset_name, building it on first use.
+
+    Args:
+        dataset_name: HuggingFace dataset, e.g. "SWE-bench/SWE-bench_Verified"
+        split: Dataset split
+        cache_dir: Directory for persistent caches (see --cache-dir)
+        offline: Never contact the Hub; use the newest cached manifest
+    """
+    latest_path = _latest_path(cache_dir, dataset_name, split)
+
+    revision = None
+    if not (offline or offline_requested()):
+        revision = resolve_revision(dataset_name)
+    if revision is None:
+        if not os.path.exists(latest_path):
+            raise FileNotFoundError(
+                f"No cached manifest of {dataset_name} ({split}) in {cache_dir}; run once with network access.")
+        with open(latest_path, encoding="utf-8") as f:
+            revision = f.read().strip()
+
+    store = BlobStore(os.path.join(_manifest_dir(cache_dir), "blobs.sqlite3"))
+    path = _manifest_path(cache_dir, dataset_name, split, revision)
+    try:
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                info = json.load(f)
+        else:
+            info = build_manifest(dataset_name, split, revision, store)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(info, f, separators=(",", ":"))
+            os.replace(tmp_path, path)
+        with open(latest_path + ".tmp", "w", encoding="utf-8") as f:
+            f.write(revision)
+        os.replace(latest_path + ".tmp", latest_path)
+    except BaseException:
+        store.close()
+        raise
+
+    manifest = DatasetManifest(info, store)
+    print(f"Loaded manifest of {dataset_name} ({split}) at revision {revision[:12]}: {len(manifest)} instances")
+    return manifest
@@ -0,0 +1,183 @@
+"""
+Multi-core pure-Python LOC counter.
+
+Walks a checked out tree the way scc does (.git/.hg/.svn and .gitignore'd
+paths are skipped, symlinks are not followed), classifies files into
+TARGET_LANGUAGES with line_counter.classify (or, for files without an
+extension, their shebang line) and counts code/comment/blank
+lines in a process pool. Files are memory-mapped and scanned line by line,
+so multi-GB files never have to fit in memory as Python bytes.
+
+Run it directly for a throughput benchmark against scc:
+
+    python parallel_counter.py /path/to/checkout --processes 8
+"""
+
+import argparse
+import mmap
+import multiprocessing
+import os
+import subprocess
+import time
+
+from line_counter import EXCLUDED_DIRS, classify, count_lines, may_have_shebang, shebang_language
+
+# Work is handed to the pool in chunks of about this many bytes (or files),
+# so small files do not pay one round trip each.
+CHUNK_BYTES = 32 * 1024 ** 2
+CHUNK_FILES = 256
+
+
+def list_files(root):
+    """Returns [(relative_path, language, size)] for the files scc would count under root."""
+    from incremental_loc import filter_ignored
+
+    candidates = {}
+    for dir_path, dirs, files in os.walk(root):
+        dirs[:] = [d for d in dirs if d not in EXCLUDED_DIRS]
+        for name in files:
+            path = os.path.join(dir_path, name)
+            if os.path.islink(path):
+                continue
+            language = classify(name)
+            if language is None and may_have_shebang(name):
+                with open(path, "rb") as f:
+                    language = shebang_language(f.readline(1024))
+            if language is None:
+                continue
+            candidates[os.path.relpath(path, root)] = (language, os.path.getsize(path))
+    return [(rel_path,) + candidates[rel_path] for rel_path in filter_ignored(root, list(candidates))]
+
+
+def count_file(path, language):
+    """(code, comment, blank) of one file, read through mmap."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return 0, 0, 0
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return count_lines(mm, language)
+
+
+def _count_chunk(chunk):
+    """Worker: {language: [code, comment, blank]} summed over chunk's (path, language) pairs."""
+    totals = {}
+    for path, language in chunk:
+        counts = count_file(path, language)
+        lang_totals = totals.setdefault(language, [0, 0, 0])
+        for i, value in enumerate(counts):
+            lang_totals[i] += value
+    return totals
+
+
+def _chunks(root, files):
+    chunk, chunk_bytes = [], 0
+    # Largest files first so a huge file does not start last and run alone.
+    for rel_path, language, size in sorted(files, key=lambda f: f[2], reverse=True):
+        chunk.append((os.path.join(root, rel_path), language))
+        chunk_bytes += size
+        if chunk_bytes >= CHUNK_BYTES or len(chunk) >= CHUNK_FILES:
+            yield chunk
+            chunk, chunk_bytes = [], 0
+    if chunk:
+        yield chunk
+
+
+class ParallelLineCounter:
+    """
+    Counts checked out trees with a pool of worker processes, kept alive
+    across count() calls. Safe to call from several threads at once.
+
+    Args:
+        processes: Pool size (default: os.cpu_count())
+    """
+
+    def __init__(self, processes=None):
+        self.processes = processes or os.cpu_count()
+        self._pool = None
+        self.files = 0
+        self.bytes = 0
+
+    def _get_pool(self):
+        if self._pool is None:
+            # Not fork: the pipeline forks from a process full of threads.
+            self._pool = multiprocessing.get_context("spawn").Pool(self.processes)
+        return self._pool
+
+    def count_detailed(self, root):
+        """Returns {language: (code, comment, blank)} for the tree at root."""
+        files = list_files(root)
+        self.files += len(files)
+        self.bytes += sum(size for _, _, size in files)
+
+        totals = {}
+        for chunk_totals in self._get_pool().imap_unordered(_count_chunk, _chunks(root, files)):
+            for language, counts in chunk_totals.items():
+                lang_totals = totals.setdefault(language, [0, 0, 0])
+                for i, value in enumerate(counts):
+                    lang_totals[i] += value
+        return {language: tuple(counts) for language, counts in totals.items()}
+
+    def count(self, root):
+        """Returns {language: code} for the tree at root."""
+        from common import TARGET_LANGUAGES
+
+        lang_stats = {lang_name: 0 for lang_name in TARGET_LANGUAGES}
+        for language, (code, _, _) in self.count_detailed(root).items():
+            lang_stats[language] += code
+        return lang_stats
+
+    def close(self):
+        """Stops the worker processes."""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+
+def benchmark(root, processes=None, repeat=3):
+    """Prints files/s and MB/s of ParallelLineCounter (and scc, if installed) on root."""
+    files = list_files(root)
+    total_bytes = sum(size for _, _, size in files)
+    print(f"{root}: {len(files)} countable files, {total_bytes / 1024 ** 2:.1f} MB")
+
+    def report(name, seconds):
+        print(f"{name}: {seconds:.2f}s, {len(files) / seconds:,.0f} files/s, "
+              f"{total_bytes / 1024 ** 2 / seconds:,.1f} MB/s")
+
+    counter = ParallelLineCounter(processes)
+    try:
+        counter.count(root)  # start the pool and warm the page cache
+        best = min(_timed(counter.count, root) for _ in range(repeat))
+        report(f"parallel_counter ({counter.processes} processes)", best)
+    finally:
+        counter.close()
+
+    single = min(_timed(_count_chunk, [(os.path.join(root, p), lang) for p, lang, _ in files])
+                 for _ in range(repeat))
+    report("parallel_counter (1 process)", single)
+
+    try:
+        scc = min(_timed(subprocess.run, ["scc", root, "--format", "json"], capture_output=True, check=True)
+                  for _ in range(repeat))
+        report("scc", scc)
+    except FileNotFoundError:
+        print("scc: not installed")
+
+
+def _timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    func(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the multi-core Python LOC counter.")
+    parser.add_argument("path", help="Checked out tree to count.")
+    parser.add_argument("--processes", type=int, default=None, help="Worker processes (default: all cores).")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per counter; the best time is reported.")
+    args = parser.parse_args()
+    benchmark(args.path, args.processes, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+Patch statistics for whole columns of patches at once.
+
+Instead of splitting every patch into Python strings, a batch of patches is
+joined into one byte buffer and scanned with numpy: line starts are found
+once, and each statistic is a byte-prefix test on those positions. Large
+columns are split into batches that are scanned on all cores.
+
+Added/deleted counts are exactly those of parse_patch_stats (str.splitlines
+semantics, '+++'/'---' header lines excluded). Files, hunks, binary files
+and renames come from git's "diff --git", "@@ ", "Binary files "/"GIT binary
+patch" and "rename from " lines.
+
+Run it directly to benchmark it against parse_patch_stats on the
+Multi-SWE-bench fix patches:
+
+    python patch_stats.py --base-dir Multi-SWE-bench --processes 8
+"""
+
+import argparse
+import multiprocessing
+import os
+import time
+from collections import namedtuple
+
+import numpy as np
+
+PatchStats = namedtuple("PatchStats", ["added", "deleted", "files", "hunks", "binary", "renames"])
+
+# CSV columns written by the augment scripts, in order.
+PATCH_COLUMNS = [
+    "golden_patch_added", "golden_patch_deleted", "golden_patch_total", "golden_patch_files",
+    "golden_patch_hunks", "golden_patch_binary", "golden_patch_renames",
+]
+
+# Patches are scanned in batches of about this many bytes.
+BATCH_BYTES = 32 * 1024 ** 2
+
+# Single-byte line boundaries of str.splitlines once encoded as UTF-8:
+# \n, \v, \f, \r, \x1c, \x1d, \x1e. (U+0085, U+2028 and U+2029 are multi-byte.)
+_LINE_BREAK = np.zeros(256, dtype=bool)
+_LINE_BREAK[[0x0A, 0x0B, 0x0C, 0x0D, 0x1C, 0x1D, 0x1E]] = True
+
+_PREFIXES = {
+    "files": [b"diff --git "],
+    "hunks": [b"@@ "],
+    "binary": [b"Binary files ", b"GIT binary patch"],
+    "renames": [b"rename from "],
+}
+_PADDING = max(len(prefix) for prefixes in _PREFIXES.values() for prefix in prefixes)
+
+
+def parse_patch_stats(patch_text):
+    """
+    Parses a git diff/patch string to count lines added and removed.
+
+    Returns:
+        tuple: (lines_added, lines_removed)
+    """
+    if not patch_text:
+        return 0, 0
+
+    added = 0
+    removed = 0
+
+    lines = patch_text.splitlines()
+    for line in lines:
+        # Check for additions (starts with + but not +++)
+        if line.startswith('+') and not line.startswith('+++'):
+            added += 1
+        # Check for deletions (starts with - but not ---)
+        elif line.startswith('-') and not line.startswith('---'):
+            removed += 1
+
+    return added, removed
+
+
+def _line_starts(buf, size):
+    """Positions in buf[:size] where a line begins (as str.splitlines would split it)."""
+    data = buf[:size]
+    starts = np.empty(size, dtype=bool)
+    starts[0] = True
+    starts[1:] = _LINE_BREAK[data[:-1]]
+    # U+0085 is C2 85, U+2028/U+2029 are E2 80 A8/A9
+    starts[2:] |= (data[:-2] == 0xC2) & (data[1:-1] == 0x85)
+    starts[3:] |= (data[:-3] == 0xE2) & (data[1:-2] == 0x80) & ((data[2:-1] == 0xA8) | (data[2:-1] == 0xA9))
+    return np.flatnonzero(starts)
+
+
+def _with_prefix(buf, positions, prefix):
+    """The positions at which buf continues with prefix."""
+    for i, byte in enumerate(prefix):
+        positions = positions[buf[positions + i] == byte]
+    return positions
+
+
+def _scan_batch(patches):
+    """Worker: (len(patches), 6) int64 array of PatchStats fields for a list of str/bytes/None patches."""
+    encoded = [p.encode("utf-8", "surrogatepass") if isinstance(p, str) else (p or b"") for p in patches]
+    lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+    # Every patch ends with a newline so no line runs into the next patch.
+    patch_offsets = np.cumsum(lengths + 1) - (lengths + 1)
+    size = int(lengths.sum()) + len(encoded)
+    buf = np.frombuffer(b"\n".join(encoded) + b"\n" + b"\0" * _PADDING, dtype=np.uint8)
+
+    starts = _line_starts(buf, size)
+    plus = _with_prefix(buf, starts, b"+")
+    minus = _with_prefix(buf, starts, b"-")
+    found = {
+        "added": plus[(buf[plus + 1] != ord("+")) | (buf[plus + 2] != ord("+"))],
+        "deleted": minus[(buf[minus + 1] != ord("-")) | (buf[minus + 2] != ord("-"))],
+    }
+    for name, prefixes in _PREFIXES.items():
+        found[name] = np.concatenate([_with_prefix(buf, starts, prefix) for prefix in prefixes])
+
+    stats = np.zeros((len(encoded), len(PatchStats._fields)), dtype=np.int64)
+    for column, name in enumerate(PatchStats._fields):
+        patch_ids = np.searchsorted(patch_offsets, found[name], side="right") - 1
+        stats[:, column] = np.bincount(patch_ids, minlength=len(encoded))
+    return stats
+
+
+def _batches(patches, batch_bytes):
+    batch, batch_size = [], 0
+    for patch in patches:
+        batch.append(patch)
+        batch_size += len(patch) if patch else 0
+        if batch_size >= batch_bytes:
+            yield batch
+            batch, batch_size = [], 0
+    if batch:
+        yield batch
+
+
+def patch_stats_many(patches, processes=None, batch_bytes=BATCH_BYTES):
+    """
+    Statistics of every patch in a column of patches.
+
+    Args:
+        patches: Sequence of patch texts (str, UTF-8 bytes, or None for no patch)
+        processes: Worker processes for inputs larger than one batch (default: os.cpu_count())
+        batch_bytes: Approximate size of the batches scanned in one go
+
+    Returns:
+        list: One PatchStats per patch, all zero for an empty or missing patch
+    """
+    batches = list(_batches(patches, batch_bytes))
+    if not batches:
+        return []
+    processes = processes or os.cpu_count()
+    if len(batches) == 1 or processes == 1:
+        arrays = [_scan_batch(batch) for batch in batches]
+    else:
+        with multiprocessing.get_context("spawn").Pool(min(processes, len(batches))) as pool:
+            arrays = pool.map(_scan_batch, batches)
+    return [PatchStats(*row) for row in np.concatenate(arrays).tolist()]
+
+
+def patch_stats(patch_text):
+    """PatchStats of a single patch."""
+    return patch_stats_many([patch_text])[0]
+
+
+def patch_columns(stats):
+    """{column: value} for PATCH_COLUMNS from one PatchStats."""
+    return dict(zip(PATCH_COLUMNS, (
+        stats.added, stats.deleted, stats.added + stats.deleted, stats.files,
+        stats.hunks, stats.binary, stats.renames,
+    )))
+
+
+def benchmark(patches, processes=None, repeat=3):
+    """Prints patches/s and MB/s of parse_patch_stats and patch_stats_many, checking they agree."""
+    total_mb = sum(len(p.encode("utf-8", "surrogatepass")) for p in patches if p) / 1024 ** 2
+    print(f"{len(patches)} patches, {total_mb:.1f} MB")
+
+    def timed(label, fn):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = fn()
+            seconds = time.perf_counter() - start
+            best = seconds if best is None else min(best, seconds)
+        print(f"  {label:<32} {best:8.3f}s  {len(patches) / best:12,.0f} patches/s  {total_mb / best:8.1f} MB/s")
+        return result
+
+    reference = timed("parse_patch_stats (per patch)", lambda: [parse_patch_stats(p) for p in patches])
+    single = timed("patch_stats_many (1 process)", lambda: patch_stats_many(patches, processes=1))
+    processes = processes or os.cpu_count()
+    parallel = timed(f"patch_stats_many ({processes} processes)", lambda: patch_stats_many(patches, processes))
+
+    mismatches = sum(1 for ref, stats in zip(reference, single) if ref != (stats.added, stats.deleted))
+    print(f"  added/deleted mismatches vs parse_patch_stats: {mismatches}")
+    if parallel != single:
+        print("  Warning: parallel and single-process results differ")
+    if single:
+        totals = PatchStats(*map(sum, zip(*single)))
+        print("  totals: " + ", ".join(f"{name}={value}" for name, value in totals._asdict().items()))
+
+
+def main():
+    from jsonl_loader import MULTI_SWE_BENCH_DIR, iter_records
+
+    parser = argparse.ArgumentParser(description="Benchmark patch statistics on the Multi-SWE-bench fix patches.")
+    parser.add_argument("--base-dir", default=MULTI_SWE_BENCH_DIR, help="Directory with the JSONL files.")
+    parser.add_argument("--processes", type=int, default=None, help="Worker processes (default: all cores).")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per variant; the best is reported.")
+    args = parser.parse_args()
+
+    patches = [record["fix_patch"] for record in iter_records(args.base_dir, ["fix_patch"], args.processes)]
+    benchmark(patches, args.processes, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
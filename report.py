@@ -6,12 +6,26 @@ Analyzes augmented benchmark data and generates complexity statistics
 for each benchmark dataset. Outputs to console, CSV, and Markdown.
 """
 
-import pandas as pd
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import time
 from pathlib import Path
-from common import TARGET_LANGUAGES, EvalSet, EVAL_SET_ORGS
+from common import DEFAULT_CACHE_DIR, TARGET_LANGUAGES, EvalSet, EVAL_SET_ORGS
+
+# numpy and pandas are imported where a benchmark is (re)computed, so a rerun
+# that only renders cached results does not pay for importing them.
 
 AUGMENTED_DIR = Path("augmented")
 REPORTS_DIR = Path("reports")
+REPORT_CACHE_DIR = os.path.join(DEFAULT_CACHE_DIR, "reports")
+
+# Statistics computed by compute_stats / grouped_stats, in display order
+STAT_KEYS = ["mean", "median", "std", "min", "25%", "75%", "max"]
 
 
 def get_org_for_eval_set(eval_set_name: str) -> str:
@@ -22,44 +36,211 @@ def get_org_for_eval_set(eval_set_name: str) -> str:
     raise ValueError(f'Unknown eval_set_name: {eval_set_name}')
 
 
-def load_benchmark_data() -> dict[str, pd.DataFrame]:
-    """Load all augmented CSV files from the augmented directory."""
-    benchmarks = {}
+def benchmark_sources() -> list[Path]:
+    """
+    The file to read for every augmented CSV in the augmented directory: the
+    CSV's typed .arrow copy (see columnar.py) when it is at least as new as
+    the CSV, the CSV otherwise.
+    """
+    sources = []
     for csv_file in sorted(AUGMENTED_DIR.glob("*_augmented.csv")):
-        df = pd.read_csv(csv_file)
-        # Use the eval_set column value as the benchmark name
-        if "eval_set" in df.columns and len(df) > 0:
-            name = df["eval_set"].iloc[0]
+        arrow_file = csv_file.with_suffix(".arrow")
+        if arrow_file.exists() and arrow_file.stat().st_mtime >= csv_file.stat().st_mtime:
+            sources.append(arrow_file)
         else:
-            # Fallback to extracting from filename
-            name = csv_file.stem.replace("_loc_stats_augmented", "")
+            sources.append(csv_file)
+    return sources
+
+
+def load_benchmark_file(source: Path) -> tuple[str, pd.DataFrame]:
+    """Load one benchmark (memory-mapping .arrow files) and return (name, DataFrame)."""
+    import pandas as pd
+
+    if source.suffix == ".arrow":
+        from columnar import read_column_names, read_columnar
+        # Commit ids are not used by the report; skip decoding them
+        columns = [name for name in read_column_names(str(source)) if name != "commit"]
+        df = read_columnar(str(source), columns)
+    else:
+        df = pd.read_csv(source)
+    # Use the eval_set column value as the benchmark name
+    if "eval_set" in df.columns and len(df) > 0:
+        name = df["eval_set"].iloc[0]
+    else:
+        # Fallback to extracting from filename
+        name = source.stem.replace("_loc_stats_augmented", "")
+    return name, df
+
+
+def load_benchmark_data() -> dict[str, pd.DataFrame]:
+    """Load all augmented benchmarks from the augmented directory."""
+    benchmarks = {}
+    for source in benchmark_sources():
+        name, df = load_benchmark_file(source)
         benchmarks[name] = df
     return benchmarks
 
 
-def get_primary_language(row: pd.Series) -> str:
-    """Determine the primary language for a task based on max LOC."""
-    lang_cols = [col for col in TARGET_LANGUAGES if col in row.index]
-    loc_values = {lang: row[lang] for lang in lang_cols}
-    primary = max(loc_values, key=loc_values.get)
-    return primary if loc_values[primary] > 0 else "Unknown"
+def report_code_version() -> str:
+    """
+    Hash of everything that shapes analyze_benchmark's results: this file,
+    columnar.py (which reads the .arrow copies) and TARGET_LANGUAGES.
+    """
+    digest = hashlib.sha256(Path(__file__).read_bytes())
+    digest.update(Path(__file__).with_name("columnar.py").read_bytes())
+    digest.update(json.dumps(TARGET_LANGUAGES).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def to_plain(value):
+    """value with numpy scalars as int/float/str and tuples as lists, as it reads back from JSON."""
+    if isinstance(value, dict):
+        return {to_plain(key): to_plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_plain(item) for item in value]
+    if hasattr(value, "item"):
+        # numpy scalar
+        return value.item()
+    return value
+
+
+class ResultCache:
+    """
+    analyze_benchmark results on disk, one JSON file per input file, keyed by
+    the SHA-256 of the input's content and the report code version.
+
+    Args:
+        cache_dir: Directory holding the cached results
+    """
+
+    def __init__(self, cache_dir: str = REPORT_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.version = report_code_version()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, source: Path) -> str:
+        digest = hashlib.sha256(self.version.encode("ascii"))
+        digest.update(source.read_bytes())
+        return digest.hexdigest()
+
+    def _path(self, source: Path, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{source.name}.{key[:32]}.json")
+
+    def get(self, source: Path, key: str) -> dict | None:
+        """Cached results of source, or None."""
+        try:
+            with open(self._path(source, key), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, source: Path, key: str, results: dict):
+        """Stores results (see to_plain) and drops older entries for the same source."""
+        path = self._path(source, key)
+        for name in os.listdir(self.cache_dir):
+            stale = os.path.join(self.cache_dir, name)
+            if name.startswith(f"{source.name}.") and name.endswith(".json") and stale != path:
+                os.remove(stale)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(results, f)
+        os.replace(path + ".tmp", path)
+
+    def _outputs_path(self) -> str:
+        return os.path.join(self.cache_dir, "outputs.json")
+
+    def _outputs(self) -> dict:
+        try:
+            with open(self._outputs_path(), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def output_current(self, output_path: Path, inputs: str) -> bool:
+        """True if output_path is unchanged since record_output(output_path, inputs)."""
+        entry = self._outputs().get(str(output_path))
+        try:
+            return (entry is not None and entry["inputs"] == inputs
+                    and entry["sha256"] == hashlib.sha256(output_path.read_bytes()).hexdigest())
+        except OSError:
+            return False
+
+    def record_output(self, output_path: Path, inputs: str):
+        """Remembers that output_path was written from inputs."""
+        outputs = self._outputs()
+        outputs[str(output_path)] = {"inputs": inputs,
+                                     "sha256": hashlib.sha256(output_path.read_bytes()).hexdigest()}
+        with open(self._outputs_path() + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(outputs, f)
+        os.replace(self._outputs_path() + ".tmp", self._outputs_path())
+
+
+def analyze_sources(sources: list[Path], cache: ResultCache | None = None) -> list[dict]:
+    """
+    analyze_benchmark results (see to_plain) of every source, taken from the
+    cache where the source is unchanged. Benchmarks sharing a name keep the
+    position of the first and the results of the last, as in load_benchmark_data.
+    """
+    by_name = {}
+    recomputed = 0
+    for source in sources:
+        key = cache.key(source) if cache else None
+        results = cache.get(source, key) if cache else None
+        if results is None:
+            name, df = load_benchmark_file(source)
+            results = to_plain(analyze_benchmark(name, df))
+            recomputed += 1
+            if cache:
+                cache.put(source, key, results)
+        by_name[results["name"]] = results
+    if cache:
+        print(f"Recomputed {recomputed} of {len(sources)} benchmarks; "
+              f"{len(sources) - recomputed} taken from {cache.cache_dir}")
+    return list(by_name.values())
+
+
+def primary_languages(loc: pd.DataFrame) -> pd.Series:
+    """Primary language (column with the most LOC, first on ties) of every task, or "Unknown" without code."""
+    return loc.idxmax(axis=1).where(loc.max(axis=1) > 0, "Unknown")
 
 
 def compute_stats(series: pd.Series) -> dict:
     """Compute standard statistics for a numeric series."""
+    quartiles = series.quantile([0.25, 0.75])
     return {
         "mean": series.mean(),
         "median": series.median(),
         "std": series.std(),
         "min": series.min(),
-        "25%": series.quantile(0.25),
-        "75%": series.quantile(0.75),
+        "25%": quartiles[0.25],
+        "75%": quartiles[0.75],
         "max": series.max(),
     }
 
 
+def grouped_stats(frame: pd.DataFrame, by, sort: bool = True) -> pd.DataFrame:
+    """
+    The compute_stats statistics of every column of frame for every group of
+    by, from one grouped aggregation plus one grouped quantile pass.
+
+    Returns:
+        DataFrame indexed by group, with (column, stat) columns
+    """
+    import pandas as pd
+
+    grouped = frame.groupby(by, sort=sort, observed=True)
+    table = grouped.agg(["mean", "median", "std", "min", "max"])
+    quartiles = grouped.quantile([0.25, 0.75]).unstack().reindex(table.index)
+    quartiles = quartiles.rename(columns={0.25: "25%", 0.75: "75%"}, level=1)
+    return pd.concat([table, quartiles], axis=1)
+
+
+def stats_of(table: pd.DataFrame, group, column: str) -> dict:
+    """The compute_stats-style dict of one group and column of a grouped_stats table."""
+    return {stat: table.at[group, (column, stat)] for stat in STAT_KEYS}
+
+
 def analyze_benchmark(name: str, df: pd.DataFrame) -> dict:
-    """Analyze a single benchmark dataset and return stats."""
+    """Analyze a single benchmark dataset and return stats (df is not modified)."""
     results = {
         "name": name,
         "task_count": len(df),
@@ -67,45 +248,43 @@ def analyze_benchmark(name: str, df: pd.DataFrame) -> dict:
 
     # Compute total LOC per task
     lang_cols = [col for col in TARGET_LANGUAGES if col in df.columns]
-    df["total_loc"] = df[lang_cols].sum(axis=1)
+    loc = df[lang_cols]
+    total_loc = loc.sum(axis=1)
 
     # Repository size stats
-    results["repo_size_stats"] = compute_stats(df["total_loc"])
-
-    # LOC stats by language (filter out languages < 2% of total codebase)
-    total_loc_all_langs = df[lang_cols].sum().sum()
-    loc_by_lang = {}
-    for lang in lang_cols:
-        lang_total_loc = df[lang].sum()
-        lang_percentage = (lang_total_loc / total_loc_all_langs * 100) if total_loc_all_langs > 0 else 0
-        # Skip languages that contribute less than 2% of total codebase
-        if lang_percentage < 2:
-            continue
-        tasks_with_code = df[df[lang] > 0]
-        if len(tasks_with_code) > 0:
-            loc_by_lang[lang] = {
-                "tasks_with_code": len(tasks_with_code),
-                "percentage": lang_percentage,
-                **compute_stats(tasks_with_code[lang]),
-            }
-    results["loc_by_language"] = loc_by_lang
-
-    # Determine primary language for each task
-    df["primary_language"] = df.apply(get_primary_language, axis=1)
-
-    # Patch complexity stats per primary language
+    results["repo_size_stats"] = compute_stats(total_loc)
+
+    # File count and complexity density, when the LOC CSVs were written with
+    # --extra-stats (rows counted without it have empty columns and are skipped)
+    file_cols = [f"{lang}_files" for lang in lang_cols if f"{lang}_files" in df.columns]
+    if file_cols:
+        files_per_task = df[file_cols].sum(axis=1, min_count=1).dropna()
+        if len(files_per_task) > 0:
+            results["file_count_stats"] = compute_stats(files_per_task)
+    complexity_cols = [f"{lang}_complexity" for lang in lang_cols if f"{lang}_complexity" in df.columns]
+    if complexity_cols:
+        complexity = df[complexity_cols].sum(axis=1, min_count=1)
+        has_density = complexity.notna() & (total_loc > 0)
+        if has_density.any():
+            results["complexity_density_stats"] = compute_stats(
+                complexity[has_density] / total_loc[has_density] * 1000)
+
+    results["loc_by_language"] = analyze_languages(df, loc)
+
+    # Patch complexity stats per primary language, in order of first appearance
     patch_cols = ["golden_patch_added", "golden_patch_deleted", "golden_patch_total"]
-    patch_by_lang = {}
-    for lang in df["primary_language"].unique():
-        lang_df = df[df["primary_language"] == lang]
-        if len(lang_df) > 0:
-            patch_by_lang[lang] = {
-                "task_count": len(lang_df),
-                "added": compute_stats(lang_df["golden_patch_added"]),
-                "deleted": compute_stats(lang_df["golden_patch_deleted"]),
-                "total": compute_stats(lang_df["golden_patch_total"]),
-            }
-    results["patch_by_language"] = patch_by_lang
+    primary = primary_languages(loc)
+    patch_table = grouped_stats(df[patch_cols], primary, sort=False)
+    task_counts = primary.groupby(primary, sort=False).size()
+    results["patch_by_language"] = {
+        lang: {
+            "task_count": int(task_counts[lang]),
+            "added": stats_of(patch_table, lang, "golden_patch_added"),
+            "deleted": stats_of(patch_table, lang, "golden_patch_deleted"),
+            "total": stats_of(patch_table, lang, "golden_patch_total"),
+        }
+        for lang in patch_table.index
+    }
 
     # Overall patch complexity stats
     results["patch_overall"] = {
@@ -115,41 +294,83 @@ def analyze_benchmark(name: str, df: pd.DataFrame) -> dict:
     }
 
     # Repository-level stats
-    results["repositories"] = analyze_repositories(df, lang_cols)
+    results["repositories"] = analyze_repositories(df, lang_cols, total_loc)
     results["repo_count"] = len(results["repositories"])
 
     return results
 
 
-def analyze_repositories(df: pd.DataFrame, lang_cols: list[str]) -> list[dict]:
+def analyze_languages(df: pd.DataFrame, loc: pd.DataFrame) -> dict:
+    """LOC stats by language over the tasks with code in it (languages < 2% of the total codebase are left out)."""
+    import numpy as np
+    import pandas as pd
+
+    lang_totals = loc.sum()
+    total_loc_all_langs = lang_totals.sum()
+    if total_loc_all_langs > 0:
+        percentages = lang_totals / total_loc_all_langs * 100
+    else:
+        percentages = lang_totals * 0
+    langs = [lang for lang in loc.columns if percentages[lang] >= 2]
+    if not langs:
+        return {}
+
+    # Long form: one (language, loc) row per task and language with code
+    values = loc[langs].to_numpy()
+    task_idx, lang_idx = np.nonzero(values > 0)
+    long = pd.DataFrame({"loc": values[task_idx, lang_idx]})
+    language = pd.Categorical.from_codes(lang_idx, categories=langs)
+    table = grouped_stats(long, language)
+    tasks_with_code = long.groupby(language, observed=True).size()
+
+    loc_by_lang = {}
+    for lang in langs:
+        if lang not in table.index:
+            continue
+        loc_by_lang[lang] = {
+            "tasks_with_code": int(tasks_with_code[lang]),
+            "percentage": percentages[lang],
+            **stats_of(table, lang, "loc"),
+        }
+        if f"{lang}_complexity" in df.columns:
+            counted = (loc[lang] > 0) & df[f"{lang}_complexity"].notna()
+            counted_loc = loc[lang][counted].sum()
+            if counted_loc > 0:
+                loc_by_lang[lang]["complexity_per_kloc"] = (
+                    df[f"{lang}_complexity"][counted].sum() / counted_loc * 1000)
+    return loc_by_lang
+
+
+def analyze_repositories(df: pd.DataFrame, lang_cols: list[str], total_loc: pd.Series) -> list[dict]:
     """Analyze stats per repository."""
-    repos = []
-    for repo_name, repo_df in df.groupby("repo"):
-        # Get max LOC for each language across tasks
-        lang_max = {lang: repo_df[lang].max() for lang in lang_cols}
+    import numpy as np
 
-        # Max repo size (max total_loc across all tasks for this repo)
-        max_repo_size = repo_df["total_loc"].max()
+    by_repo = df["repo"]
+    # Max LOC of each language across a repo's tasks, and its max repo size
+    lang_max = df[lang_cols].groupby(by_repo).max()
+    max_repo_size = total_loc.groupby(by_repo).max()
+    # Number of tasks and median task complexity (median of golden_patch_total)
+    patch_stats = df["golden_patch_total"].groupby(by_repo).agg(["size", "median"])
 
+    # Languages by LOC descending (stable, like sorted(..., reverse=True))
+    order = np.argsort(-lang_max.to_numpy(dtype=float), axis=1, kind="stable")
+    lang_values = [lang_max[lang].to_numpy() for lang in lang_cols]
+    max_sizes = max_repo_size.to_numpy()
+
+    repos = []
+    for i, repo_name in enumerate(lang_max.index):
         # Filter languages with LOC >= 5% of total and sort by LOC descending
-        threshold = max_repo_size * 0.05
+        threshold = max_sizes[i] * 0.05
         main_langs = [
-            (lang, loc) for lang, loc in sorted(lang_max.items(), key=lambda x: x[1], reverse=True)
-            if loc >= threshold
+            (lang_cols[j], lang_values[j][i]) for j in order[i]
+            if lang_values[j][i] >= threshold
         ]
-
-        # Number of tasks
-        task_count = len(repo_df)
-
-        # Median task complexity (median of golden_patch_total)
-        median_complexity = repo_df["golden_patch_total"].median()
-
         repos.append({
             "name": repo_name,
             "main_languages": main_langs,  # List of (lang, loc) tuples
-            "max_repo_size": max_repo_size,
-            "task_count": task_count,
-            "median_complexity": median_complexity,
+            "max_repo_size": max_sizes[i],
+            "task_count": int(patch_stats.at[repo_name, "size"]),
+            "median_complexity": patch_stats.at[repo_name, "median"],
         })
 
     # Sort by task count descending
@@ -159,7 +380,7 @@ def analyze_repositories(df: pd.DataFrame, lang_cols: list[str]) -> list[dict]:
 
 def format_number(val, decimals=1) -> str:
     """Format a number for display."""
-    if pd.isna(val):
+    if val is None or (isinstance(val, float) and math.isnan(val)):
         return "N/A"
     if abs(val) >= 1_000_000:
         return f"{val/1_000_000:.{decimals}f}M"
@@ -184,6 +405,20 @@ def print_benchmark_report(results: dict):
     print(f"  Mean: {format_number(stats['mean']):>10}  |  Median: {format_number(stats['median']):>10}  |  Std: {format_number(stats['std']):>10}")
     print(f"  Min:  {format_number(stats['min']):>10}  |  25%:    {format_number(stats['25%']):>10}  |  75%: {format_number(stats['75%']):>10}  |  Max: {format_number(stats['max']):>10}")
 
+    # Files and complexity density (only with --extra-stats columns)
+    for title, key in [("Files per Task", "file_count_stats"),
+                       ("Complexity Density (per 1K LOC)", "complexity_density_stats")]:
+        if key not in results:
+            continue
+        print(f"\n--- {title} ---")
+        stats = results[key]
+        print(f"  Mean: {format_number(stats['mean']):>10}  |  Median: {format_number(stats['median']):>10}  |  Std: {format_number(stats['std']):>10}")
+        print(f"  Min:  {format_number(stats['min']):>10}  |  25%:    {format_number(stats['25%']):>10}  |  75%: {format_number(stats['75%']):>10}  |  Max: {format_number(stats['max']):>10}")
+    density_langs = [(lang, stats["complexity_per_kloc"]) for lang, stats in results["loc_by_language"].items()
+                     if "complexity_per_kloc" in stats]
+    if density_langs:
+        print("  By language: " + ", ".join(f"{lang} {density:.1f}" for lang, density in density_langs))
+
     # LOC Stats by Language (only languages >= 2% of total codebase)
     print(f"\n--- LOC Stats by Language (>= 2% of codebase) ---")
     print(f"  {'Language':<12} {'%':>6} {'Tasks':>7} {'Mean':>10} {'Median':>10} {'Std':>10} {'Min':>8} {'Max':>10}")
@@ -233,8 +468,19 @@ def print_benchmark_report(results: dict):
         )
 
 
-def generate_summary_csv(all_results: list[dict], output_path: Path):
-    """Generate a summary CSV with key stats for all benchmarks."""
+def generate_summary_csv(all_results: list[dict], output_path: Path, cache: ResultCache | None = None):
+    """
+    Generate a summary CSV with key stats for all benchmarks. With a cache, a
+    summary written from the same results by an earlier run is left as it is,
+    so a run that recomputed nothing does not import pandas.
+    """
+    inputs = hashlib.sha256(json.dumps(all_results, sort_keys=True).encode("utf-8")).hexdigest()
+    if cache is not None and cache.output_current(output_path, inputs):
+        print(f"\nSummary CSV unchanged: {output_path}")
+        return
+
+    import pandas as pd
+
     rows = []
     for res in all_results:
         row = {
@@ -269,6 +515,15 @@ def generate_summary_csv(all_results: list[dict], output_path: Path):
             "patch_total_max": res["patch_overall"]["total"]["max"],
         }
 
+        # File count and complexity density (only with --extra-stats columns)
+        if "file_count_stats" in res:
+            row["repo_files_mean"] = res["file_count_stats"]["mean"]
+            row["repo_files_median"] = res["file_count_stats"]["median"]
+            row["repo_files_max"] = res["file_count_stats"]["max"]
+        if "complexity_density_stats" in res:
+            row["complexity_per_kloc_mean"] = res["complexity_density_stats"]["mean"]
+            row["complexity_per_kloc_median"] = res["complexity_density_stats"]["median"]
+
         # Add top 3 languages by task count
         sorted_langs = sorted(
             res["loc_by_language"].items(),
@@ -282,11 +537,22 @@ def generate_summary_csv(all_results: list[dict], output_path: Path):
 
         rows.append(row)
 
-    df = pd.DataFrame(rows)
-    df.to_csv(output_path, index=False)
+    pd.DataFrame(rows).to_csv(output_path, index=False)
+    if cache is not None:
+        cache.record_output(output_path, inputs)
     print(f"\nSummary CSV saved to: {output_path}")
 
 
+def write_if_changed(output_path: Path, content: str):
+    """Writes content to output_path unless the file already holds exactly that."""
+    try:
+        if output_path.read_text(encoding="utf-8") == content:
+            return
+    except OSError:
+        pass
+    output_path.write_text(content, encoding="utf-8")
+
+
 def generate_markdown_report(all_results: list[dict], output_path: Path):
     """Generate a detailed Markdown report."""
     lines = []
@@ -337,6 +603,31 @@ def generate_markdown_report(all_results: list[dict], output_path: Path):
         lines.append(f"| Max | {format_number(stats['max'])} |")
         lines.append("")
 
+        # Files and complexity density (only with --extra-stats columns)
+        for title, key in [("Files per Task", "file_count_stats"),
+                           ("Complexity Density (per 1K LOC)", "complexity_density_stats")]:
+            if key not in res:
+                continue
+            lines.append(f"### {title}\n")
+            stats = res[key]
+            lines.append("| Mean | Median | Std | Min | 25% | 75% | Max |")
+            lines.append("|------|--------|-----|-----|-----|-----|-----|")
+            lines.append(
+                f"| {format_number(stats['mean'])} | {format_number(stats['median'])} | "
+                f"{format_number(stats['std'])} | {format_number(stats['min'])} | "
+                f"{format_number(stats['25%'])} | {format_number(stats['75%'])} | "
+                f"{format_number(stats['max'])} |"
+            )
+            lines.append("")
+        density_langs = [(lang, stats["complexity_per_kloc"]) for lang, stats in res["loc_by_language"].items()
+                         if "complexity_per_kloc" in stats]
+        if density_langs:
+            lines.append("| Language | Complexity per 1K LOC |")
+            lines.append("|----------|-----------------------|")
+            for lang, density in density_langs:
+                lines.append(f"| {lang} | {density:.1f} |")
+            lines.append("")
+
         # LOC by Language (only languages >= 2% of total codebase)
         lines.append("### LOC Stats by Language (>= 2% of codebase)\n")
         lines.append("| Language | % | Tasks w/ Code | Mean | Median | Std | Min | Max |")
@@ -405,34 +696,89 @@ def generate_markdown_report(all_results: list[dict], output_path: Path):
             )
         lines.append("")
 
-    output_path.write_text("\n".join(lines))
+    write_if_changed(output_path, "\n".join(lines))
     print(f"Markdown report saved to: {output_path}")
 
 
+def synthetic_benchmark(task_count: int, seed: int = 0) -> pd.DataFrame:
+    """
+    A random augmented-CSV-like DataFrame with task_count tasks spread over
+    about sqrt(task_count) repositories, each with a main language and a few
+    secondary ones.
+    """
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    repo_count = max(1, int(task_count ** 0.5))
+    repo_ids = rng.integers(0, repo_count, task_count)
+    repo_names = [f"org{i % 97}/repo{i}" for i in range(repo_count)]
+    main_lang = rng.integers(0, len(TARGET_LANGUAGES), repo_count)[repo_ids]
+    columns = {"repo": pd.Categorical.from_codes(repo_ids, repo_names)}
+    for i, lang in enumerate(TARGET_LANGUAGES):
+        size = rng.lognormal(8, 2, task_count)
+        # Main language always present, others in about 1 task in 5
+        present = (main_lang == i) | (rng.random(task_count) < 0.2)
+        columns[lang] = np.where(present, size * np.where(main_lang == i, 10, 1), 0).astype(np.int32)
+    added = rng.geometric(0.05, task_count).astype(np.int32)
+    deleted = rng.geometric(0.1, task_count).astype(np.int32) - 1
+    columns["golden_patch_added"] = added
+    columns["golden_patch_deleted"] = deleted
+    columns["golden_patch_total"] = added + deleted
+    return pd.DataFrame(columns)
+
+
+def benchmark(sizes: list[int], repeat: int = 1):
+    """Print analyze_benchmark's time and per-task cost on synthetic benchmarks of the given sizes."""
+    import time
+
+    print(f"{'Tasks':>12} {'Repos':>8} {'Seconds':>10} {'us/task':>10}")
+    for size in sizes:
+        df = synthetic_benchmark(size)
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            results = analyze_benchmark("synthetic", df)
+            seconds = time.perf_counter() - start
+            best = seconds if best is None else min(best, seconds)
+        print(f"{size:>12,} {results['repo_count']:>8,} {best:>10.3f} {best / size * 1e6:>10.3f}")
+        del df
+
+
 def main():
+    parser = argparse.ArgumentParser(description="Generate complexity reports from the augmented CSVs.")
+    parser.add_argument("--benchmark", type=int, nargs="+", metavar="TASKS",
+                        help="Instead of reporting, time the report engine on synthetic benchmarks of these sizes.")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per --benchmark size; the best is reported.")
+    parser.add_argument("--cache-dir", default=REPORT_CACHE_DIR,
+                        help="Directory for the per-benchmark results of unchanged input files.")
+    parser.add_argument("--no-cache", action="store_true", help="Recompute every benchmark and cache nothing.")
+    args = parser.parse_args()
+    if args.benchmark:
+        benchmark(args.benchmark, args.repeat)
+        return
+
     print("SWE-Bench Complexity Report Generator")
     print("=" * 40)
 
-    # Load all benchmark data
+    # Analyze each benchmark whose input changed since the last run; the
+    # others are rendered from their cached results
+    start = time.perf_counter()
     print(f"\nLoading data from {AUGMENTED_DIR}/...")
-    benchmarks = load_benchmark_data()
-    print(f"Found {len(benchmarks)} benchmarks: {', '.join(benchmarks.keys())}")
-
-    # Analyze each benchmark
-    all_results = []
-    for name, df in benchmarks.items():
-        results = analyze_benchmark(name, df)
-        all_results.append(results)
+    cache = None if args.no_cache else ResultCache(args.cache_dir)
+    all_results = analyze_sources(benchmark_sources(), cache)
+    print(f"Found {len(all_results)} benchmarks: {', '.join(res['name'] for res in all_results)}")
+    for results in all_results:
         print_benchmark_report(results)
 
     # Create reports directory
     REPORTS_DIR.mkdir(exist_ok=True)
 
     # Generate output files
-    generate_summary_csv(all_results, REPORTS_DIR / "complexity_summary.csv")
+    generate_summary_csv(all_results, REPORTS_DIR / "complexity_summary.csv", cache)
     generate_markdown_report(all_results, REPORTS_DIR / "complexity_report.md")
 
-    print(f"\nReport generation complete!")
+    print(f"\nReport generation complete in {time.perf_counter() - start:.2f}s!")
 
 
 if __name__ == "__main__":
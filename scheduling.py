@@ -0,0 +1,380 @@
+"""
+Longest-job-first scheduling of repositories.
+
+The cost of a repository is estimated from its task count, the LOC it had in
+previous runs (the existing *_loc_stats.csv files) and the timings recorded
+in a small JSON history file. Repositories are dispatched largest first so a
+heavy repository never starts last and determines the wall-clock time alone.
+
+DiskBudget adds admission control on top: a repository is only started when
+its estimated scratch space fits in what the running ones leave free.
+
+Within a repository, order_checkouts() orders the commits so successive
+checkouts rewrite as few files as possible.
+"""
+
+import csv
+import glob
+import heapq
+import json
+import os
+import shutil
+import subprocess
+import threading
+
+from common import TARGET_LANGUAGES
+
+# Candidates considered at each step of the nearest-neighbour ordering.
+NEAREST_WINDOW = 16
+
+
+def load_known_loc(directory=".", pattern="*_loc_stats.csv"):
+    """Returns {repo: mean total LOC per task} from the existing LOC stats CSVs in directory."""
+    totals = {}
+    for path in glob.glob(os.path.join(glob.escape(directory), pattern)):
+        with open(path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                loc = sum(int(row.get(lang) or 0) for lang in TARGET_LANGUAGES)
+                count, total = totals.get(row['repo'], (0, 0))
+                totals[row['repo']] = (count + 1, total + loc)
+    return {repo: total / count for repo, (count, total) in totals.items()}
+
+
+def format_duration(seconds):
+    """Formats seconds as e.g. '1h02m', '3m05s' or '12.3s'."""
+    if seconds >= 3600:
+        return f"{int(seconds // 3600)}h{int(seconds % 3600 // 60):02d}m"
+    if seconds >= 60:
+        return f"{int(seconds // 60)}m{int(seconds % 60):02d}s"
+    return f"{seconds:.1f}s"
+
+
+class RepoScheduler:
+    """
+    Orders repositories by estimated cost and keeps the estimate-vs-actual
+    history used to improve later estimates.
+
+    Args:
+        history_path: JSON file with per-repo timings of previous runs
+        known_loc: {repo: LOC per task}, defaults to load_known_loc(stats_dir)
+        stats_dir: Directory holding the *_loc_stats.csv files of previous runs
+    """
+
+    def __init__(self, history_path, known_loc=None, stats_dir="."):
+        self.history_path = history_path
+        self.known_loc = load_known_loc(stats_dir) if known_loc is None else known_loc
+        self.history = {}
+        if os.path.exists(history_path):
+            with open(history_path, encoding='utf-8') as f:
+                self.history = json.load(f)
+        self.estimates = {}  # repo -> estimated seconds (None if unknown)
+
+    def _loc_per_task(self, repo_name):
+        if repo_name in self.known_loc:
+            return self.known_loc[repo_name]
+        return self.history.get(repo_name, {}).get("loc_per_task", 1)
+
+    def weight(self, repo_name, task_count):
+        """Relative cost: task count x last known LOC (task count alone if LOC is unknown)."""
+        return task_count * max(self._loc_per_task(repo_name), 1)
+
+    def _seconds_per_weight(self):
+        """Global rate fitted on the history, or None without history."""
+        weights = sum(h["tasks"] * max(h.get("loc_per_task", 1), 1) for h in self.history.values())
+        seconds = sum(h["seconds"] for h in self.history.values())
+        return seconds / weights if weights and seconds else None
+
+    def estimate_seconds(self, repo_name, task_count):
+        """Expected run time of a repository, or None if nothing is known yet."""
+        past = self.history.get(repo_name)
+        if past and past["tasks"]:
+            return past["seconds"] / past["tasks"] * task_count
+        rate = self._seconds_per_weight()
+        return self.weight(repo_name, task_count) * rate if rate else None
+
+    def order(self, repo_groups):
+        """Returns the repo names of repo_groups, most expensive first."""
+        for repo_name, tasks in repo_groups.items():
+            self.estimates[repo_name] = self.estimate_seconds(repo_name, len(tasks))
+
+        def sort_key(repo_name):
+            # Without any history (first run) there are no time estimates and
+            # the relative weight decides.
+            seconds = self.estimates[repo_name]
+            weight = self.weight(repo_name, len(repo_groups[repo_name]))
+            return (seconds if seconds is not None else 0, weight)
+
+        return sorted(repo_groups, key=sort_key, reverse=True)
+
+    @staticmethod
+    def simulate_makespan(durations, workers):
+        """Makespan of greedily assigning durations (in order) to the least loaded worker."""
+        loads = [0.0] * max(1, min(workers, len(durations)))
+        for duration in durations:
+            heapq.heappush(loads, heapq.heappop(loads) + duration)
+        return max(loads) if loads else 0.0
+
+    def predicted_makespan(self, order, workers):
+        """Predicted wall time of running `order` on `workers`, or None if any estimate is missing."""
+        durations = [self.estimates.get(repo_name) for repo_name in order]
+        if not durations or any(d is None for d in durations):
+            return None
+        return self.simulate_makespan(durations, workers)
+
+    def record(self, repo_name, start, end, results, counted):
+        """
+        Records the actual run of a repository in which `counted` of its
+        results were counted rather than taken from the LOC cache. A run
+        served entirely from the cache says nothing about the cost of
+        counting, so it is not recorded.
+        """
+        if not results or not counted:
+            return
+        loc_per_task = sum(sum(res['stats'].values()) for res in results) / len(results)
+        self.history[repo_name] = {
+            "tasks": counted,
+            "seconds": end - start,
+            "loc_per_task": loc_per_task,
+            "estimated_seconds": self.estimates.get(repo_name),
+        }
+
+    def save(self):
+        """Writes the updated history next to the other caches."""
+        os.makedirs(os.path.dirname(os.path.abspath(self.history_path)), exist_ok=True)
+        tmp_path = self.history_path + ".tmp"
+        with open(tmp_path, "w", encoding='utf-8') as f:
+            json.dump(self.history, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.history_path)
+
+    def report(self, order, workers, wall_seconds, busy_seconds):
+        """Prints predicted vs. actual makespan and the utilisation of `workers` busy for busy_seconds."""
+        predicted = self.predicted_makespan(order, workers)
+        utilisation = busy_seconds / (workers * wall_seconds) * 100 if wall_seconds > 0 else 0
+        predicted_text = format_duration(predicted) if predicted is not None else "n/a (no history yet)"
+        print(f"Scheduling: predicted makespan {predicted_text}, actual {format_duration(wall_seconds)}, "
+              f"worker utilisation {utilisation:.1f}% over {workers} workers")
+
+
+class DiskBudget:
+    """
+    Reserves scratch disk space for the repositories being processed.
+
+    A repository waits in acquire() until its estimate fits next to the other
+    reservations; a repository larger than the whole budget is admitted once
+    nothing else holds space, so it can never wait forever. A repository
+    without an estimate (first run) is admitted only while no other one is
+    unsized and the budget is not used up, so unknown clones start one at a
+    time until they reserve their real size.
+
+    Args:
+        capacity: Budget in bytes, or None for no limit (usage is still tracked)
+        scratch_dir: Directory whose filesystem usage is sampled for the peak report
+    """
+
+    def __init__(self, capacity=None, scratch_dir=None, sample_interval=0.5):
+        self.capacity = capacity
+        self.scratch_dir = scratch_dir
+        self.reserved = 0
+        self.peak_reserved = 0
+        self.waits = 0
+        self._held = {}  # owner -> bytes
+        self._unsized = set()  # owners admitted without an estimate
+        self._cond = threading.Condition()
+        self._baseline = self._fs_used()
+        self.peak_used = 0
+        self._stop = threading.Event()
+        self._sampler = None
+        if scratch_dir is not None:
+            self._sampler = threading.Thread(target=self._sample, args=(sample_interval,), daemon=True)
+            self._sampler.start()
+
+    def _fs_used(self):
+        if self.scratch_dir is None:
+            return 0
+        usage = shutil.disk_usage(self.scratch_dir)
+        return usage.total - usage.free
+
+    def _sample(self, interval):
+        while not self._stop.wait(interval):
+            self.peak_used = max(self.peak_used, self._fs_used() - self._baseline)
+
+    def acquire(self, owner, nbytes):
+        """
+        Blocks until nbytes can be reserved for owner, replacing what owner
+        already holds. nbytes None means the size is not known yet.
+        """
+        with self._cond:
+            self._release_locked(owner)
+            if self.capacity is not None:
+                waited = False
+                while (self._unsized or self.reserved >= self.capacity) if nbytes is None \
+                        else (self.reserved and self.reserved + nbytes > self.capacity):
+                    waited = True
+                    self._cond.wait()
+                self.waits += waited
+            if nbytes is None:
+                self._unsized.add(owner)
+                nbytes = 0
+            self._held[owner] = nbytes
+            self.reserved += nbytes
+            self.peak_reserved = max(self.peak_reserved, self.reserved)
+
+    def available(self, owner):
+        """Bytes owner could hold without waiting, or None without a budget."""
+        if self.capacity is None:
+            return None
+        with self._cond:
+            return max(0, self.capacity - (self.reserved - self._held.get(owner, 0)))
+
+    def held(self, owner):
+        with self._cond:
+            return self._held.get(owner, 0)
+
+    def _release_locked(self, owner):
+        self.reserved -= self._held.pop(owner, 0)
+        self._unsized.discard(owner)
+        self._cond.notify_all()
+
+    def release(self, owner):
+        """Returns everything owner reserved."""
+        with self._cond:
+            self._release_locked(owner)
+
+    def close(self):
+        """Stops sampling the scratch filesystem."""
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+            self.peak_used = max(self.peak_used, self._fs_used() - self._baseline)
+
+    def report(self):
+        """Prints peak scratch usage (and the budget, when there is one)."""
+        from common import format_size
+
+        text = f"Scratch: peak reserved {format_size(self.peak_reserved)}"
+        if self.capacity is not None:
+            text += f" of {format_size(self.capacity)} budget ({self.waits} repos waited for space)"
+        if self.scratch_dir is not None:
+            text += f", peak filesystem usage growth {format_size(max(self.peak_used, 0))} in {self.scratch_dir}"
+        print(text)
+
+
+def commit_dates(repo_path, commits):
+    """Returns {commit: committer timestamp}; commits missing from the clone are left out."""
+    # Resolves abbreviated SHAs and drops missing commits, which git log would fail on.
+    result = subprocess.run(
+        ["git", "cat-file", "--batch-check"],
+        cwd=repo_path,
+        input="".join(f"{commit}\n" for commit in commits),
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    full_shas = {}
+    for commit, line in zip(commits, result.stdout.splitlines()):
+        fields = line.split()
+        if fields[1] == "commit":
+            full_shas[commit] = fields[0]
+    if not full_shas:
+        return {}
+
+    result = subprocess.run(
+        ["git", "log", "--stdin", "--no-walk", "--format=%H %ct"],
+        cwd=repo_path,
+        input="".join(f"{sha}\n" for sha in set(full_shas.values())),
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    dates = dict(line.split() for line in result.stdout.splitlines())
+    return {commit: int(dates[sha]) for commit, sha in full_shas.items()}
+
+
+def tree_entries(repo_path, commit):
+    """The set of (path, mode, blob sha) entries of commit's tree, one `git ls-tree -r` call."""
+    result = subprocess.run(["git", "ls-tree", "-r", "-z", "--full-tree", commit],
+                            cwd=repo_path, capture_output=True, check=True)
+    entries = set()
+    for entry in result.stdout.split(b"\0"):
+        if entry:
+            # "<mode> <type> <sha>\t<path>"
+            meta, path = entry.split(b"\t", 1)
+            mode, _, sha = meta.split(b" ")
+            entries.add((path, mode, sha))
+    return entries
+
+
+def changed_files(old_entries, new_entries):
+    """Number of files that differ between two tree listings, i.e. that a checkout from one to the other rewrites."""
+    return len({path for path, _, _ in old_entries ^ new_entries})
+
+
+def diff_count(repo_path, old_commit, new_commit):
+    """Number of files that differ between two commits, one `git diff --name-only` call."""
+    result = subprocess.run(["git", "diff", "--name-only", "-z", "--no-renames", old_commit, new_commit],
+                            cwd=repo_path, capture_output=True, check=True)
+    return result.stdout.count(b"\0")
+
+
+def order_checkouts(repo_path, pending, order="date", window=NEAREST_WINDOW):
+    """
+    Reorders pending (task, ...) tuples of one repository to reduce checkout churn.
+
+    Args:
+        repo_path: Clone holding the task commits
+        pending: Tuples whose first element is a task dict with a 'commit'
+        order: "date" (oldest commit first), "nearest" (greedy nearest
+               neighbour by changed file count, starting from the oldest
+               commit and looking `window` commits ahead in date order) or
+               "dataset" (unchanged). Each commit's tree is listed once and
+               the listings are compared in memory.
+
+    Returns (reordered list, files rewritten by checking the commits out in
+    that order after the first one). Commits whose date is unknown keep their
+    relative order at the end and are not counted.
+    """
+    if len(pending) < 2:
+        return list(pending), 0
+    dates = commit_dates(repo_path, list(dict.fromkeys(item[0]['commit'] for item in pending)))
+    dated = sorted((item for item in pending if item[0]['commit'] in dates),
+                   key=lambda item: dates[item[0]['commit']])
+    undated = [item for item in pending if item[0]['commit'] not in dates]
+    if order != "nearest":
+        ordered = list(pending) if order == "dataset" else dated + undated
+        # One diff per consecutive pair; the nearest order gets this from its listings
+        commits = [item[0]['commit'] for item in ordered if item[0]['commit'] in dates]
+        rewritten = sum(diff_count(repo_path, a, b) for a, b in zip(commits, commits[1:]) if a != b)
+        return ordered, rewritten
+
+    distances = {}
+    listings = {}  # commit -> tree_entries(), kept for the current commit and the window only
+
+    def entries(commit):
+        if commit not in listings:
+            listings[commit] = tree_entries(repo_path, commit)
+        return listings[commit]
+
+    def distance(a, b):
+        if a == b:
+            return 0
+        key = (a, b) if a < b else (b, a)
+        if key not in distances:
+            distances[key] = changed_files(entries(a), entries(b))
+        return distances[key]
+
+    ordered = []
+    rewritten = 0
+    remaining = dated
+    while remaining:
+        if not ordered:
+            best = 0
+        else:
+            current = ordered[-1][0]['commit']
+            candidates = range(min(window, len(remaining)))
+            best = min(candidates, key=lambda i: distance(current, remaining[i][0]['commit']))
+            rewritten += distance(current, remaining[best][0]['commit'])
+        ordered.append(remaining.pop(best))
+        keep = {ordered[-1][0]['commit']} | {item[0]['commit'] for item in remaining[:window]}
+        for commit in set(listings) - keep:
+            del listings[commit]
+    return ordered + undated, rewritten
@@ -0,0 +1,92 @@
+"""
+Fixtures shared by the tests: small git repositories served over file://,
+standing in for GitHub.
+"""
+
+import itertools
+import os
+import subprocess
+
+import pytest
+
+from common import AnalysisOptions
+
+
+def git(repo_path, *args):
+    """Runs git in repo_path and returns its stripped stdout."""
+    result = subprocess.run(["git", *args], cwd=repo_path, check=True, capture_output=True, text=True)
+    return result.stdout.strip()
+
+
+def commit_files(repo_path, files, message="update"):
+    """
+    Writes {relative_path: content} into the repository at repo_path (None
+    deletes the path) and commits everything; returns the new commit SHA.
+    """
+    for rel_path, content in files.items():
+        path = os.path.join(repo_path, rel_path)
+        if content is None:
+            os.remove(path)
+            continue
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            f.write(content)
+    git(repo_path, "add", "-A")
+    git(repo_path, "-c", "user.name=Test", "-c", "user.email=test@example.com",
+        "commit", "-q", "--allow-empty", "-m", message)
+    return git(repo_path, "rev-parse", "HEAD")
+
+
+class Remotes:
+    """Repositories named 'org/repo' under one directory, reachable as file:// URLs."""
+
+    def __init__(self, root):
+        self.root = root
+        self.url_template = f"file://{root}/{{repo}}"
+
+    def path(self, repo_name):
+        return os.path.join(self.root, repo_name)
+
+    def url(self, repo_name):
+        return self.url_template.format(repo=repo_name)
+
+    def create(self, repo_name, commits=()):
+        """Creates repo_name with one commit per {path: content} dict; returns the commit SHAs."""
+        path = self.path(repo_name)
+        os.makedirs(path)
+        git(path, "init", "-q", "-b", "main")
+        return [commit_files(path, files, f"commit {i}") for i, files in enumerate(commits)]
+
+    def commit(self, repo_name, files, message="update"):
+        return commit_files(self.path(repo_name), files, message)
+
+
+@pytest.fixture
+def remotes(tmp_path):
+    return Remotes(str(tmp_path / "remotes"))
+
+
+@pytest.fixture
+def analysis_options(tmp_path, remotes):
+    """
+    Returns a factory of AnalysisOptions that fetch from remotes, count with
+    the python backend on one worker and do not retry; keyword arguments
+    override any of these. Every call gets its own cache and scratch
+    directories, so runs of one test do not share caches.
+    """
+    runs = itertools.count()
+
+    def make(**overrides):
+        run_dir = tmp_path / f"run_{next(runs)}"
+        options = {
+            "cache_dir": str(run_dir / "cache"),
+            "scratch_dir": str(run_dir / "scratch"),
+            "repo_url_template": remotes.url_template,
+            "use_mirror_cache": False,
+            "loc_backend": "python",
+            "max_workers": 1,
+            "retry_failed": 0,
+        }
+        return AnalysisOptions(**(options | overrides))
+
+    return make
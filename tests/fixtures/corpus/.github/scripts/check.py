@@ -0,0 +1 @@
+print("hidden directories are skipped")
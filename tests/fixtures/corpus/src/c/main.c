@@ -0,0 +1,9 @@
+#include <stdio.h>
+
+/* Prints a greeting.
+   Spans two lines. */
+int main(void) {
+    // say hello
+    printf("hello /* not a comment */\n");
+    return 0;
+}
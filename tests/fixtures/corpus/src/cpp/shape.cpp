@@ -0,0 +1,13 @@
+#include <string>
+
+// A named shape
+class Shape {
+public:
+    explicit Shape(std::string name) : name_(name) {}
+
+    /* area of the shape */
+    virtual double area() const { return 0.0; }
+
+private:
+    std::string name_;
+};
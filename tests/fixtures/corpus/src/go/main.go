@@ -0,0 +1,9 @@
+package main
+
+import "fmt"
+
+// main prints a greeting
+func main() {
+	/* block */
+	fmt.Println("hello")
+}
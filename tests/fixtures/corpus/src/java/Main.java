@@ -0,0 +1,11 @@
+package demo;
+
+/**
+ * Entry point.
+ */
+public class Main {
+    public static void main(String[] args) {
+        // print the arguments
+        System.out.println(String.join(",", args));
+    }
+}
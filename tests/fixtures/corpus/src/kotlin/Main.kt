@@ -0,0 +1,7 @@
+package demo
+
+// Entry point
+fun main(args: Array<String>) {
+    /* join and print */
+    println(args.joinToString(","))
+}
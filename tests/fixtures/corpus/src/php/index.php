@@ -0,0 +1,8 @@
+<?php
+// Entry point
+function greet($name) {
+    # shell-style comment
+    return "Hello " . $name;
+}
+
+echo greet("demo");
@@ -0,0 +1,15 @@
+"""Small application module."""
+
+import os
+
+
+def cwd():
+    # current directory
+    return os.getcwd()
+
+
+class Config:
+    """Holds settings."""
+
+    def __init__(self, name="demo"):
+        self.name = name  # trailing comment
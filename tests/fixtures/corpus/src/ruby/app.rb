@@ -0,0 +1,10 @@
+# Greets people
+class Greeter
+  def initialize(name)
+    @name = name
+  end
+
+  def greet
+    "Hello #{@name}" # interpolated
+  end
+end
@@ -0,0 +1,13 @@
+/// Adds two numbers.
+pub fn add(a: i32, b: i32) -> i32 {
+    // plain addition
+    a + b
+}
+
+#[cfg(test)]
+mod tests {
+    #[test]
+    fn adds() {
+        assert_eq!(super::add(1, 2), 3);
+    }
+}
@@ -0,0 +1,9 @@
+// Application entry
+const items = [1, 2, 3];
+
+/* Doubles every item */
+function double(values) {
+  return values.map((v) => v * 2);
+}
+
+console.log(double(items));
@@ -0,0 +1,9 @@
+// Shared types
+export interface Item {
+  id: number;
+  name: string;
+}
+
+export function label(item: Item): string {
+  return `${item.id}: ${item.name}`;
+}
@@ -0,0 +1,37 @@
+import os
+import shutil
+
+import pytest
+
+from common import LOC_BACKENDS, analyze_repositories, get_loc_counts
+
+pytestmark = pytest.mark.skipif(shutil.which("scc") is None, reason="scc is not installed")
+
+# One small file per language, shebang scripts without an extension, and
+# files scc does not count (other interpreters, extensions, plain text)
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "corpus")
+
+
+def _corpus_files():
+    files = {}
+    for dir_path, dirs, names in os.walk(CORPUS_DIR):
+        # Left behind by compileall
+        dirs[:] = [d for d in dirs if d != "__pycache__"]
+        for name in names:
+            path = os.path.join(dir_path, name)
+            with open(path, encoding="utf-8", newline="") as f:
+                files[os.path.relpath(path, CORPUS_DIR)] = f.read()
+    return files
+
+
+@pytest.mark.parametrize("backend", LOC_BACKENDS)
+def test_backend_matches_scc_on_the_corpus(remotes, analysis_options, backend):
+    sha = remotes.create("org/corpus", [_corpus_files()])[0]
+    options = analysis_options(loc_backend=backend)
+
+    results_map = analyze_repositories({"org/corpus": [{"instance_id": "corpus-1", "commit": sha}]}, options)
+
+    expected = get_loc_counts(CORPUS_DIR)
+    assert results_map["corpus-1"]["stats"] == expected
+    # The shebang scripts are part of the totals
+    assert expected["Python"] == 9 and expected["JavaScript"] == 8 and expected["Ruby"] == 9
@@ -0,0 +1,45 @@
+import json
+import time
+
+from common import analyze_repositories, failures_path_for
+
+UNKNOWN_SHA = "0123456789abcdef0123456789abcdef01234567"
+
+
+def _analyze(options, output_file, repo_groups):
+    failures_file = failures_path_for(str(output_file))
+    results_map = analyze_repositories(repo_groups, options, failures_file=failures_file)
+    with open(failures_file, encoding="utf-8") as f:
+        failures = {failure["instance_id"]: failure for failure in json.load(f)}
+    return results_map, failures
+
+
+def test_unknown_commit_is_a_fetch_failure(remotes, analysis_options, tmp_path):
+    shas = remotes.create("org/demo", [{"a.py": "x = 1\n"}, {"b.py": "y = 2\n"}])
+    tasks = [{"instance_id": "ok-0", "commit": shas[0]},
+             {"instance_id": "bad", "commit": UNKNOWN_SHA},
+             {"instance_id": "ok-1", "commit": shas[1]}]
+
+    for strategy in ("shallow", "full"):
+        start = time.monotonic()
+        results_map, failures = _analyze(analysis_options(fetch_strategy=strategy),
+                                         tmp_path / f"{strategy}_loc_stats.csv", {"org/demo": tasks})
+
+        # The batch failure falls back to per-commit fetches without sleeping
+        assert time.monotonic() - start < 5
+        assert results_map["ok-0"]["stats"]["Python"] == 1
+        assert results_map["ok-1"]["stats"]["Python"] == 2
+        assert list(failures) == ["bad"]
+        assert failures["bad"]["stage"] == "fetch"
+
+
+def test_nonexistent_repository_is_a_fetch_failure(analysis_options, tmp_path):
+    tasks = [{"instance_id": "gone-0", "commit": UNKNOWN_SHA},
+             {"instance_id": "gone-1", "commit": "f" * 40}]
+
+    results_map, failures = _analyze(analysis_options(fetch_strategy="shallow"), tmp_path / "gone_loc_stats.csv",
+                                     {"org/gone": tasks})
+
+    assert results_map == {}
+    assert {instance_id: failure["stage"] for instance_id, failure in failures.items()} == {
+        "gone-0": "fetch", "gone-1": "fetch"}
@@ -0,0 +1,77 @@
+import argparse
+import os
+
+import pytest
+
+from common import AnalysisOptions, AnalysisPipeline, _RepoJob, _Slot, add_analysis_arguments
+from file_index import FileIndex, index_path_for, load_index, read_index
+
+
+def test_flushes_append_segments(tmp_path):
+    index = FileIndex(str(tmp_path))
+    index.add("org/demo", "c1", {"a.py": ("Python", 3, 40), "b.js": ("JavaScript", 2, 30)})
+    index.flush("org/demo")
+    path = index_path_for(str(tmp_path), "org/demo")
+    first = os.path.getmtime(path), os.path.getsize(path)
+
+    # A later run: one new commit, one already indexed
+    index = FileIndex(str(tmp_path))
+    assert index.has("org/demo", "c1")
+    index.add("org/demo", "c1", {"a.py": ("Python", 3, 40)})
+    index.add("org/demo", "c2", {"a.py": ("Python", 4, 50), "c.go": ("Go", 7, 90)})
+    index.flush("org/demo")
+
+    assert (os.path.getmtime(path), os.path.getsize(path)) == first
+    segment = read_index(path + ".1")
+    assert segment["commits"] == ["c2"] and segment["paths"] == ["c.go"]
+    columns = read_index(path)
+    assert columns["commits"] == ["c1", "c2"] and columns["paths"] == ["a.py", "b.js", "c.go"]
+    rows = sorted(load_index(path).astype({"commit": str, "path": str, "language": str})
+                  .itertuples(index=False, name=None))
+    assert rows == [("c1", "a.py", "Python", 3, 40), ("c1", "b.js", "JavaScript", 2, 30),
+                    ("c2", "a.py", "Python", 4, 50), ("c2", "c.go", "Go", 7, 90)]
+
+
+@pytest.mark.parametrize("flags", [["--file-index", "idx", "--loc-backend", "python"],
+                                   ["--extra-stats", "--incremental"]])
+def test_unsupported_flag_combinations_are_parser_errors(flags, capsys):
+    parser = argparse.ArgumentParser()
+    add_analysis_arguments(parser)
+
+    with pytest.raises(SystemExit):
+        AnalysisOptions.from_args(parser.parse_args(flags), parser)
+    assert "needs --loc-backend scc" in capsys.readouterr().err
+
+
+class _FilesCounter:
+    """Returns per-file counts from a {worktree path: files} table."""
+
+    batch_size = 3
+
+    def __init__(self, files_by_path):
+        self.files_by_path = files_by_path
+
+    def count_files_many(self, paths):
+        return [self.files_by_path[path] for path in paths]
+
+
+def test_failed_batch_is_indexed_once_per_counted_commit(analysis_options, tmp_path):
+    index = FileIndex(str(tmp_path / "index"))
+    pipeline = AnalysisPipeline(analysis_options(loc_backend="scc-batched", file_index=index, scan_workers=2))
+    # The code count of c2 is not a number, so the batch and c2's own recount fail
+    pipeline.loc_counter = _FilesCounter({
+        "w1": {"a.py": ("Python", 3, 40)},
+        "w2": {"a.py": ("Python", "3", 40)},
+        "w3": {"b.go": ("Go", 5, 60)},
+    })
+    job = _RepoJob("org/demo", [], None)
+    job.remaining = 10  # more than are counted here, so the job is not finished
+    for i in (1, 2, 3):
+        pipeline._checked_out.put((job, {"instance_id": f"demo-{i}", "commit": f"c{i}"}, None, _Slot(f"w{i}")))
+    pipeline._checked_out.put(None)
+
+    pipeline._count_worker()
+    index.flush("org/demo")
+
+    assert [failure.instance_id for failure in pipeline.failures] == ["demo-2"]
+    assert read_index(index_path_for(index.index_dir, "org/demo"))["commits"] == ["c1", "c3"]
@@ -0,0 +1,86 @@
+import subprocess
+import threading
+
+from git_object_loc import BlobCounts, GitObjectLocCounter
+
+
+def test_counts_commits_without_checkout(remotes):
+    first, second = remotes.create("org/demo", [
+        {"a.py": "# comment\nx = 1\n\ny = 2\n", "b.js": "// c\nlet a = 1;\n", "notes.txt": "text\n"},
+        {"c.py": "z = 3\n"},
+    ])
+    counter = GitObjectLocCounter(remotes.path("org/demo"))
+    try:
+        assert counter.count(first)["Python"] == 2
+        stats = counter.count(second)
+        assert (stats["Python"], stats["JavaScript"]) == (3, 1)
+        # a.py and b.js are unchanged in the second commit
+        assert (counter.blobs_read, counter.blob_hits) == (3, 2)
+    finally:
+        counter.close()
+
+
+def test_missing_blob_raises_instead_of_hanging(remotes):
+    # Enough requests and answers to fill both the stdin and the stdout pipe
+    # of cat-file once the reader stops after the first answer.
+    (commit,) = remotes.create("org/demo", [{f"m{i}.py": f"value = {i}\n" * 40 for i in range(3000)}])
+    repo_path = remotes.path("org/demo")
+    counter = GitObjectLocCounter(repo_path)
+    blobs = [blob_sha for blob_sha, _ in counter.list_files(commit)]
+    outcome = []
+
+    def read():
+        try:
+            outcome.extend(counter._read_blobs(["0" * 40] + blobs))
+        except subprocess.CalledProcessError as exc:
+            outcome.append(exc)
+
+    reader = threading.Thread(target=read, daemon=True)
+    reader.start()
+    reader.join(timeout=60)
+    assert not reader.is_alive(), "reading blobs hung after a missing object"
+    (error,) = outcome
+    assert f"{'0' * 40} missing" in error.stderr
+
+    # The next count starts a fresh cat-file process.
+    try:
+        assert counter.count(commit)["Python"] == 40 * 3000
+    finally:
+        counter.close()
+
+
+def test_reader_stopping_early_leaves_no_stale_answers(remotes):
+    (commit,) = remotes.create("org/demo", [{"a.py": "a = 1\n", "b.py": "b = 2\nc = 3\n"}])
+    counter = GitObjectLocCounter(remotes.path("org/demo"))
+    blobs = [blob_sha for blob_sha, _ in counter.list_files(commit)]
+    reader = counter._read_blobs(blobs)
+    next(reader)
+    reader.close()
+    try:
+        assert counter.count(commit)["Python"] == 3
+    finally:
+        counter.close()
+
+
+def test_counters_of_one_repository_share_blob_counts(remotes):
+    shared = {f"s{i}.py": f"shared = {i}\n" for i in range(200)}
+    commits = remotes.create("org/demo", [shared | {f"own{n}.py": "x = 1\n" * (n + 1)} for n in range(8)])
+    blob_counts = BlobCounts()
+    counters = [GitObjectLocCounter(remotes.path("org/demo"), blob_counts) for _ in range(4)]
+    results = {}
+
+    def work(counter, shas):
+        for sha in shas:
+            results[sha] = counter.count(sha)
+
+    threads = [threading.Thread(target=work, args=(counter, commits[i::4])) for i, counter in enumerate(counters)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for counter in counters:
+        counter.close()
+
+    assert [results[sha]["Python"] for sha in commits] == [200 + sum(range(1, n + 2)) for n in range(8)]
+    # Every distinct blob was read by exactly one of the counters.
+    assert sum(counter.blobs_read for counter in counters) == 200 + 8
@@ -0,0 +1,53 @@
+import re
+import shutil
+
+import pytest
+
+from common import EvalSet, analyze_repositories, order_results, write_loc_stats_csv
+
+pytestmark = pytest.mark.skipif(shutil.which("scc") is None, reason="scc is not installed")
+
+# Unchanged files, so the changes below stay small enough to be applied as deltas
+FILLER = {f"pkg/mod{i}.py": f"def f{i}():\n    return {i}\n" for i in range(20)}
+
+# Each commit changes, adds, deletes or renames a few files of the previous one.
+COMMITS = [
+    FILLER | {
+        "src/app.py": "import os\n\n# entry point\ndef main():\n    return os.getcwd()\n",
+        "src/util.py": "def helper(x):\n    return x * 2\n",
+        "web/index.js": "// entry\nconst a = 1;\nconsole.log(a);\n",
+        "web/page.html": "<html>\n<!-- comment -->\n<body></body>\n</html>\n",
+        "lib/core.c": "/* core */\nint add(int a, int b) {\n    return a + b;\n}\n",
+        "lib/core.h": "int add(int a, int b);\n",
+        "README.md": "# demo\n",
+    },
+    {"src/util.py": "def helper(x):\n    # doubled\n    return x * 2\n\n\ndef other():\n    pass\n"},
+    {"src/new.py": "VALUE = 3\n", "web/index.js": None},
+    {"lib/core.c": None, "lib/engine.c": "/* core */\nint add(int a, int b) {\n    return a + b;\n}\n"},
+    {"build/out.py": "generated = True\n", ".gitignore": "build/\n"},
+    {"src/app.py": "def main():\n    return 0\n", "docs/notes.txt": "not counted\n"},
+]
+
+
+def _run(analysis_options, shas, tmp_path, name, incremental):
+    options = analysis_options(loc_backend="scc", fetch_strategy="full", max_workers=2, incremental=incremental)
+    tasks = [{"instance_id": f"demo-{i}", "commit": sha} for i, sha in enumerate(shas)]
+    results_map = analyze_repositories({"org/demo": tasks}, options)
+    output_file = tmp_path / f"{name}_loc_stats.csv"
+    write_loc_stats_csv(str(output_file), order_results([task["instance_id"] for task in tasks], results_map),
+                        EvalSet.SWE_BENCH_VERIFIED)
+    return output_file.read_bytes()
+
+
+def test_incremental_csv_is_byte_identical_to_full_scans(remotes, analysis_options, tmp_path, capsys):
+    shas = remotes.create("org/demo", COMMITS)
+
+    full = _run(analysis_options, shas, tmp_path, "full", incremental=False)
+    capsys.readouterr()
+    incremental = _run(analysis_options, shas, tmp_path, "incremental", incremental=True)
+
+    assert incremental == full
+    assert full.count(b"\n") == len(COMMITS) + 1
+    # Only the .gitignore change forces a full scan after the anchor.
+    derived = re.search(r"(\d+) derived from diffs, (\d+) full scans", capsys.readouterr().out)
+    assert derived.groups() == ("4", "2")
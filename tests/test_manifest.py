@@ -0,0 +1,35 @@
+import sqlite3
+
+import pytest
+
+from manifest import BlobStore, DatasetManifest, load_manifest
+
+
+def test_manifest_closes_its_blob_store(tmp_path):
+    store = BlobStore(str(tmp_path / "blobs.sqlite3"))
+    info = {"dataset": "org/demo", "split": "test", "revision": "r1", "fields": ["patch"],
+            "rows": [["demo-1", "org/demo", "abc", [store.put("diff --git a/x b/x")]]]}
+
+    with DatasetManifest(info, store) as manifest:
+        assert manifest.get("demo-1", "patch") == "diff --git a/x b/x"
+
+    with pytest.raises(sqlite3.ProgrammingError):
+        manifest.get("demo-1", "patch")
+
+
+def test_blob_kind_is_part_of_the_key(tmp_path):
+    store = BlobStore(str(tmp_path / "blobs.sqlite3"))
+    pairs = [("[]", []), ("1", 1), ('"x"', "x")]
+    hashes = [(store.put(text), store.put(value)) for text, value in pairs]
+
+    for (text, value), (text_sha, value_sha) in zip(pairs, hashes):
+        assert text_sha != value_sha
+        assert store.get(text_sha) == text and isinstance(store.get(text_sha), str)
+        assert store.get(value_sha) == value
+    store.close()
+
+
+def test_offline_load_without_a_cached_manifest_opens_no_store(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        load_manifest("org/demo", cache_dir=str(tmp_path), offline=True)
+    assert not (tmp_path / "manifests" / "blobs.sqlite3").exists()
@@ -0,0 +1,67 @@
+import os
+import subprocess
+
+from common import KEEP_REF_PREFIX, clone_repo_with_retry, ensure_mirror, get_mirror_path, has_commit
+from conftest import git
+
+
+def test_clone_through_mirror(remotes, tmp_path):
+    (first,) = remotes.create("org/demo", [{"a.py": "a = 1\n"}])
+    mirror_dir = str(tmp_path / "mirrors")
+    target = str(tmp_path / "clone")
+
+    clone_repo_with_retry(remotes.url("org/demo"), target, mirror_dir=mirror_dir, commits=[first])
+
+    mirror_path = get_mirror_path(remotes.url("org/demo"), mirror_dir)
+    assert mirror_path == os.path.join(mirror_dir, "org", "demo.git")
+    assert has_commit(os.path.join(target, ".git"), first)
+    # The clone borrows the mirror's objects instead of copying them.
+    with open(os.path.join(target, ".git", "objects", "info", "alternates"), encoding="utf-8") as f:
+        assert os.path.realpath(f.read().strip()) == os.path.realpath(os.path.join(mirror_path, "objects"))
+
+
+def test_mirror_only_fetches_missing_commits(remotes, tmp_path):
+    (first,) = remotes.create("org/demo", [{"a.py": "a = 1\n"}])
+    mirror_dir = str(tmp_path / "mirrors")
+    mirror_path = ensure_mirror(remotes.url("org/demo"), mirror_dir, [first])
+
+    second = remotes.commit("org/demo", {"b.py": "b = 2\n"})
+    ensure_mirror(remotes.url("org/demo"), mirror_dir, [first])
+    assert not has_commit(mirror_path, second)
+
+    ensure_mirror(remotes.url("org/demo"), mirror_dir, [first, second])
+    assert has_commit(mirror_path, second)
+
+
+def test_commit_fetched_by_sha_is_pinned(remotes, tmp_path):
+    remotes.create("org/demo", [{"a.py": "a = 1\n"}])
+    remote_path = remotes.path("org/demo")
+    # A commit no branch points at any more, like a force-pushed PR head
+    git(remote_path, "checkout", "-q", "-b", "pr")
+    orphan = remotes.commit("org/demo", {"pr.py": "x = 1\n"})
+    git(remote_path, "checkout", "-q", "main")
+    git(remote_path, "branch", "-q", "-D", "pr")
+
+    mirror_dir = str(tmp_path / "mirrors")
+    mirror_path = ensure_mirror(remotes.url("org/demo"), mirror_dir, [orphan])
+    assert git(mirror_path, "rev-parse", KEEP_REF_PREFIX + orphan) == orphan
+
+    # Neither the pruning fetch for the next missing commit nor gc drops it.
+    newer = remotes.commit("org/demo", {"b.py": "b = 2\n"})
+    ensure_mirror(remotes.url("org/demo"), mirror_dir, [newer])
+    git(mirror_path, "-c", "gc.reflogExpire=now", "-c", "gc.reflogExpireUnreachable=now",
+        "gc", "-q", "--prune=now")
+    assert has_commit(mirror_path, orphan)
+    assert git(mirror_path, "rev-parse", KEEP_REF_PREFIX + orphan) == orphan
+
+
+def test_unknown_commit_is_left_out(remotes, tmp_path, capsys):
+    (first,) = remotes.create("org/demo", [{"a.py": "a = 1\n"}])
+    missing = "0" * 40
+    mirror_path = ensure_mirror(remotes.url("org/demo"), str(tmp_path / "mirrors"), [first, missing])
+    assert has_commit(mirror_path, first)
+    assert not has_commit(mirror_path, missing)
+    assert f"commit {missing} not found" in capsys.readouterr().out
+    result = subprocess.run(["git", "--git-dir", mirror_path, "for-each-ref", KEEP_REF_PREFIX],
+                            capture_output=True, text=True, check=True)
+    assert result.stdout == ""
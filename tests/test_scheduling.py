@@ -0,0 +1,79 @@
+import threading
+
+from common import TARGET_LANGUAGES
+from fetch_strategy import FetchPlanner
+from scheduling import DiskBudget, RepoScheduler, changed_files, load_known_loc, order_checkouts, tree_entries
+
+
+def _result(loc):
+    return {"stats": {lang: (loc if lang == "Python" else 0) for lang in TARGET_LANGUAGES}}
+
+
+def test_cache_only_runs_are_not_recorded(tmp_path):
+    scheduler = RepoScheduler(str(tmp_path / "timings.json"), known_loc={})
+    scheduler.record("org/cached", 0.0, 0.1, [_result(100)] * 5, counted=0)
+    scheduler.record("org/counted", 0.0, 8.0, [_result(100)] * 5, counted=2)
+
+    assert "org/cached" not in scheduler.history
+    assert scheduler.history["org/counted"]["tasks"] == 2
+    assert scheduler.estimate_seconds("org/counted", 4) == 16.0
+
+
+def test_known_loc_is_read_next_to_the_output(tmp_path, monkeypatch):
+    stats_dir = tmp_path / "out"
+    stats_dir.mkdir()
+    header = ",".join(["eval_set", "instance_id", "repo", "commit"] + TARGET_LANGUAGES)
+    rows = [["SWE-Bench Verified", f"i{i}", "org/demo", "c"] + ["0"] * len(TARGET_LANGUAGES) for i in range(2)]
+    rows[0][4], rows[1][4] = "100", "300"
+    (stats_dir / "demo_loc_stats.csv").write_text("\n".join([header] + [",".join(r) for r in rows]) + "\n")
+    monkeypatch.chdir(tmp_path)
+
+    assert load_known_loc() == {}
+    assert load_known_loc(str(stats_dir)) == {"org/demo": 200}
+    assert RepoScheduler(str(tmp_path / "t.json"), stats_dir=str(stats_dir)).weight("org/demo", 2) == 400
+
+
+def test_unsized_repositories_are_admitted_one_at_a_time():
+    budget = DiskBudget(capacity=100)
+    budget.acquire("first", None)
+    admitted = threading.Event()
+    waiter = threading.Thread(target=lambda: (budget.acquire("second", None), admitted.set()))
+    waiter.start()
+
+    assert not admitted.wait(0.2)
+    # Reserving its real size lets the next unsized repository start
+    budget.acquire("first", 40)
+    assert admitted.wait(5)
+    waiter.join()
+    assert budget.reserved == 40
+
+
+def test_scratch_estimate_falls_back_to_fetch_sizes(tmp_path):
+    planner = FetchPlanner(str(tmp_path / "fetch_sizes.json"))
+    assert planner.scratch_bytes("org/demo", 3) is None
+
+    planner.record("org/demo", "shallow", 3000, 3)
+    assert planner.scratch_bytes("org/demo", 2) == 2000
+    planner.record("org/demo", "full", 2500, 3)
+    assert planner.scratch_bytes("org/demo", 2) == 2000
+    assert planner.scratch_bytes("org/demo", 5) == 2500
+    planner.record_scratch("org/demo", 9000)
+    assert planner.scratch_bytes("org/demo", 5) == 9000
+
+
+def test_nearest_order_follows_the_smallest_diffs(remotes):
+    base = {f"f{i}.py": f"x = {i}\n" for i in range(10)}
+    shas = remotes.create("org/demo", [base, {p: "changed\n" for p in base}, base | {"new.py": "y = 1\n"}])
+    repo_path = remotes.path("org/demo")
+    pending = [({"commit": sha},) for sha in shas]
+
+    assert changed_files(tree_entries(repo_path, shas[0]), tree_entries(repo_path, shas[1])) == 10
+    assert changed_files(tree_entries(repo_path, shas[0]), tree_entries(repo_path, shas[2])) == 1
+    ordered, rewritten = order_checkouts(repo_path, pending, "nearest")
+    assert [item[0]["commit"] for item in ordered] == [shas[0], shas[2], shas[1]]
+    assert rewritten == 1 + 11
+
+    # Date order diffs each consecutive pair instead
+    ordered, rewritten = order_checkouts(repo_path, pending, "date")
+    assert [item[0]["commit"] for item in ordered] == shas
+    assert rewritten == 10 + 11
@@ -0,0 +1,38 @@
+import shutil
+
+import pytest
+
+from common import analyze_repositories
+from conftest import git
+
+pytestmark = pytest.mark.skipif(shutil.which("scc") is None, reason="scc is not installed")
+
+# Files scc counts that line_counter's extension tables do not cover
+FILES = {
+    "src/app.py": "import os\n\nprint(os.getcwd())\n",
+    "bin/tool": "#!/usr/bin/env python3\nimport sys\nprint(sys.argv)\n",
+    "bin/serve": "#!/usr/bin/node\nconst http = 1;\nconsole.log(http);\n",
+    "sketch/blink.ino": "void setup() {\n  pinMode(13, OUTPUT);\n}\n",
+    "include/vec.h++": "struct Vec {\n  int x;\n};\n",
+    "conf.d/run": "#!/usr/bin/env ruby\nputs 1\n",
+    "assets/logo.svg": "<svg></svg>\n",
+    "docs/notes.txt": "not counted\n",
+}
+
+
+def _stats(analysis_options, sha, sparse):
+    options = analysis_options(loc_backend="scc", sparse_checkout=sparse)
+    results_map = analyze_repositories({"org/demo": [{"instance_id": "demo-1", "commit": sha}]}, options)
+    return results_map["demo-1"]["stats"]
+
+
+def test_sparse_checkout_counts_the_same_as_a_full_checkout(remotes, analysis_options):
+    sha = remotes.create("org/demo", [FILES])[0]
+    git(remotes.path("org/demo"), "config", "uploadpack.allowFilter", "true")
+
+    full = _stats(analysis_options, sha, sparse=False)
+    sparse = _stats(analysis_options, sha, sparse=True)
+
+    assert sparse == full
+    assert full["Python"] == 4 and full["JavaScript"] == 3 and full["Ruby"] == 1
+    assert full["C++"] == 6
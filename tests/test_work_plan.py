@@ -0,0 +1,34 @@
+import json
+
+from common import WorkPlan, analyze_repositories, failures_path_for
+from journal import ResultJournal
+
+
+def test_failures_and_journal_list_dataset_instances(remotes, analysis_options, tmp_path):
+    sha = remotes.create("org/demo", [{"app.py": "x = 1\n"}])[0]
+    plan = WorkPlan()
+    plan.add("verified", [{"instance_id": "demo-1", "repo": "org/demo", "commit": sha}])
+    plan.add("polybench", [{"instance_id": "demo-poly-1", "repo": "org/demo", "commit": sha}])
+    plan.add("verified", [{"instance_id": "missing__repo-1", "repo": "org/missing", "commit": "a" * 40},
+                          {"instance_id": "missing__repo-2", "repo": "org/missing", "commit": "a" * 40}])
+    plan.add("polybench", [{"instance_id": "poly-1", "repo": "org/missing", "commit": "a" * 40}])
+    options = analysis_options(fetch_strategy="full", retry_failed=1)
+    output_file = str(tmp_path / "all_loc_stats.csv")
+    journal = ResultJournal(str(tmp_path / "all_loc_stats.journal.jsonl"))
+
+    results_map = analyze_repositories(plan.repo_groups(), options, journal=journal,
+                                       failures_file=failures_path_for(output_file))
+    journal.close()
+
+    with open(tmp_path / "all_loc_stats.journal.jsonl", encoding="utf-8") as f:
+        journaled = [json.loads(line) for line in f]
+    assert [(r["instance_id"], r["instance_ids"]) for r in journaled] == [
+        (WorkPlan.work_id("org/demo", sha), ["demo-1", "demo-poly-1"])]
+    [poly] = plan.results_for("polybench", results_map)
+    assert poly["instance_id"] == "demo-poly-1" and "instance_ids" not in poly
+    assert poly["stats"]["Python"] == 1
+
+    with open(failures_path_for(output_file), encoding="utf-8") as f:
+        failures = json.load(f)
+    assert [failure["instance_id"] for failure in failures] == ["missing__repo-1", "missing__repo-2", "poly-1"]
+    assert {failure["commit"] for failure in failures} == {"a" * 40}